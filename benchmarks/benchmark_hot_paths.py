@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Times the hot paths of the evolution on fixed robots and populations, and compares them with stored baselines.
+
+The robots are developed from the genotypes in test_py/plasticonding and from seeded random genotypes,
+and every repetition starts from the same random seed, so the numbers of two runs are comparable.
+
+Usage:
+    python benchmarks/benchmark_hot_paths.py                   run all the benchmarks
+    python benchmarks/benchmark_hot_paths.py develop to_sdf    run the benchmarks with these names
+    python benchmarks/benchmark_hot_paths.py --save NAME       store the results in benchmarks/baselines/NAME.json
+    python benchmarks/benchmark_hot_paths.py --compare NAME    compare with benchmarks/baselines/NAME.json,
+                                                               exits with 1 if any benchmark is slower
+"""
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import timeit
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pyrevolve import SDF
+from pyrevolve.custom_logging.logger import logger, genotype_logger
+from pyrevolve.genotype.plasticoding import initialization
+from pyrevolve.genotype.plasticoding.plasticoding import Plasticoding, PlasticodingConfig
+
+BENCHMARKS_FOLDER = os.path.dirname(os.path.abspath(__file__))
+GENOTYPES_FOLDER = os.path.join(BENCHMARKS_FOLDER, '..', 'test_py', 'plasticonding')
+BASELINES_FOLDER = os.path.join(BENCHMARKS_FOLDER, 'baselines')
+SEED = 42
+
+# name: (function preparing the benchmark, unit of the timed items)
+BENCHMARKS = {}
+
+
+def benchmark(name, unit):
+    """
+    Registers a function that prepares a benchmark. The function receives the genotypes and returns
+    (timed function, number of items processed by a call, function called before every repetition or None)
+    """
+    def register(function):
+        BENCHMARKS[name] = (function, unit)
+        return function
+    return register
+
+
+def genotypes(n_random):
+    conf = PlasticodingConfig()
+    result = []
+    for genotype_id in (176, 180):
+        genotype = Plasticoding(conf, genotype_id)
+        genotype.load_genotype(os.path.join(GENOTYPES_FOLDER, f'genotype_{genotype_id}.txt'))
+        result.append(genotype)
+    for seed in range(n_random):
+        random.seed(seed)
+        result.append(initialization.random_initialization(conf, seed))
+    return result
+
+
+def develop_all(population):
+    robots = []
+    for genotype in population:
+        robot = genotype.develop()
+        robot.update_substrate()
+        robots.append(robot)
+    return robots
+
+
+class _Individual:
+    __slots__ = ('fitness',)
+
+    def __init__(self, fitness):
+        self.fitness = fitness
+
+
+def _individuals(n):
+    rng = random.Random(SEED)
+    return [_Individual(rng.random() if i % 10 else None) for i in range(n)]
+
+
+@benchmark('develop', 'robot')
+def bench_develop(population):
+    return lambda: [genotype.develop() for genotype in population], len(population), None
+
+
+@benchmark('standard_mutation', 'genotype')
+def bench_mutation(population):
+    from pyrevolve.genotype.plasticoding.mutation.mutation import MutationConfig
+    from pyrevolve.genotype.plasticoding.mutation.standard_mutation import standard_mutation
+    conf = MutationConfig(mutation_prob=1.0, genotype_conf=PlasticodingConfig())
+    return lambda: [standard_mutation(genotype, conf) for genotype in population], len(population), None
+
+
+@benchmark('standard_crossover', 'child')
+def bench_crossover(population):
+    from pyrevolve.evolution.individual import Individual
+    from pyrevolve.genotype.plasticoding.crossover.crossover import CrossoverConfig
+    from pyrevolve.genotype.plasticoding.crossover.standard_crossover import standard_crossover
+    conf = CrossoverConfig(crossover_prob=1.0)
+    genotype_conf = PlasticodingConfig()
+    parents = [(Individual(first), Individual(second)) for first, second in zip(population, population[1:])]
+    return lambda: [standard_crossover(pair, genotype_conf, conf) for pair in parents], len(parents), None
+
+
+@benchmark('to_sdf', 'robot')
+def bench_to_sdf(population):
+    robots = develop_all(population)
+    pose = SDF.math.Vector3(0, 0, 0.25)
+
+    def run():
+        for robot in robots:
+            robot.invalidate_sdf()
+            robot.to_sdf(pose)
+    return run, len(robots), None
+
+
+@benchmark('to_sdf_cached', 'robot')
+def bench_to_sdf_cached(population):
+    robots = develop_all(population)
+    pose = SDF.math.Vector3(0, 0, 0.25)
+    for robot in robots:
+        robot.to_sdf(pose)
+    return lambda: [robot.to_sdf(pose) for robot in robots], len(robots), None
+
+
+@benchmark('to_yaml', 'robot')
+def bench_to_yaml(population):
+    robots = develop_all(population)
+    return lambda: [robot.to_yaml() for robot in robots], len(robots), None
+
+
+@benchmark('load_yaml', 'robot')
+def bench_load_yaml(population):
+    from pyrevolve.revolve_bot import RevolveBot
+    yamls = [robot.to_yaml() for robot in develop_all(population)]
+    return lambda: [RevolveBot().load_yaml(text) for text in yamls], len(yamls), None
+
+
+@benchmark('measure_body', 'robot')
+def bench_measure_body(population):
+    from pyrevolve.revolve_bot.measure.measure_body import MeasureBody
+    robots = develop_all(population)
+    return lambda: [MeasureBody(robot._body, robot.substrate).measure_all() for robot in robots], len(robots), None
+
+
+@benchmark('measure_brain', 'robot')
+def bench_measure_brain(population):
+    from pyrevolve.revolve_bot.measure.measure_brain import MeasureBrain
+    robots = develop_all(population)
+    return lambda: [MeasureBrain(robot._brain, 10).measure_all() for robot in robots], len(robots), None
+
+
+@benchmark('render_robot', 'robot')
+def bench_render_robot(population):
+    from pyrevolve.revolve_bot.render.render import Render
+    robots = develop_all(population)
+    folder = tempfile.mkdtemp()
+    image_path = os.path.join(folder, 'body.png')
+    return lambda: [Render().render_robot(robot._body, image_path, robot.substrate) for robot in robots], \
+        len(robots), None
+
+
+@benchmark('update_states', 'message')
+def bench_update_states(population):
+    from pyrevolve.angle.manage.world import WorldManager
+    from pyrevolve.angle.manage.robotmanager import RobotManager
+    from pyrevolve.spec.msgs import RobotStates
+    from pyrevolve.util import Time
+    robots = develop_all(population)
+    world = WorldManager(builder=None, generator=None, _private=WorldManager._PRIVATE)
+    n_messages = 100
+
+    messages = []
+    for step in range(n_messages):
+        msg = RobotStates()
+        msg.time.sec = step // 5
+        msg.time.nsec = step % 5 * 200000000
+        for i, robot in enumerate(robots):
+            state = msg.robot_state.add()
+            state.id = i
+            state.name = str(robot.id)
+            state.pose.position.x = 0.01 * step
+            state.pose.position.y = 0.02 * step
+            state.pose.position.z = 0.03
+            state.pose.orientation.w = 1
+            state.pose.orientation.x = 0
+            state.pose.orientation.y = 0
+            state.pose.orientation.z = 0
+        messages.append(msg.SerializeToString())
+
+    def reset():
+        world.start_time = None
+        world.robot_managers = {}
+        for robot in robots:
+            robot_manager = RobotManager(robot, SDF.math.Vector3(0, 0, 0.03), Time(), speed_window=n_messages)
+            world.robot_managers[robot_manager.name] = robot_manager
+
+    def run():
+        for msg in messages:
+            world._update_states(msg)
+    return run, n_messages, reset
+
+
+@benchmark('tournament_selection', 'selection')
+def bench_tournament_selection(_population):
+    from pyrevolve.evolution.selection import tournament_selection
+    individuals = _individuals(10000)
+    return lambda: [tournament_selection(individuals, 2) for _ in range(10000)], 10000, None
+
+
+@benchmark('multiple_selection', 'population')
+def bench_multiple_selection(_population):
+    from pyrevolve.evolution.selection import multiple_selection, tournament_selection
+    individuals = _individuals(1500)
+    # steady state survival selection of 1000 individuals from 1000 parents and 500 children
+    return lambda: multiple_selection(individuals, 1000, tournament_selection), 1, None
+
+
+def run_benchmarks(names, n_random, repetitions):
+    """
+    :return: dictionary of the results of the benchmarks, and list of the skipped benchmarks with the reason
+    """
+    population = genotypes(n_random)
+    results = {}
+    skipped = []
+    for name in names:
+        prepare, unit = BENCHMARKS[name]
+        random.seed(SEED)
+        try:
+            function, n_items, reset = prepare(population)
+        except ImportError as e:
+            skipped.append((name, str(e)))
+            continue
+
+        def setup():
+            random.seed(SEED)
+            if reset is not None:
+                reset()
+
+        times = timeit.Timer(function, setup=setup).repeat(repeat=repetitions, number=1)
+        results[name] = {
+            'unit': f'ms/{unit}',
+            'min': 1000 * min(times) / n_items,
+            'median': 1000 * statistics.median(times) / n_items,
+            'items': n_items,
+            'repetitions': repetitions,
+        }
+    return results, skipped
+
+
+def machine_info():
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Prints the results next to the baseline
+    :param tolerance: relative slowdown of the minimum time above which a benchmark counts as slower
+    :return: names of the benchmarks slower than the baseline
+    """
+    slower = []
+    print(f'{"benchmark":<22} {"baseline":>12} {"current":>12} {"ratio":>7}')
+    for name, result in results.items():
+        if name not in baseline['results']:
+            print(f'{name:<22} {"-":>12} {result["min"]:12.4f} {"-":>7}')
+            continue
+        reference = baseline['results'][name]['min']
+        ratio = result['min'] / reference
+        flag = ''
+        if ratio > 1 + tolerance:
+            slower.append(name)
+            flag = ' slower'
+        elif ratio < 1 - tolerance:
+            flag = ' faster'
+        print(f'{name:<22} {reference:12.4f} {result["min"]:12.4f} {ratio:7.2f}{flag}')
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks the hot paths of the evolution')
+    parser.add_argument('benchmarks', nargs='*', help=f'names of the benchmarks to run, among: {", ".join(BENCHMARKS)}')
+    parser.add_argument('--random-robots', default=20, type=int,
+                        help='number of random robots, besides the stored ones. Default "20".')
+    parser.add_argument('--repetitions', default=5, type=int, help='repetitions of each benchmark. Default "5".')
+    parser.add_argument('--save', help='name of the baseline to store the results as')
+    parser.add_argument('--compare', help='name of the baseline to compare the results with')
+    parser.add_argument('--tolerance', default=0.1, type=float,
+                        help='relative slowdown tolerated when comparing. Default "0.1".')
+    args = parser.parse_args()
+
+    # the numbers measure the code, not the writing of the logs
+    logger.setLevel(logging.WARNING)
+    genotype_logger.setLevel(logging.WARNING)
+
+    names = args.benchmarks or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            parser.error(f'unknown benchmark {name}')
+
+    results, skipped = run_benchmarks(names, args.random_robots, args.repetitions)
+    for name, result in results.items():
+        print(f'{name:<22} {result["min"]:10.4f} {result["unit"]} (median {result["median"]:.4f})')
+    for name, reason in skipped:
+        print(f'{name:<22} skipped: {reason}')
+
+    if args.save:
+        os.makedirs(BASELINES_FOLDER, exist_ok=True)
+        baseline = {
+            'date': datetime.date.today().isoformat(),
+            'machine': machine_info(),
+            'random_robots': args.random_robots,
+            'results': results,
+            'skipped': [name for name, _reason in skipped],
+        }
+        with open(os.path.join(BASELINES_FOLDER, f'{args.save}.json'), 'w') as f:
+            json.dump(baseline, f, indent=2)
+
+    if args.compare:
+        with open(os.path.join(BASELINES_FOLDER, f'{args.compare}.json')) as f:
+            baseline = json.load(f)
+        if baseline['machine'] != machine_info():
+            print(f'Warning: the baseline was measured on another machine: {baseline["machine"]}')
+        if baseline['random_robots'] != args.random_robots:
+            print(f'Warning: the baseline was measured with {baseline["random_robots"]} random robots')
+        if len(compare(results, baseline, args.tolerance)) > 0:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Measures the import time of the modules used as entry points, with `python -X importtime`, in fresh processes.
+
+For each entry point it reports the best total import time of a few runs, which heavy optional dependencies
+were imported and, with --details, the modules taking the most time.
+
+Usage:
+    python benchmarks/benchmark_import_time.py
+    python benchmarks/benchmark_import_time.py pyrevolve.revolve_bot --details 20
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+ENTRY_POINTS = [
+    'pyrevolve.SDF.math',
+    'pyrevolve.revolve_bot',
+    'pyrevolve.genotype.plasticoding.plasticoding',
+    'pyrevolve.evolution.population',
+    'pyrevolve.experiment_management',
+    'pyrevolve.util.supervisor.simulator_queue',
+    'pyrevolve.data_analisys.consolidate_experiments',
+    'pyrevolve.data_analisys.visualize_robot',
+]
+
+HEAVY_DEPENDENCIES = ['cairo', 'graphviz', 'yaml', 'pygazebo', 'psutil', 'matplotlib', 'pandas']
+
+
+def import_times(module):
+    """
+    :param module: module imported in a new python process
+    :return: dictionary of the imported modules with their (self, cumulative) import time in microseconds,
+     or None if the import failed, and the error output
+    """
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                             cwd=ROOT_FOLDER, stderr=subprocess.PIPE, stdout=subprocess.DEVNULL, text=True)
+    times = {}
+    errors = []
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:'):
+            errors.append(line)
+            continue
+        fields = line[len('import time:'):].split('|')
+        if not fields[0].strip().isdigit():
+            # header
+            continue
+        times[fields[2].strip()] = (int(fields[0]), int(fields[1]))
+    if process.returncode != 0:
+        return None, '\n'.join(errors)
+    return times, ''
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measures the import time of the entry points of pyrevolve')
+    parser.add_argument('modules', nargs='*', help='modules to import, by default the main entry points')
+    parser.add_argument('--repetitions', default=5, type=int, help='imports of each module. Default "5".')
+    parser.add_argument('--details', default=0, type=int,
+                        help='number of the slowest modules to list for each entry point. Default "0".')
+    args = parser.parse_args()
+
+    for module in args.modules or ENTRY_POINTS:
+        runs = []
+        for _ in range(args.repetitions):
+            times, error = import_times(module)
+            if times is None:
+                break
+            runs.append(times)
+        if len(runs) == 0:
+            print(f'{module:<48} failed: {error.splitlines()[-1] if error else ""}')
+            continue
+
+        best = min(runs, key=lambda times: times[module][1])
+        heavy = [name for name in HEAVY_DEPENDENCIES if name in best]
+        print(f'{module:<48} {best[module][1] / 1000:8.1f} ms   imports: {", ".join(heavy) or "-"}')
+        if args.details > 0:
+            slowest = sorted(best.items(), key=lambda item: -item[1][0])[:args.details]
+            for name, (self_time, cumulative) in slowest:
+                print(f'    {name:<60} self {self_time / 1000:7.1f} ms   cumulative {cumulative / 1000:7.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
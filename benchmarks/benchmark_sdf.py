@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Compares the time of `revolve_bot_to_sdf` and `revolve_bot_to_sdf_fast` on developed plasticoding robots,
+and checks that they generate equivalent sdf.
+
+Usage: python benchmarks/benchmark_sdf.py [number of random robots] [repetitions]
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pyrevolve import SDF
+from pyrevolve.genotype.plasticoding import initialization
+from pyrevolve.genotype.plasticoding.plasticoding import Plasticoding, PlasticodingConfig
+
+GENOTYPES_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'test_py', 'plasticonding')
+
+
+def robots(n_random):
+    conf = PlasticodingConfig()
+    for genotype_id in (176, 180):
+        genotype = Plasticoding(conf, genotype_id)
+        genotype.load_genotype(os.path.join(GENOTYPES_FOLDER, 'genotype_{}.txt'.format(genotype_id)))
+        yield genotype.develop()
+    for seed in range(n_random):
+        random.seed(seed)
+        yield initialization.random_initialization(conf, seed).develop()
+
+
+def main(n_random=100, repetitions=5):
+    pose = SDF.math.Vector3(0, 0, 0.25)
+    population = list(robots(n_random))
+    for robot in population:
+        robot.update_substrate()
+        reference = SDF.revolve_bot_to_sdf(robot, pose, None)
+        if not SDF.sdf_equivalent(reference, SDF.revolve_bot_to_sdf_fast(robot, pose, None)):
+            raise AssertionError('sdf of robot {} differs'.format(robot.id))
+
+    n_modules = sum(robot.size() for robot in population)
+    print('{} robots, {} modules'.format(len(population), n_modules))
+    for builder in (SDF.revolve_bot_to_sdf, SDF.revolve_bot_to_sdf_fast):
+        seconds = min(timeit.repeat(lambda: [builder(robot, pose, None) for robot in population],
+                                    repeat=repetitions, number=1))
+        print('{:<24} {:8.2f} ms/robot'.format(builder.__name__, 1000 * seconds / len(population)))
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -14,6 +14,7 @@ from pyrevolve.genotype.plasticoding.mutation.mutation import MutationConfig
 from pyrevolve.genotype.plasticoding.mutation.standard_mutation import standard_mutation
 from pyrevolve.genotype.plasticoding.plasticoding import PlasticodingConfig
 from pyrevolve.util.supervisor.analyzer_queue import AnalyzerQueue
+from pyrevolve.util.supervisor.distributed import DistributedSimulatorQueue
 from pyrevolve.util.supervisor.simulator_queue import SimulatorQueue
 from pyrevolve.custom_logging.logger import logger
 
@@ -81,7 +82,10 @@ async def run():
     n_cores = settings.n_cores
 
     settings = parser.parse_args()
-    simulator_queue = SimulatorQueue(n_cores, settings, settings.port_start)
+    if settings.distributed_port is not None:
+        simulator_queue = DistributedSimulatorQueue(settings)
+    else:
+        simulator_queue = SimulatorQueue(n_cores, settings, settings.port_start)
     await simulator_queue.start()
 
     analyzer_queue = AnalyzerQueue(1, settings, settings.port_start+n_cores)
@@ -104,16 +108,16 @@ async def run():
             else:
                 population = await population.next_gen(gen_num, individuals)
 
-            experiment_management.export_snapshots(population.individuals, gen_num)
+            experiment_management.export_snapshots(population.individuals, gen_num, population.next_robot_id)
     else:
         # starting a new experiment
         experiment_management.create_exp_folders()
         await population.init_pop()
-        experiment_management.export_snapshots(population.individuals, gen_num)
+        experiment_management.export_snapshots(population.individuals, gen_num, population.next_robot_id)
 
     while gen_num < num_generations-1:
         gen_num += 1
         population = await population.next_gen(gen_num)
-        experiment_management.export_snapshots(population.individuals, gen_num)
+        experiment_management.export_snapshots(population.individuals, gen_num, population.next_robot_id)
 
     # output result after completing all generations...
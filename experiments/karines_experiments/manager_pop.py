@@ -104,16 +104,16 @@ async def run():
             else:
                 population = await population.next_gen(gen_num, individuals)
 
-            experiment_management.export_snapshots(population.individuals, gen_num)
+            experiment_management.export_snapshots(population.individuals, gen_num, population.next_robot_id)
     else:
         # starting a new experiment
         experiment_management.create_exp_folders()
         await population.init_pop()
-        experiment_management.export_snapshots(population.individuals, gen_num)
+        experiment_management.export_snapshots(population.individuals, gen_num, population.next_robot_id)
 
     while gen_num < num_generations-1:
         gen_num += 1
         population = await population.next_gen(gen_num)
-        experiment_management.export_snapshots(population.individuals, gen_num)
+        experiment_management.export_snapshots(population.individuals, gen_num, population.next_robot_id)
 
     # output result after completing all generations...
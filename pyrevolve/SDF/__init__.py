@@ -1,3 +1,4 @@
+import importlib
 import xml.etree.ElementTree
 
 from .pose import Pose, Posable
@@ -7,7 +8,24 @@ from .inertial import Inertial
 from .joint import Joint
 from .sensor import CameraSensor, TouchSensor, IMUSensor
 from . import math
-from .revolve_bot_sdf_builder import revolve_bot_to_sdf
+from . import fragments
+
+# the builders import pyrevolve.revolve_bot, so they are imported on first use, and importing SDF.math stays cheap
+_BUILDERS = {
+    'revolve_bot_to_sdf': 'revolve_bot_sdf_builder',
+    'revolve_bot_to_sdf_fast': 'revolve_bot_sdf_fast',
+    'revolve_bot_sdf_template': 'revolve_bot_sdf_fast',
+    'stamp_sdf_template': 'revolve_bot_sdf_fast',
+    'sdf_equivalent': 'revolve_bot_sdf_fast',
+}
+
+
+def __getattr__(name):
+    if name in _BUILDERS:
+        module = importlib.import_module(f'.{_BUILDERS[name]}', __name__)
+        value = globals()[name] = getattr(module, name)
+        return value
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 
 def sub_element_text(parent, name, text):
@@ -0,0 +1,96 @@
+"""
+Cache of the sdf elements that are the same for all the modules of a type.
+
+The elements returned are shared between all the models that use them, so they must not be modified.
+"""
+import functools
+import xml.etree.ElementTree
+
+import numpy as np
+
+from pyrevolve import SDF
+
+
+@functools.lru_cache(maxsize=None)
+def surface_properties():
+    return SDF.geometry.SurfaceProperties()
+
+
+@functools.lru_cache(maxsize=None)
+def mesh_geometry(mesh_uri):
+    return SDF.MeshGeometry(mesh_uri)
+
+
+@functools.lru_cache(maxsize=None)
+def box_geometry(box_size):
+    """
+    :param box_size: tuple of 3 elements with the 3 sizes (x,y,z)
+    """
+    return SDF.BoxGeometry(box_size)
+
+
+def material(rgb):
+    """
+    Material of a visual element
+    :param rgb: color of the material
+    """
+    return _material(tuple(rgb))
+
+
+@functools.lru_cache(maxsize=None)
+def _material(rgb):
+    return SDF.geometry.Material(
+        ambient=(rgb[0], rgb[1], rgb[2], 1.0),
+        diffuse=(rgb[0], rgb[1], rgb[2], 1.0),
+        specular=(0.1, 0.1, 0.1, 1.0),
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def joint_axis(axis):
+    """
+    :param axis: tuple with the direction (x,y,z) of the axis
+    """
+    return SDF.joint.JointAxis(axis)
+
+
+@functools.lru_cache(maxsize=None)
+def servomotor_pid():
+    pid = xml.etree.ElementTree.Element('rv:pid')
+    SDF.sub_element_text(pid, 'rv:p', 0.9)
+    SDF.sub_element_text(pid, 'rv:i', 0.0)
+    SDF.sub_element_text(pid, 'rv:d', 0.0)
+    SDF.sub_element_text(pid, 'rv:i_max', 0.0)
+    SDF.sub_element_text(pid, 'rv:i_min', 0.0)
+    # SDF.sub_element_text(pid, 'rv:cmd_max', 0.0)
+    # SDF.sub_element_text(pid, 'rv:cmd_min', 0.0)
+    return pid
+
+
+@functools.lru_cache(maxsize=None)
+def box_inertia(mass, box_size):
+    """
+    Inertia tensor of a solid box
+    :param mass: mass of the box
+    :param box_size: tuple of 3 elements with the 3 sizes (x,y,z)
+    :return: read-only 3x3 numpy array
+    """
+    r = mass / 12.0
+    x, y, z = box_size
+    inertia = np.array([
+        [r * (y ** 2 + z ** 2), 0.0, 0.0],
+        [0.0, r * (x ** 2 + z ** 2), 0.0],
+        [0.0, 0.0, r * (x ** 2 + y ** 2)],
+    ])
+    inertia.flags.writeable = False
+    return inertia
+
+
+@functools.lru_cache(maxsize=None)
+def to_string(element):
+    """
+    Serialization of a cached element
+    :param element: element returned by one of the functions of this module
+    :return: xml string
+    """
+    return xml.etree.ElementTree.tostring(element, encoding='unicode')
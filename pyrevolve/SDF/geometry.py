@@ -47,12 +47,7 @@ class Visual(SDF.Posable):
         super().__init__('visual', {
             'name': '{}_visual'.format(name)
         }, position, rotation)
-        material = Material(
-            ambient=(rgb[0], rgb[1], rgb[2], 1.0),
-            diffuse=(rgb[0], rgb[1], rgb[2], 1.0),
-            specular=(0.1, 0.1, 0.1, 1.0),
-        )
-        self.append(material)
+        self.append(SDF.fragments.material(rgb))
 
 
 class SurfaceProperties(xml.etree.ElementTree.Element):
@@ -95,8 +90,7 @@ class Collision(SDF.Posable):
         self.mass = mass
         self._box_geometry = None
 
-        surface_properties = SurfaceProperties()
-        self.append(surface_properties)
+        self.append(SDF.fragments.surface_properties())
 
     def append(self, module):
         super().append(module)
@@ -115,6 +109,12 @@ class Collision(SDF.Posable):
             (self._box_geometry[2] / -2.0, self._box_geometry[2] / 2.0),  # Z
         )
 
+    def get_inertia_matrix(self):
+        """
+        Return solid box inertia tensor
+        """
+        return SDF.fragments.box_inertia(self.mass, self._box_geometry)
+
     def get_inertial(self):
         """
         Return solid box inertial
@@ -56,14 +56,7 @@ class Joint(SDF.Posable):
         if self._coordinates is not None:
             servomotor.attrib['coordinates'] = ';'.join(str(i) for i in self._coordinates)
 
-        pid = xml.etree.ElementTree.SubElement(servomotor, 'rv:pid')
-        SDF.sub_element_text(pid, 'rv:p', 0.9)
-        SDF.sub_element_text(pid, 'rv:i', 0.0)
-        SDF.sub_element_text(pid, 'rv:d', 0.0)
-        SDF.sub_element_text(pid, 'rv:i_max', 0.0)
-        SDF.sub_element_text(pid, 'rv:i_min', 0.0)
-        # SDF.sub_element_text(pid, 'rv:cmd_max', 0.0)
-        # SDF.sub_element_text(pid, 'rv:cmd_min', 0.0)
+        servomotor.append(SDF.fragments.servomotor_pid())
 
         return servomotor
 
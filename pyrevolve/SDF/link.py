@@ -90,7 +90,7 @@ class Link(SDF.Posable):
             total_mass += mass
             i_final += transform_inertia_tensor(
                 mass,
-                collision.get_inertial().get_matrix(),
+                collision.get_inertia_matrix(),
                 position,
                 rotation
             )
@@ -67,13 +67,6 @@ def revolve_bot_to_sdf(robot, robot_pose, nice_format, self_collide=True):
     model.append(plugin_elem)
 
     # XML RENDER PHASE #
-    def prettify(rough_string, indent='\t'):
-        """Return a pretty-printed XML string for the Element.
-        """
-        import xml.dom.minidom
-        reparsed = xml.dom.minidom.parseString(rough_string)
-        return reparsed.toprettyxml(indent=indent)
-
     res = xml.etree.ElementTree.tostring(sdf_root, encoding='utf8', method='xml')
 
     if nice_format is not None:
@@ -84,6 +77,14 @@ def revolve_bot_to_sdf(robot, robot_pose, nice_format, self_collide=True):
     return res
 
 
+def prettify(rough_string, indent='\t'):
+    """Return a pretty-printed XML string for the Element.
+    """
+    import xml.dom.minidom
+    reparsed = xml.dom.minidom.parseString(rough_string)
+    return reparsed.toprettyxml(indent=indent)
+
+
 def _sdf_attach_module(module_slot, module_orientation: float,
                        visual, collision,
                        parent_slot, parent_collision):
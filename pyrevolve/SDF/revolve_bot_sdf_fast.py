@@ -0,0 +1,434 @@
+"""
+Fast SDF generation for a RevolveBot, equivalent to `revolve_bot_to_sdf`.
+
+Instead of building a tree of `Posable` elements and aligning them one by one with quaternions,
+the poses of all visuals, collisions, sensors and joints are computed as plain rotation matrices
+in the model frame. Centers of mass, inertias and roll/pitch/yaw angles are then computed for all
+the elements at once, and the xml is written with string templates.
+
+The output is equivalent to the one of `revolve_bot_to_sdf` up to floating point noise,
+see `sdf_equivalent`.
+"""
+import math
+import xml.etree.ElementTree
+from xml.sax.saxutils import escape
+
+import numpy as np
+
+from pyrevolve import SDF
+from pyrevolve.SDF import fragments
+from pyrevolve.revolve_bot.revolve_module import RevolveModule, CoreModule, ActiveHingeModule, TouchSensorModule
+from pyrevolve.revolve_bot.revolve_module import Orientation
+from .revolve_bot_sdf_builder import prettify
+
+_XML_DECLARATION = "<?xml version='1.0' encoding='utf8'?>\n"
+_POSE = '<pose>{:e} {:e} {:e} {:e} {:e} {:e}</pose>'
+_VISUAL = '<visual name={}>{}{}{}</visual>'
+_COLLISION = '<collision name={}>{}{}{}</collision>'
+_IMU_SENSOR = '<sensor name={} type="imu">{}<always_on>True</always_on></sensor>'
+_TOUCH_SENSOR = '<sensor name={} type="contact">{}' \
+                '<contact><collision>{}</collision></contact><always_on>True</always_on></sensor>'
+_INERTIAL = '<inertial>{}<mass>{}</mass><inertia>' \
+            '<ixx>{}</ixx><ixy>{}</ixy><ixz>{}</ixz><iyy>{}</iyy><iyz>{}</iyz><izz>{}</izz>' \
+            '</inertia></inertial>'
+_JOINT = '<joint name={} type="revolute">{}<parent>{}</parent><child>{}</child>{}</joint>'
+_ROBOT_CONFIG_SENSOR = '<rv:sensor link={} sensor={} type={} id={} part_id={} />'
+_ROBOT_CONFIG_SERVOMOTOR = '<rv:servomotor type="position" id={} part_id={} part_name={} joint={}{}>{}</rv:servomotor>'
+
+
+def _attrib(value):
+    return '"{}"'.format(escape(str(value), {'"': '&quot;', '\r': '&#13;', '\n': '&#10;', '\t': '&#09;'}))
+
+
+def _text(value):
+    """Same formatting as `SDF.sub_element_text`"""
+    if type(value) is float or type(value) is int:
+        return '{:e}'.format(value)
+    return escape(str(value))
+
+
+# Slots of the module types, as (position, normal, tangent) numpy arrays
+_SLOTS = {}
+
+
+def _slot(module, boxslot, orientation):
+    key = (type(module), boxslot, orientation)
+    if key not in _SLOTS:
+        slot = getattr(module, boxslot)(orientation)
+        _SLOTS[key] = (slot.pos.data.copy(), slot.normal.data.copy(), slot.tangent.data.copy())
+    return _SLOTS[key]
+
+
+def _normalized(vector):
+    return vector / np.linalg.norm(vector)
+
+
+def _align(my_slot, orientation, at_slot, of_rotation, of_position):
+    """
+    Pose that attaches `my_slot` to `at_slot` of the element posed at `of_rotation`, `of_position`,
+    like `Posable.align`.
+    :return: rotation matrix, position
+    """
+    my_pos, my_normal, my_tangent = my_slot
+    at_pos, at_normal, at_tangent = at_slot
+
+    if orientation is not None:
+        # rotate the tangent around the normal (Rodrigues' formula)
+        angle = orientation / 180.0 * math.pi
+        axis = _normalized(my_normal)
+        my_tangent = my_tangent * math.cos(angle) \
+            + np.cross(axis, my_tangent) * math.sin(angle) \
+            + axis * axis.dot(my_tangent) * (1.0 - math.cos(angle))
+
+    my_x = _normalized(my_normal)
+    my_y = _normalized(my_tangent)
+    at_x = _normalized(of_rotation.dot(-at_normal))
+    at_y = _normalized(of_rotation.dot(at_tangent))
+    my_frame = np.column_stack((my_x, my_y, np.cross(my_x, my_y)))
+    at_frame = np.column_stack((at_x, at_y, np.cross(at_x, at_y)))
+
+    rotation = at_frame.dot(my_frame.T)
+    position = of_rotation.dot(at_pos) + of_position - rotation.dot(my_pos)
+    return rotation, position
+
+
+def _rpy(rotations):
+    """
+    Vectorized `euler_from_matrix(matrix, 'sxyz')`
+    :param rotations: array of shape (n, 3, 3)
+    :return: array of shape (n, 3) of roll, pitch and yaw
+    """
+    cy = np.sqrt(rotations[:, 0, 0] ** 2 + rotations[:, 1, 0] ** 2)
+    gimbal_lock = cy <= np.finfo(float).eps * 40.0
+    roll = np.where(gimbal_lock,
+                    np.arctan2(-rotations[:, 1, 2], rotations[:, 1, 1]),
+                    np.arctan2(rotations[:, 2, 1], rotations[:, 2, 2]))
+    pitch = np.arctan2(-rotations[:, 2, 0], cy)
+    yaw = np.where(gimbal_lock, 0.0, np.arctan2(rotations[:, 1, 0], rotations[:, 0, 0]))
+    return np.column_stack((roll, pitch, yaw))
+
+
+class _SDFModel:
+    """
+    Poses and elements of a robot model, before rendering
+    """
+
+    def __init__(self, self_collide):
+        self.self_collide = self_collide
+        self.rotations = []
+        self.positions = []
+        # link whose center of mass each pose is relative to
+        self.pose_links = []
+        self.links = []
+        self.joints = []
+        self.collisions = []
+        self.sensors = []
+
+    def add_pose(self, link, rotation=None, position=None):
+        self.rotations.append(np.identity(3) if rotation is None else rotation)
+        self.positions.append(np.zeros(3) if position is None else position)
+        self.pose_links.append(link)
+        return len(self.positions) - 1
+
+    def add_link(self, name):
+        self.links.append((name, []))
+        return len(self.links) - 1
+
+    def add_visual(self, link, name, rgb, mesh, pose):
+        self.links[link][1].append(('visual', pose, '{}_visual'.format(name), rgb, mesh))
+
+    def add_collision(self, link, name, mass, box, pose):
+        self.links[link][1].append(('collision', pose, '{}_collision'.format(name), box))
+        self.collisions.append((link, pose, mass, box))
+
+    def add_sensor(self, link, name, sensor_type, module, collision_name=None):
+        pose = self.add_pose(link)
+        self.links[link][1].append(('sensor', pose, name, sensor_type, collision_name))
+        self.sensors.append((self.links[link][0], name, sensor_type, module.id))
+
+    def add_joint(self, module, name, parent_link, child_link, pose):
+        self.joints.append((pose, name, self.links[parent_link][0], self.links[child_link][0],
+                            module.JOINT_AXIS, module.id, module.substrate_coordinates))
+
+    def add_module(self, module, link, parent_slot, parent_collision, slot_chain):
+        """
+        Adds the elements of a module attached to `parent_slot` of the `parent_collision` pose
+        :return: link and collision pose the children of the module are attached to
+        """
+        of_rotation = self.rotations[parent_collision]
+        of_position = self.positions[parent_collision]
+
+        if type(module) is ActiveHingeModule:
+            name_frame = 'component_{}_{}__frame'.format(slot_chain, module.TYPE)
+            name_joint = 'component_{}_{}__joint'.format(slot_chain, module.TYPE)
+            name_servo = 'component_{}_{}__servo'.format(slot_chain, module.TYPE)
+            name_servo2 = 'component_{}_{}__servo2'.format(slot_chain, module.TYPE)
+            child_link = self.add_link('{}_Leg'.format(slot_chain))
+
+            frame_rotation, frame_position = _align(_slot(module, 'boxslot_frame', Orientation.SOUTH),
+                                                    module.orientation, parent_slot, of_rotation, of_position)
+            frame = self.add_pose(link, frame_rotation, frame_position)
+            self.add_visual(link, name_frame, module.rgb, module.VISUAL_MESH_FRAME, frame)
+            self.add_collision(link, name_frame, module.MASS_FRAME, module.COLLISION_BOX_FRAME, frame)
+
+            servo_rotation, servo_position = _align(_slot(module, 'boxslot_servo', Orientation.SOUTH), None,
+                                                    _slot(module, 'boxslot_frame', Orientation.NORTH),
+                                                    frame_rotation, frame_position)
+            visual_servo = self.add_pose(child_link, servo_rotation, servo_position)
+            collision_servo_position = servo_position + servo_rotation.dot(module.COLLISION_POSITION_SERVO)
+            collision_servo = self.add_pose(child_link, servo_rotation, collision_servo_position)
+            collision_servo_2 = self.add_pose(
+                child_link, servo_rotation,
+                collision_servo_position + servo_rotation.dot(module.COLLISION_POSITION_SERVO_2))
+            self.add_visual(child_link, name_servo, module.rgb, module.VISUAL_MESH_SERVO, visual_servo)
+            self.add_collision(child_link, name_servo, module.MASS_SERVO, module.COLLISION_BOX_SERVO,
+                               collision_servo)
+            self.add_collision(child_link, name_servo2, module.MASS_SERVO_2, module.COLLISION_BOX_SERVO_2,
+                               collision_servo_2)
+
+            joint = self.add_pose(child_link, servo_rotation,
+                                  servo_position + servo_rotation.dot(module.JOINT_POSITION))
+            self.add_joint(module, name_joint, link, child_link, joint)
+            return child_link, collision_servo
+
+        if type(module).to_sdf is TouchSensorModule.to_sdf:
+            name = 'component_{}_{}'.format(slot_chain, module.TYPE)
+            self.add_sensor(link, 'sensor_{}_{}'.format(slot_chain, module.TYPE), 'contact', module,
+                            '{}_collision'.format(name))
+        else:
+            name = 'component_{}_{}__box'.format(slot_chain, module.TYPE)
+        rotation, position = _align(_slot(module, 'boxslot', Orientation.SOUTH),
+                                    module.orientation, parent_slot, of_rotation, of_position)
+        pose = self.add_pose(link, rotation, position)
+        self.add_visual(link, name, module.rgb, module.VISUAL_MESH, pose)
+        self.add_collision(link, name, module.MASS, module.COLLISION_BOX, pose)
+        return link, pose
+
+    def render(self, robot, robot_pose, brain):
+        n_links = len(self.links)
+        rotations = np.array(self.rotations)
+        positions = np.array(self.positions)
+        pose_links = np.array(self.pose_links)
+
+        # centers of mass of the links, all the poses of a link are moved relative to it
+        collision_links = np.array([collision[0] for collision in self.collisions])
+        collision_poses = np.array([collision[1] for collision in self.collisions])
+        masses = np.array([collision[2] for collision in self.collisions], dtype=float)
+        boxes = np.array([collision[3] for collision in self.collisions], dtype=float)
+        total_masses = np.bincount(collision_links, weights=masses, minlength=n_links)
+        centers_of_mass = np.column_stack([
+            np.bincount(collision_links, weights=masses * positions[collision_poses, i], minlength=n_links)
+            for i in range(3)
+        ])
+        has_mass = total_masses > 0
+        centers_of_mass[has_mass] /= total_masses[has_mass, None]
+        positions -= centers_of_mass[pose_links]
+
+        # solid box inertias moved to the center of mass of the links (parallel axis theorem)
+        box_inertias = masses[:, None] / 12.0 * np.column_stack((
+            boxes[:, 1] ** 2 + boxes[:, 2] ** 2,
+            boxes[:, 0] ** 2 + boxes[:, 2] ** 2,
+            boxes[:, 0] ** 2 + boxes[:, 1] ** 2,
+        ))
+        collision_rotations = rotations[collision_poses]
+        displacements = positions[collision_poses]
+        inertias = np.einsum('nij,nj,nkj->nik', collision_rotations, box_inertias, collision_rotations)
+        inertias += masses[:, None, None] * (
+            np.einsum('ni,ni->n', displacements, displacements)[:, None, None] * np.identity(3)
+            - np.einsum('ni,nj->nij', displacements, displacements))
+        link_inertias = np.zeros((n_links, 3, 3))
+        np.add.at(link_inertias, collision_links, inertias)
+
+        rpys = _rpy(rotations)
+        surface = fragments.to_string(fragments.surface_properties())
+        identity_rpy = SDF.math.Quaternion().get_rpy()
+
+        def pose(index):
+            return _POSE.format(*positions[index], *rpys[index])
+
+        joints = ''.join(
+            _JOINT.format(_attrib(name), pose(joint_pose), _text(parent), _text(child),
+                          fragments.to_string(fragments.joint_axis(axis)))
+            for joint_pose, name, parent, child, axis, _, _ in self.joints
+        )
+
+        links = []
+        for i, (link_name, elements) in enumerate(self.links):
+            link = ['<link name={}>'.format(_attrib(link_name)),
+                    _POSE.format(*centers_of_mass[i], *identity_rpy),
+                    '<self_collide>{}</self_collide>'.format(_text(self.self_collide))]
+            for element in elements:
+                kind, element_pose, name = element[:3]
+                if kind == 'visual':
+                    rgb, mesh = element[3:]
+                    link.append(_VISUAL.format(_attrib(name), pose(element_pose),
+                                               fragments.to_string(fragments.material(rgb)),
+                                               fragments.to_string(fragments.mesh_geometry(mesh))))
+                elif kind == 'collision':
+                    box = element[3]
+                    link.append(_COLLISION.format(_attrib(name), pose(element_pose), surface,
+                                                  fragments.to_string(fragments.box_geometry(box))))
+                elif element[3] == 'imu':
+                    link.append(_IMU_SENSOR.format(_attrib(name), pose(element_pose)))
+                else:
+                    link.append(_TOUCH_SENSOR.format(_attrib(name), pose(element_pose), _text(element[4])))
+            inertia = link_inertias[i]
+            link.append(_INERTIAL.format(
+                _POSE.format(0.0, 0.0, 0.0, *identity_rpy), _text(float(total_masses[i])),
+                _text(inertia[0, 0]), _text(inertia[0, 1]), _text(inertia[0, 2]),
+                _text(inertia[1, 1]), _text(inertia[1, 2]), _text(inertia[2, 2])))
+            link.append('</link>')
+            links.append(''.join(link))
+
+        return ''.join((
+            _XML_DECLARATION,
+            '<sdf version="1.6"><model name={}>'.format(_attrib(robot.id)),
+            _POSE.format(*robot_pose, *identity_rpy),
+            joints,
+            ''.join(links),
+            self.render_plugin(brain),
+            '</model></sdf>',
+        ))
+
+    def render_plugin(self, brain):
+        """Same as `_sdf_brain_plugin_conf`"""
+        learner = brain.learner_sdf()
+        controller = brain.controller_sdf()
+        learner = '<rv:learner type="None" />' if learner is None \
+            else xml.etree.ElementTree.tostring(learner, encoding='unicode')
+        controller = '<rv:controller type="None" />' if controller is None \
+            else xml.etree.ElementTree.tostring(controller, encoding='unicode')
+
+        sensors = ''.join(
+            _ROBOT_CONFIG_SENSOR.format(_attrib(link), _attrib(name), _attrib(sensor_type),
+                                        _attrib('{}_sensor'.format(link)), _attrib(part_id))
+            for link, name, sensor_type, part_id in self.sensors
+        )
+        actuators = ''.join(
+            _ROBOT_CONFIG_SERVOMOTOR.format(
+                _attrib('{}__rotate'.format(part_id)), _attrib(part_id), _attrib(name), _attrib(name),
+                '' if coordinates is None else ' coordinates={}'.format(_attrib(';'.join(str(i) for i in coordinates))),
+                fragments.to_string(fragments.servomotor_pid()))
+            for _, name, _, _, _, part_id, coordinates in self.joints
+        )
+
+        return ''.join((
+            '<plugin name="robot_controller" filename="libRobotControlPlugin.so">',
+            '<rv:robot_config xmlns:rv="https://github.com/ci-group/revolve">',
+            '<rv:update_rate>{}</rv:update_rate>'.format(_text(8.0)),
+            '<rv:brain>', learner, controller,
+            '<rv:sensors>{}</rv:sensors>'.format(sensors) if sensors else '<rv:sensors />',
+            '<rv:actuators>{}</rv:actuators>'.format(actuators) if actuators else '<rv:actuators />',
+            '</rv:brain></rv:robot_config></plugin>',
+        ))
+
+
+def _supported(module):
+    if type(module) is ActiveHingeModule:
+        return True
+    return type(module).to_sdf in (RevolveModule.to_sdf, TouchSensorModule.to_sdf)
+
+
+def revolve_bot_to_sdf_fast(robot, robot_pose, nice_format, self_collide=True):
+    """
+    Fast version of `revolve_bot_to_sdf`, with the same arguments.
+    Robots with module types that define their own sdf are generated with `revolve_bot_to_sdf`.
+    :return: sdf string
+    """
+    assert (robot.id is not None)
+    body = robot._body
+    if type(body).to_sdf is not CoreModule.to_sdf \
+            or not all(_supported(module) for module in robot._iter_all_elements() if module is not body):
+        return SDF.revolve_bot_to_sdf(robot, robot_pose, nice_format, self_collide)
+
+    model = _SDFModel(self_collide)
+    core_link = model.add_link('Core')
+    model.add_sensor(core_link, 'core-imu_sensor', 'imu', body)
+    core_name = 'component__{}__box'.format(body.TYPE)
+    core_pose = model.add_pose(core_link)
+    model.add_visual(core_link, core_name, body.rgb, body.VISUAL_MESH, core_pose)
+    model.add_collision(core_link, core_name, body.MASS, body.COLLISION_BOX, core_pose)
+
+    # depth first, in the same order as `revolve_bot_to_sdf`
+    to_process = []
+    for slot, child in reversed(list(body.iter_children())):
+        if child is not None:
+            orientation = Orientation(slot)
+            to_process.append((child, core_link, _slot(body, 'boxslot', orientation), core_pose,
+                               orientation.short_repr()))
+    while len(to_process) > 0:
+        module, link, parent_slot, parent_collision, slot_chain = to_process.pop()
+        link, collision = model.add_module(module, link, parent_slot, parent_collision, slot_chain)
+        for slot, child in reversed(list(module.iter_children())):
+            if child is not None:
+                orientation = Orientation(slot)
+                to_process.append((child, link, _slot(module, 'boxslot', orientation), collision,
+                                   slot_chain + orientation.short_repr()))
+
+    res = model.render(robot, robot_pose, robot._brain)
+    if nice_format is not None:
+        res = prettify(res.encode('utf8'), nice_format)
+    return res
+
+
+def revolve_bot_sdf_template(robot, self_collide=True):
+    """
+    Sdf of the robot without the pose of the model, that can be reused for any pose with `stamp_sdf_template`
+    :return: tuple with the sdf before and after the pose of the model
+    """
+    sdf = revolve_bot_to_sdf_fast(robot, SDF.math.Vector3(0, 0, 0), None, self_collide)
+    # the pose of the model is its first child
+    start = sdf.index('<pose>')
+    end = sdf.index('</pose>', start) + len('</pose>')
+    return sdf[:start], sdf[end:]
+
+
+def stamp_sdf_template(template, robot_pose, nice_format=None):
+    """
+    :param template: template generated by `revolve_bot_sdf_template`
+    :param robot_pose: position of the model
+    :param nice_format: indentation string if the sdf should be pretty-printed
+    :return: sdf string, same as `revolve_bot_to_sdf_fast`
+    """
+    head, tail = template
+    pose = xml.etree.ElementTree.tostring(SDF.Pose(robot_pose), encoding='unicode')
+    res = head + pose + tail
+    if nice_format is not None:
+        res = prettify(res.encode('utf8'), nice_format)
+    return res
+
+
+def sdf_equivalent(sdf_a, sdf_b, rtol=1e-5, atol=1e-9):
+    """
+    Checks that two sdf strings describe the same model: same elements, attributes and texts,
+    numbers are compared with a tolerance, and poses are compared by their rotation matrix
+    since different roll/pitch/yaw angles can describe the same rotation.
+    :return: True if the two sdf are equivalent
+    """
+    def numbers(text):
+        try:
+            return np.array([float(value) for value in text.split()])
+        except ValueError:
+            return None
+
+    def equivalent(a, b):
+        if a.tag != b.tag or a.attrib != b.attrib or len(a) != len(b):
+            return False
+        text_a, text_b = (a.text or '').strip(), (b.text or '').strip()
+        if text_a != text_b:
+            values_a, values_b = numbers(text_a), numbers(text_b)
+            if values_a is None or values_b is None or values_a.shape != values_b.shape:
+                return False
+            if a.tag == 'pose' and len(values_a) == 6:
+                if not np.allclose(values_a[:3], values_b[:3], rtol=rtol, atol=atol):
+                    return False
+                rotation_a = SDF.math.Quaternion.from_rpy(*values_a[3:]).get_matrix()[:3, :3]
+                rotation_b = SDF.math.Quaternion.from_rpy(*values_b[3:]).get_matrix()[:3, :3]
+                if not np.allclose(rotation_a, rotation_b, rtol=rtol, atol=rtol):
+                    return False
+            elif not np.allclose(values_a, values_b, rtol=rtol, atol=atol):
+                return False
+        return all(equivalent(child_a, child_b) for child_a, child_b in zip(a, b))
+
+    return equivalent(xml.etree.ElementTree.fromstring(sdf_a.encode('utf8')),
+                      xml.etree.ElementTree.fromstring(sdf_b.encode('utf8')))
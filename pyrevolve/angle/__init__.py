@@ -3,8 +3,24 @@ See README.md for information on Revolve.Angle
 """
 from __future__ import absolute_import
 
-from .generate import TreeGenerator
-from .evolve import Crossover, Mutator
-from .representation import Tree, Node
-from .manage import WorldManager, RobotManager
+import importlib
+
 __author__ = 'Elte Hupkes'
+
+# the classes are imported on first use, since most of them pull in the Gazebo messages (pygazebo)
+_MODULES = {
+    'TreeGenerator': '.generate',
+    'Crossover': '.evolve',
+    'Mutator': '.evolve',
+    'Tree': '.representation',
+    'Node': '.representation',
+    'WorldManager': '.manage',
+    'RobotManager': '.manage',
+}
+
+
+def __getattr__(name):
+    if name in _MODULES:
+        value = globals()[name] = getattr(importlib.import_module(_MODULES[name], __name__), name)
+        return value
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -1,4 +1,11 @@
 from __future__ import absolute_import
 
 from .robotmanager import RobotManager
-from .world import WorldManager
+
+
+def __getattr__(name):
+    # the world manager is imported on first use, since it pulls in the Gazebo transport (pygazebo)
+    if name == 'WorldManager':
+        from .world import WorldManager
+        return WorldManager
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -104,12 +104,49 @@ parser.add_argument(
     help="Determine whether to use gzserver or gazebo. Default to \"gzserver\"."
 )
 
+parser.add_argument(
+    '--simulator-backend',
+    default='gazebo', type=str, choices=['gazebo', 'mock'],
+    help="Simulator evaluating the robots: 'gazebo' launches a Gazebo simulator per core, "
+         "'mock' moves the robots in-process along a cheap kinematic model, to test and profile the evolution "
+         "without Gazebo. Default \"gazebo\"."
+)
+
 parser.add_argument(
     '--n-cores',
     default=1, type=int,
     help="Number of simulators to use at the same time. Default to \"1\"."
 )
 
+parser.add_argument(
+    '--distributed-port',
+    default=None, type=int,
+    help="Port where the experiment waits for worker agents evaluating the robots on other machines, in place "
+         "of local simulators. Default: local evaluation."
+)
+
+parser.add_argument(
+    '--distributed-address',
+    default='127.0.0.1', type=str,
+    help="Address the experiment waits for worker agents on, only the same machine by default. "
+         "Any other address requires --distributed-token. Default \"127.0.0.1\"."
+)
+
+parser.add_argument(
+    '--distributed-token',
+    default='', type=str,
+    help="Secret shared by the experiment and its worker agents, the workers sending another one are refused. "
+         "Default: no secret."
+)
+
+parser.add_argument(
+    '--coordinator',
+    default=None, type=str,
+    help="Address of the experiment a worker agent evaluates robots for, as <host>:<port>. Workers are started "
+         "with `python -m pyrevolve.util.supervisor.distributed` and evaluate --n-cores robots at a time. "
+         "Default: none."
+)
+
 parser.add_argument(
     '--port-start',
     default=11345, type=int,
@@ -153,6 +190,100 @@ parser.add_argument(
     help="Exports yamls with the phenotypes. Default \"True\"."
 )
 
+parser.add_argument(
+    '--phenotype-images',
+    default='snapshots', type=str, choices=['all', 'snapshots'],
+    help="Which individuals get their body and brain images rendered: 'all' renders every new individual, "
+         "'snapshots' only the individuals in the selected populations. Other images are rendered on request. "
+         "Default \"snapshots\"."
+)
+
+parser.add_argument(
+    '--render-workers',
+    default=0, type=int,
+    help="Number of processes rendering the phenotype images, 0 renders them in the export thread. "
+         "Default \"0\"."
+)
+
+parser.add_argument(
+    '--datastore',
+    default='files', type=str, choices=['files', 'sqlite'],
+    help="Where the experiment data is stored: 'files' writes a file per robot and descriptor in the "
+         "data_fullevolution folder, 'sqlite' writes all of them in data_fullevolution/datastore.db, "
+         "which can be exported to the files layout with `python -m pyrevolve.experiment_datastore`. "
+         "Default \"files\"."
+)
+
+parser.add_argument(
+    '--trace-file',
+    default=None, type=str,
+    help="File where the duration of each stage of the evolution is traced, per individual and generation: "
+         "breeding, development, measures, exports, rendering, queues, insertion, simulation and fitness. "
+         "In the Chrome trace format if it ends in \".json\", CSV otherwise. Per generation totals are "
+         "written next to it, in <trace>_generations.csv. Default: no trace."
+)
+
+parser.add_argument(
+    '--log-levels',
+    default='', type=str,
+    help="Levels of the loggers, as comma separated name=level pairs, where the name can be a pattern: "
+         "for instance \"revolve=INFO,genotype=WARNING,gazebo_*=ERROR\". Default: every logger at its own level."
+)
+
+parser.add_argument(
+    '--log-json',
+    default=False, type=str_to_bool,
+    help="Writes the log files, such as revolve.log, as JSON lines. Default \"False\"."
+)
+
+parser.add_argument(
+    '--simulator-log-rate',
+    default=50, type=float,
+    help="Lines of simulator output logged per second, the rest is dropped. 0 logs every line. Default \"50\"."
+)
+
+parser.add_argument(
+    '--profile',
+    default=None, type=str,
+    help="Folder where a sampling profiler writes, for each generation, the stacks of the threads in the "
+         "collapsed format of flame graphs (profile_<generation>.folded) and the callbacks holding the event "
+         "loop for longer than --slow-callback-duration (slow_callbacks_<generation>.txt). Default: no profiling."
+)
+
+parser.add_argument(
+    '--profile-interval',
+    default=0.01, type=float,
+    help="Seconds between two samples of the profiler. Default \"0.01\"."
+)
+
+parser.add_argument(
+    '--slow-callback-duration',
+    default=0.1, type=float,
+    help="Seconds after which the profiler reports a callback holding the event loop. Default \"0.1\"."
+)
+
+parser.add_argument(
+    '--metrics-port',
+    default=None, type=int,
+    help="Port on localhost where the metrics of the experiment are served, in the Prometheus text format on "
+         "/metrics and as JSON on /metrics.json: evaluations per minute, queue depths, busy ratio of each "
+         "simulator, restarts, failed evaluations and progress of the generation. 0 picks a free port, which is "
+         "logged. Default: not served."
+)
+
+parser.add_argument(
+    '--metrics-file',
+    default=None, type=str,
+    help="JSON file where the metrics of the experiment are written every --metrics-interval seconds. "
+         "Default: not written."
+)
+
+parser.add_argument(
+    '--metrics-interval',
+    default=10, type=float,
+    help="Seconds between two writes of the --metrics-file. Default \"10\"."
+)
+
 # Directory where robot information will be written. The system writes
 # two main CSV files:
 # - The `robots.csv` file containing all the basic robot information, one line
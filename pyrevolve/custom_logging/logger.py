@@ -1,23 +1,250 @@
 from __future__ import absolute_import
 
+import atexit
+import copy
+import fnmatch
+import json
 import logging
+import logging.handlers
+import queue
 import sys
+import threading
+import time
 
+_TEXT_FORMAT = '[%(asctime)s %(name)10s] %(levelname)-8s %(message)s'
 
-def create_logger(name='revolve', level=logging.DEBUG, handlers=None):
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats a record as a line of JSON, with its time, logger, level and message
+    """
+
+    def format(self, record):
+        return json.dumps({
+            'time': self.formatTime(record),
+            'created': record.created,
+            'logger': record.name,
+            'level': record.levelname,
+            'message': record.getMessage(),
+        })
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Drops the records of a logger beyond a rate, with bursts up to a maximum. The next record let through
+    after dropping reports how many were dropped.
+    """
+
+    def __init__(self, rate, burst=None):
+        """
+        :param rate: records per second let through in the long run
+        :param burst: records let through at once after a quiet period, by default a second of records
+        """
+        super().__init__()
+        self.rate = rate
+        self.burst = rate if burst is None else burst
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self.dropped = 0
+
+    def filter(self, record):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+        if self._tokens < 1:
+            self.dropped += 1
+            return False
+        self._tokens -= 1
+        if self.dropped > 0:
+            record.msg = f'{record.getMessage()} [{self.dropped} lines dropped by the rate limit]'
+            record.args = None
+            self.dropped = 0
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    Puts the records of a logger, and of its children, in the log queue together with the handlers of the logger
+    """
+
+    def __init__(self, log_queue, handlers):
+        super().__init__(log_queue)
+        self.target_handlers = handlers
+
+    def prepare(self, record):
+        # a copy for each logger the record propagates to
+        record = copy.copy(super().prepare(record))
+        record.target_handlers = self.target_handlers
+        return record
+
+
+class _Dispatcher(logging.Handler):
+    """
+    Passes the records taken from the log queue to the handlers they were queued with, in the thread of the listener
+    """
+
+    def handle(self, record):
+        flushed = getattr(record, 'flushed', None)
+        if flushed is not None:
+            flushed.set()
+            return
+        for handler in getattr(record, 'target_handlers', ()):
+            handler.handle(record)
+
+
+class _LoggingSetup:
+    """
+    All the loggers put their records in a queue, emptied by a listener thread that does the formatting and writing,
+    so that logging never waits for the terminal or the disk
+    """
+
+    def __init__(self):
+        self.queue = queue.SimpleQueue()
+        self.dispatcher = _Dispatcher()
+        self.listener = logging.handlers.QueueListener(self.queue, self.dispatcher)
+        self.json_format = False
+        # logger name: handlers
+        self.handlers = {}
+        # names of the loggers created with `create_child_logger`
+        self.children = set()
+        # logger name pattern: level
+        self.levels = {}
+        # logger name pattern: records per second
+        self.rate_limits = {}
+        self.listener.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """
+        Writes the queued records and stops the listener thread
+        """
+        if self.listener._thread is not None:
+            self.listener.stop()
+
+    def flush(self):
+        """
+        Waits until the records logged so far are written
+        """
+        if self.listener._thread is None:
+            return
+        record = logging.makeLogRecord({'flushed': threading.Event()})
+        self.queue.put_nowait(record)
+        record.flushed.wait()
+
+    def formatter(self, handler):
+        if self.json_format and isinstance(handler, logging.FileHandler):
+            return JsonFormatter()
+        return logging.Formatter(_TEXT_FORMAT)
+
+    def configured(self, values, name, default=None):
+        for pattern, value in values.items():
+            if fnmatch.fnmatchcase(name, pattern):
+                default = value
+        return default
+
+
+_setup = _LoggingSetup()
+
+
+def create_logger(name='revolve', level=logging.DEBUG, handlers=None, rate_limit=None):
+    """
+    Creates a logger writing to the handlers from a background thread
+    :param name: name of the logger, its level can be overridden with `configure_logging`
+    :param level: level of the logger
+    :param handlers: handler or list of handlers, by default the standard output
+    :param rate_limit: maximum number of records per second, overridden with `configure_logging`, None for no limit
+    """
     _logger = logging.getLogger(name)
-    _logger.setLevel(level)
+    _logger.setLevel(_setup.configured(_setup.levels, name, level))
     handlers = logging.StreamHandler(sys.stdout) if handlers is None else handlers
     handlers = [handlers] if type(handlers) is not list else handlers
     for handler in handlers:
-        _console_handler = handler
-        _console_handler.setLevel(level)
-        _revolve_formatter = logging.Formatter('[%(asctime)s %(name)10s] %(levelname)-8s %(message)s')
-        _console_handler.setFormatter(_revolve_formatter)
-        _logger.addHandler(_console_handler)
+        # the level of the logger filters the records
+        handler.setLevel(logging.NOTSET)
+        handler.setFormatter(_setup.formatter(handler))
+    _setup.handlers[name] = handlers
+
+    for handler in list(_logger.handlers):
+        if isinstance(handler, logging.handlers.QueueHandler):
+            _logger.removeHandler(handler)
+    queue_handler = _QueueHandler(_setup.queue, handlers)
+    rate_limit = _setup.configured(_setup.rate_limits, name, rate_limit)
+    if rate_limit:
+        queue_handler.addFilter(RateLimitFilter(rate_limit))
+    _logger.addHandler(queue_handler)
     return _logger
 
 
+def create_child_logger(parent, name, rate_limit=None):
+    """
+    Creates a logger whose records are written by the handlers of its parent, such as the output of a process
+    relayed by the logger of its supervisor
+    :param parent: logger created with `create_logger`
+    :param name: name of the child, appended to the name of the parent
+    :param rate_limit: maximum number of records per second of the child only, overridden with `configure_logging`,
+     None for no limit
+    """
+    _logger = logging.getLogger(f'{parent.name}.{name}')
+    rate_limit = _setup.configured(_setup.rate_limits, _logger.name, rate_limit)
+    # a filter of the logger itself leaves the records of the parent alone
+    _logger.filters = [RateLimitFilter(rate_limit)] if rate_limit else []
+    _setup.children.add(_logger.name)
+    return _logger
+
+
+def configure_logging(levels=None, json_format=False, rate_limits=None):
+    """
+    Configures the loggers already created and the ones created later
+    :param levels: dictionary of logger name, or fnmatch pattern such as 'gazebo_*', and level
+    :param json_format: write the records in the log files as JSON lines instead of text
+    :param rate_limits: dictionary of logger name, or pattern, and maximum records per second (0 for no limit)
+    """
+    levels = {} if levels is None else levels
+    rate_limits = {} if rate_limits is None else rate_limits
+    _setup.levels.update({pattern: logging._checkLevel(level.upper() if isinstance(level, str) else level)
+                          for pattern, level in levels.items()})
+    _setup.rate_limits.update(rate_limits)
+    _setup.json_format = json_format
+
+    for name, handlers in _setup.handlers.items():
+        for handler in handlers:
+            handler.setFormatter(_setup.formatter(handler))
+        _logger = logging.getLogger(name)
+        level = _setup.configured(_setup.levels, name)
+        if level is not None:
+            _logger.setLevel(level)
+        rate_limit = _setup.configured(_setup.rate_limits, name)
+        if rate_limit is not None:
+            for handler in _logger.handlers:
+                if isinstance(handler, logging.handlers.QueueHandler):
+                    handler.filters = [RateLimitFilter(rate_limit)] if rate_limit else []
+    for name in _setup.children:
+        rate_limit = _setup.configured(_setup.rate_limits, name)
+        if rate_limit is not None:
+            logging.getLogger(name).filters = [RateLimitFilter(rate_limit)] if rate_limit else []
+
+
+def flush_logs():
+    """
+    Waits until the records logged so far are written
+    """
+    _setup.flush()
+
+
+def parse_levels(text):
+    """
+    :param text: comma separated `name=level` pairs, such as "genotype=WARNING,gazebo_*=INFO"
+    :return: dictionary of name and level
+    """
+    levels = {}
+    for item in text.split(','):
+        if item.strip() == '':
+            continue
+        name, level = item.split('=')
+        levels[name.strip()] = level.strip()
+    return levels
+
+
 # General logger to standard output
 logger = create_logger(
     name='revolve',
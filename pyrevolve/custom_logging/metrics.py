@@ -0,0 +1,246 @@
+"""
+Live metrics of a running experiment, to follow its throughput without tailing the logs
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from pyrevolve.custom_logging.logger import logger
+
+# name: (type, help) of the metrics exported, in the order they are exported
+_METRICS = OrderedDict([
+    ('generation', ('gauge', 'Generation being evaluated')),
+    ('generation_robots', ('gauge', 'Robots to evaluate in the current generation')),
+    ('generation_robots_evaluated', ('gauge', 'Robots of the current generation already evaluated')),
+    ('evaluations_total', ('counter', 'Evaluations finished')),
+    ('evaluations_per_minute', ('gauge', 'Evaluations finished in the last minute')),
+    ('failed_evaluations_total', ('counter', 'Evaluation attempts that failed or timed out')),
+    ('abandoned_robots_total', ('counter', 'Robots given up on after failing all their evaluation attempts')),
+    ('restarts_total', ('counter', 'Restarts of a simulator')),
+    ('queue_depth', ('gauge', 'Robots waiting for a simulator')),
+    ('expected_makespan_seconds', ('gauge', 'Expected seconds until the queued robots are evaluated')),
+    ('workers', ('gauge', 'Worker agents connected to the coordinator of a distributed evaluation')),
+    ('busy_seconds_total', ('counter', 'Seconds a simulator spent evaluating robots')),
+    ('busy_ratio', ('gauge', 'Fraction of the time a simulator spent evaluating robots since it started')),
+    ('uptime_seconds', ('gauge', 'Seconds since the metrics started')),
+])
+
+PREFIX = 'revolve_'
+
+
+class Metrics:
+    """
+    Counters and gauges of the experiment: evaluations, failures, restarts, queue depths, busy simulators and
+    progress of the generation. The queues are told apart by a `queue` label, the simulators by a `simulator` label.
+
+    They are served over HTTP in the Prometheus text format (`/metrics`) and as JSON (`/metrics.json`),
+    and can be written to a JSON file at a fixed interval. Both run in threads of their own, so the metrics
+    stay readable while the event loop is busy.
+    """
+
+    EVALUATIONS_WINDOW = 60  # seconds
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._start = time.monotonic()
+        # name: {labels: value}, labels are a tuple of (label, value) pairs
+        self._values = {}
+        # queue: times of the evaluations finished in the last window
+        self._evaluations = {}
+        # (queue, simulator): [start of the current evaluation or None, busy seconds before it, time it started]
+        self._busy = {}
+        self._server = None
+        self._writer = None
+        self._stop = threading.Event()
+
+    def inc(self, name, value=1, **labels):
+        """
+        Increases a counter
+        :param name: name of the metric, without prefix
+        :param value: increment
+        :param labels: labels of the metric, such as queue='simulator'
+        """
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            values = self._values.setdefault(name, {})
+            values[key] = values.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        """
+        Sets a gauge
+        :param name: name of the metric, without prefix
+        :param value: current value
+        :param labels: labels of the metric, such as queue='simulator'
+        """
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values.setdefault(name, {})[key] = value
+
+    def evaluation_finished(self, queue):
+        """
+        Counts an evaluation, for the total and the evaluations per minute
+        :param queue: name of the queue that evaluated the robot
+        """
+        self.inc('evaluations_total', queue=queue)
+        with self._lock:
+            self._evaluations.setdefault(queue, deque()).append(time.monotonic())
+
+    def set_busy(self, queue, simulator, busy):
+        """
+        Records a simulator starting or finishing an evaluation
+        :param queue: name of the queue of the simulator
+        :param simulator: index of the simulator in the queue
+        :param busy: whether the simulator is evaluating a robot
+        """
+        now = time.monotonic()
+        with self._lock:
+            state = self._busy.setdefault((queue, str(simulator)), [None, 0.0, now])
+            if busy and state[0] is None:
+                state[0] = now
+            elif not busy and state[0] is not None:
+                state[1] += now - state[0]
+                state[0] = None
+
+    def start_generation(self, gen_num, n_robots):
+        """
+        :param gen_num: number of the generation
+        :param n_robots: number of robots it evaluates
+        """
+        self.set('generation', gen_num)
+        self.set('generation_robots', n_robots)
+        self.set('generation_robots_evaluated', 0)
+
+    def collect(self):
+        """
+        :return: dictionary of metric name: list of (labels dictionary, value), including the metrics computed
+         from the evaluation times and busy times
+        """
+        now = time.monotonic()
+        with self._lock:
+            values = {name: dict(samples) for name, samples in self._values.items()}
+            for queue, times in self._evaluations.items():
+                while len(times) > 0 and times[0] < now - self.EVALUATIONS_WINDOW:
+                    times.popleft()
+                values.setdefault('evaluations_per_minute', {})[(('queue', queue),)] = \
+                    len(times) * 60 / self.EVALUATIONS_WINDOW
+            for (queue, simulator), (busy_since, busy_time, started) in self._busy.items():
+                if busy_since is not None:
+                    busy_time += now - busy_since
+                key = (('queue', queue), ('simulator', simulator))
+                values.setdefault('busy_seconds_total', {})[key] = busy_time
+                values.setdefault('busy_ratio', {})[key] = busy_time / max(now - started, 1e-9)
+        values['uptime_seconds'] = {(): now - self._start}
+        return OrderedDict(
+            (name, [(dict(labels), value) for labels, value in sorted(values[name].items())])
+            for name in _METRICS if name in values
+        )
+
+    def prometheus_text(self):
+        """
+        :return: the metrics in the Prometheus text exposition format
+        """
+        lines = []
+        for name, samples in self.collect().items():
+            metric_type, description = _METRICS[name]
+            lines.append(f'# HELP {PREFIX}{name} {description}')
+            lines.append(f'# TYPE {PREFIX}{name} {metric_type}')
+            for labels, value in samples:
+                labels = ','.join(f'{label}="{label_value}"' for label, label_value in labels.items())
+                lines.append(f'{PREFIX}{name}{{{labels}}} {value}' if labels else f'{PREFIX}{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def json(self):
+        """
+        :return: the metrics as a JSON document, with the time they were collected
+        """
+        metrics = OrderedDict((name, [{'labels': labels, 'value': value} for labels, value in samples])
+                              for name, samples in self.collect().items())
+        return json.dumps({'time': time.time(), 'metrics': metrics}, indent=1)
+
+    def serve(self, port, address='127.0.0.1'):
+        """
+        Serves the metrics over HTTP from a background thread
+        :param port: port of the server, 0 picks a free one
+        :param address: address of the server, only reachable from the same machine by default
+        :return: port of the server
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/metrics':
+                    body, content_type = metrics.prometheus_text(), 'text/plain; version=0.0.4'
+                elif self.path == '/metrics.json':
+                    body, content_type = metrics.json(), 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                body = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((address, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='MetricsServer', daemon=True).start()
+        port = self._server.server_address[1]
+        logger.info(f'Serving the metrics on http://{address}:{port}/metrics')
+        return port
+
+    def write_periodically(self, path, interval=10):
+        """
+        Writes the metrics as JSON to a file at a fixed interval, from a background thread
+        :param path: path of the file, replaced at each write
+        :param interval: seconds between two writes
+        """
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._stop.clear()
+
+        def write_loop():
+            while True:
+                self.write(path)
+                if self._stop.wait(interval):
+                    # last state of the experiment
+                    self.write(path)
+                    return
+
+        self._writer = threading.Thread(target=write_loop, name='MetricsWriter', daemon=True)
+        self._writer.start()
+
+    def write(self, path):
+        """
+        Writes the metrics as JSON to a file, replaced at once so that it can be read at any time
+        """
+        try:
+            with open(f'{path}.tmp', 'w') as f:
+                f.write(self.json())
+            os.replace(f'{path}.tmp', path)
+        except OSError:
+            logger.exception(f'Failed writing the metrics to {path}')
+
+    def stop(self):
+        """
+        Stops the server and the writer
+        """
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._writer is not None:
+            self._stop.set()
+            self._writer.join()
+            self._writer = None
+
+
+# Metrics of the experiment, served with the `--metrics-port` setting and written with `--metrics-file`
+metrics = Metrics()
@@ -0,0 +1,147 @@
+"""
+Sampling profiler for experiments that run for days, to find what keeps the event loop busy without cProfile
+"""
+import logging
+import os
+import re
+import sys
+import threading
+from collections import Counter
+
+from pyrevolve.custom_logging.logger import logger
+from pyrevolve.custom_logging.tracer import tracer
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+class _SlowCallbackHandler(logging.Handler):
+    """
+    Collects the callbacks reported as slow by the event loop in debug mode
+    """
+
+    def __init__(self, profiler):
+        super().__init__(logging.WARNING)
+        self.profiler = profiler
+
+    def emit(self, record):
+        # asyncio logs 'Executing %s took %.3f seconds'
+        if record.msg.startswith('Executing') and len(record.args) == 2:
+            handle, duration = record.args
+            # without the addresses, the callbacks of the same coroutine are counted together
+            self.profiler.add_slow_callback(re.sub(r' at 0x[0-9a-f]+', '', str(handle)), duration)
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of all the threads at a fixed interval, from a thread of its own, and counts them.
+    The event loop runs in debug mode, which reports the callbacks, including the steps of coroutines,
+    that hold the loop for longer than a threshold.
+
+    At the start of each generation (see `Tracer.start_generation`) and when stopped, the stacks of the past
+    generation are written in `profile_<generation>.folded`, in the collapsed format read by flamegraph.pl
+    and https://www.speedscope.app, and the slow callbacks in `slow_callbacks_<generation>.txt`.
+    """
+
+    def __init__(self, folder, interval=0.01, slow_callback_duration=0.1):
+        """
+        :param folder: folder where the profiles are written
+        :param interval: seconds between two samples
+        :param slow_callback_duration: seconds after which a callback holding the event loop is reported
+        """
+        self.folder = folder
+        self.interval = interval
+        self.slow_callback_duration = slow_callback_duration
+        self._stacks = Counter()
+        # callback: (count, total duration, maximum duration)
+        self._slow_callbacks = {}
+        self._lock = threading.Lock()
+        self._generation = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._slow_callback_handler = _SlowCallbackHandler(self)
+
+    def start(self, loop):
+        """
+        Starts sampling and reporting the slow callbacks of the loop
+        :param loop: event loop running the experiment
+        """
+        os.makedirs(self.folder, exist_ok=True)
+        loop.set_debug(True)
+        loop.slow_callback_duration = self.slow_callback_duration
+        logging.getLogger('asyncio').addHandler(self._slow_callback_handler)
+        self._generation = tracer.generation
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample_loop, name='SamplingProfiler', daemon=True)
+        self._thread.start()
+        logger.info(f'Profiling every {self.interval}s in {self.folder}')
+
+    def stop(self, loop=None):
+        """
+        Stops sampling and writes the profile of the current generation
+        :param loop: event loop to take out of debug mode
+        """
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        logging.getLogger('asyncio').removeHandler(self._slow_callback_handler)
+        if loop is not None:
+            loop.set_debug(False)
+        self.dump()
+
+    def add_slow_callback(self, callback, duration):
+        with self._lock:
+            count, total, maximum = self._slow_callbacks.get(callback, (0, 0.0, 0.0))
+            self._slow_callbacks[callback] = (count + 1, total + duration, max(maximum, duration))
+
+    def _sample_loop(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            if tracer.generation != self._generation:
+                self.dump()
+                self._generation = tracer.generation
+            self.sample(exclude=own_id)
+
+    def sample(self, exclude=None):
+        """
+        Records the current stack of every thread
+        :param exclude: id of a thread not to sample
+        """
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        stacks = []
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == exclude:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            stack.append(names.get(thread_id, str(thread_id)))
+            stacks.append(';'.join(reversed(stack)))
+        with self._lock:
+            self._stacks.update(stacks)
+
+    def dump(self):
+        """
+        Writes the stacks and slow callbacks recorded since the last dump
+        """
+        with self._lock:
+            stacks, self._stacks = self._stacks, Counter()
+            slow_callbacks, self._slow_callbacks = self._slow_callbacks, {}
+        if len(stacks) == 0 and len(slow_callbacks) == 0:
+            return
+        name = 'setup' if self._generation is None else str(self._generation)
+        with open(os.path.join(self.folder, f'profile_{name}.folded'), 'w') as f:
+            for stack, count in stacks.most_common():
+                f.write(f'{stack} {count}\n')
+        with open(os.path.join(self.folder, f'slow_callbacks_{name}.txt'), 'w') as f:
+            f.write('count\ttotal\tmax\tcallback\n')
+            for callback, (count, total, maximum) in sorted(slow_callbacks.items(), key=lambda item: -item[1][1]):
+                f.write(f'{count}\t{total:.3f}\t{maximum:.3f}\t{callback}\n')
+        total = sum(total for _count, total, _max in slow_callbacks.values())
+        logger.info(f'Profile of generation {name}: {sum(stacks.values())} samples, '
+                    f'{len(slow_callbacks)} slow callbacks holding the loop for {total:.2f}s')
@@ -0,0 +1,206 @@
+"""
+Timing of the stages of the evolution, to find out whether a slow generation waits for the simulator, the disk or Python
+"""
+import atexit
+import csv
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from pyrevolve.custom_logging.logger import logger
+
+
+class Tracer:
+    """
+    Records spans, the duration of a stage for an individual, and gauges, such as the length of the simulator queue.
+
+    Spans and gauges are written to a trace file, in the Chrome trace format if its name ends in `.json`
+    (it opens in chrome://tracing or https://ui.perfetto.dev, with a row per robot), as CSV otherwise.
+    At the end of each generation the count, total, mean and maximum duration of each stage are logged
+    and appended to a `<trace>_generations.csv` file next to the trace.
+
+    The tracer does nothing until it is opened, so the instrumented code costs almost nothing by default.
+    Spans can be recorded from any thread.
+    """
+
+    def __init__(self):
+        self.generation = None
+        self._file = None
+        self._chrome = False
+        self._aggregates_path = None
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        # row of each robot in the chrome trace, row 0 collects the spans not belonging to a robot
+        self._rows = {None: 0}
+        # stage: durations of the spans of the current generation
+        self._durations = OrderedDict()
+        self._generation_start = None
+
+    @property
+    def enabled(self):
+        return self._file is not None
+
+    def open(self, path):
+        """
+        Starts writing the trace to a file, replacing it if it exists
+        :param path: path of the trace file, in the Chrome trace format if it ends in `.json`, CSV otherwise
+        """
+        self.close()
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        root, extension = os.path.splitext(path)
+        self._chrome = extension == '.json'
+        self._aggregates_path = f'{root}_generations.csv'
+        self._origin = time.perf_counter()
+        self._rows = {None: 0}
+        self._durations = OrderedDict()
+        self._file = open(path, 'w', newline='')
+        if self._chrome:
+            # the closing bracket is optional in the Chrome trace format, so the trace is readable until the end
+            self._file.write('[\n')
+            self._write({'name': 'process_name', 'ph': 'M', 'pid': 0, 'tid': 0, 'args': {'name': 'revolve'}})
+            self._write({'name': 'thread_name', 'ph': 'M', 'pid': 0, 'tid': 0, 'args': {'name': 'experiment'}})
+        else:
+            self._csv = csv.writer(self._file)
+            self._csv.writerow(['type', 'name', 'generation', 'robot', 'start', 'duration', 'value'])
+        with open(self._aggregates_path, 'w', newline='') as f:
+            csv.writer(f).writerow(['generation', 'stage', 'count', 'total', 'mean', 'max', 'wall_time'])
+        atexit.register(self.close)
+
+    def close(self):
+        """
+        Ends the current generation and closes the trace file
+        """
+        if self._file is None:
+            return
+        self.end_generation()
+        with self._lock:
+            self._file.close()
+            self._file = None
+        atexit.unregister(self.close)
+
+    def flush(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+    def _write(self, event):
+        self._file.write(json.dumps(event, separators=(',', ':')) + ',\n')
+
+    def _timestamp(self, t):
+        return round((t - self._origin) * 1e6, 1)
+
+    def _row(self, robot_id):
+        row = self._rows.get(robot_id)
+        if row is None:
+            row = self._rows[robot_id] = len(self._rows)
+            if self._chrome:
+                self._write({'name': 'thread_name', 'ph': 'M', 'pid': 0, 'tid': row, 'args': {'name': robot_id}})
+                self._write({'name': 'thread_sort_index', 'ph': 'M', 'pid': 0, 'tid': row,
+                             'args': {'sort_index': row}})
+        return row
+
+    @contextmanager
+    def span(self, stage, robot_id=None):
+        """
+        Records the duration of the block as a span
+        :param stage: name of the stage
+        :param robot_id: id of the robot the stage works on, if any
+        """
+        if self._file is None:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_span(stage, start, robot_id=robot_id)
+
+    def add_span(self, stage, start, end=None, robot_id=None):
+        """
+        Records a span measured by the caller
+        :param stage: name of the stage
+        :param start: start of the span, from `time.perf_counter()`
+        :param end: end of the span, from `time.perf_counter()`, now if None
+        :param robot_id: id of the robot the stage works on, if any
+        """
+        if self._file is None:
+            return
+        end = time.perf_counter() if end is None else end
+        robot_id = None if robot_id is None else str(robot_id)
+        duration = end - start
+        with self._lock:
+            if self._file is None:
+                return
+            self._durations.setdefault(stage, []).append(duration)
+            if self._chrome:
+                self._write({'name': stage, 'ph': 'X', 'pid': 0, 'tid': self._row(robot_id),
+                             'ts': self._timestamp(start), 'dur': round(duration * 1e6, 1),
+                             'args': {'generation': self.generation}})
+            else:
+                self._csv.writerow(['span', stage, self.generation, robot_id,
+                                    f'{start - self._origin:.6f}', f'{duration:.6f}', ''])
+
+    def gauge(self, name, value):
+        """
+        Records the current value of a quantity, such as the number of robots waiting for a simulator
+        """
+        if self._file is None:
+            return
+        now = time.perf_counter()
+        with self._lock:
+            if self._file is None:
+                return
+            if self._chrome:
+                self._write({'name': name, 'ph': 'C', 'pid': 0, 'tid': 0, 'ts': self._timestamp(now),
+                             'args': {'value': value}})
+            else:
+                self._csv.writerow(['gauge', name, self.generation, '', f'{now - self._origin:.6f}', '', value])
+
+    def start_generation(self, gen_num):
+        """
+        Attributes the next spans to a generation
+        """
+        self.end_generation()
+        self.generation = gen_num
+        self._generation_start = time.perf_counter()
+
+    def end_generation(self):
+        """
+        Logs and writes the durations of the stages of the current generation
+        :return: dictionary of stage: (count, total, mean, max), None if no generation is running
+        """
+        if self._generation_start is None:
+            return None
+        start, self._generation_start = self._generation_start, None
+        wall_time = time.perf_counter() - start
+        with self._lock:
+            durations, self._durations = self._durations, OrderedDict()
+            if self._file is not None and self._chrome:
+                self._write({'name': f'generation {self.generation}', 'ph': 'X', 'pid': 0, 'tid': 0,
+                             'ts': self._timestamp(start), 'dur': round(wall_time * 1e6, 1),
+                             'args': {'generation': self.generation}})
+        aggregates = OrderedDict(
+            (stage, (len(values), sum(values), sum(values) / len(values), max(values)))
+            for stage, values in durations.items()
+        )
+        if self._file is None:
+            return aggregates
+
+        with open(self._aggregates_path, 'a', newline='') as f:
+            writer = csv.writer(f)
+            for stage, (count, total, mean, maximum) in aggregates.items():
+                writer.writerow([self.generation, stage, count, f'{total:.6f}', f'{mean:.6f}', f'{maximum:.6f}',
+                                 f'{wall_time:.6f}'])
+        summary = ', '.join(f'{stage} {total:.2f}s' for stage, (_count, total, _mean, _max) in aggregates.items())
+        logger.info(f'Generation {self.generation} took {wall_time:.2f}s: {summary}')
+        self.flush()
+        return aggregates
+
+
+# Tracer of the experiment, opened with the `--trace-file` setting
+tracer = Tracer()
@@ -0,0 +1,266 @@
+"""
+Consolidates the data of experiment runs in tables for the analysis.
+
+For every run, writes in the run folder:
+ - all_measures.tsv: a row per evaluated robot, with its behavioural and phenotype descriptors and its fitness
+ - all_measures.schema.json: columns and types of all_measures.tsv
+ - snapshots_ids.tsv: the robots in the selected population of every generation
+
+Runs are consolidated in parallel, a process per run, and robots are streamed to the output one by one.
+A run that was consolidated before is updated with only the robots evaluated since.
+
+Usage: python -m pyrevolve.data_analisys.consolidate_experiments data plane lava --runs 10
+"""
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from pyrevolve.experiment_datastore import ExperimentDatastore, robot_number
+
+MEASURES_FILE = 'all_measures.tsv'
+SCHEMA_FILE = 'all_measures.schema.json'
+SNAPSHOTS_FILE = 'snapshots_ids.tsv'
+# value written for the measures of robots that were not measured
+NULL = 'None'
+
+
+def parse_descriptors(text):
+    """
+    :param text: content of a descriptors file, a `measure value` pair per line, or 'None'
+    :return: list of (measure, value) tuples, empty if the robot was not measured
+    """
+    if text is None:
+        return []
+    descriptors = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line == '' or line == NULL:
+            continue
+        measure, value = line.split(' ')
+        descriptors.append((measure, value))
+    return descriptors
+
+
+def _read_text(path):
+    if not os.path.isfile(path):
+        return None
+    with open(path) as f:
+        return f.read()
+
+
+def iter_robots(run_path, skip=frozenset()):
+    """
+    Reads the evaluated robots of a run, from the datastore if the run has one, otherwise from the files
+    :param run_path: folder of the run
+    :param skip: numbers of the robots not to read
+    :return: iterator of (robot number, fitness, behavioural descriptors, phenotype descriptors),
+     with the descriptors as returned by `parse_descriptors`
+    """
+    data_folder = os.path.join(run_path, 'data_fullevolution')
+    datastore_path = os.path.join(data_folder, 'datastore.db')
+    if os.path.exists(datastore_path):
+        datastore = ExperimentDatastore(datastore_path)
+        try:
+            for robot_id, fitness, behavior_desc, phenotype_desc in datastore.evaluated_robots():
+                if robot_number(robot_id) in skip:
+                    continue
+                yield (robot_number(robot_id), str(fitness),
+                       parse_descriptors(behavior_desc), parse_descriptors(phenotype_desc))
+        finally:
+            datastore.close()
+        return
+
+    numbers = []
+    with os.scandir(os.path.join(data_folder, 'fitness')) as entries:
+        for entry in entries:
+            number = robot_number(entry.name.split('.')[0])
+            if number is not None and number not in skip:
+                numbers.append(number)
+
+    for number in sorted(numbers):
+        descriptors_folder = os.path.join(data_folder, 'descriptors')
+        fitness = _read_text(os.path.join(data_folder, 'fitness', f'fitness_robot_{number}.txt'))
+        behavior_desc = _read_text(os.path.join(descriptors_folder, f'behavior_desc_robot_{number}.txt'))
+        phenotype_desc = _read_text(os.path.join(descriptors_folder, f'phenotype_desc_robot_{number}.txt'))
+        yield number, fitness.strip(), parse_descriptors(behavior_desc), parse_descriptors(phenotype_desc)
+
+
+def iter_snapshots(run_path):
+    """
+    :param run_path: folder of the run
+    :return: iterator of (generation, robot number) of the selected populations of the run
+    """
+    datastore_path = os.path.join(run_path, 'data_fullevolution', 'datastore.db')
+    if os.path.exists(datastore_path):
+        datastore = ExperimentDatastore(datastore_path)
+        try:
+            for generation in datastore.snapshot_generations():
+                for robot_id, _fitness in datastore.snapshot(generation):
+                    yield generation, robot_number(robot_id)
+        finally:
+            datastore.close()
+        return
+
+    generations = []
+    for name in os.listdir(run_path):
+        if name.startswith('selectedpop_') and os.path.isdir(os.path.join(run_path, name)):
+            generations.append(int(name.split('_')[1]))
+    for generation in sorted(generations):
+        manifest_path = os.path.join(run_path, f'selectedpop_{generation}', 'snapshot.json')
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                for robot in json.load(f)['robots']:
+                    yield generation, robot_number(robot['id'])
+            continue
+        numbers = []
+        for name in os.listdir(os.path.join(run_path, f'selectedpop_{generation}')):
+            if name.startswith('body'):
+                numbers.append(robot_number(name.split('.')[0]))
+        for number in sorted(numbers):
+            yield generation, number
+
+
+def read_schema(run_path):
+    """
+    :return: schema of the consolidated measures of the run, None if the run was never consolidated
+    """
+    schema_path = os.path.join(run_path, SCHEMA_FILE)
+    if not os.path.exists(schema_path) or not os.path.exists(os.path.join(run_path, MEASURES_FILE)):
+        return None
+    with open(schema_path) as f:
+        return json.load(f)
+
+
+def _write_schema(run_path, behavior_headers, phenotype_headers):
+    columns = [{'name': 'robot_id', 'type': 'int'}]
+    columns += [{'name': measure, 'type': 'float', 'group': 'behavior'} for measure in behavior_headers]
+    columns += [{'name': measure, 'type': 'float', 'group': 'phenotype'} for measure in phenotype_headers]
+    columns.append({'name': 'fitness', 'type': 'float'})
+    schema = {
+        'separator': '\t',
+        'null': NULL,
+        'columns': columns,
+    }
+    with open(os.path.join(run_path, SCHEMA_FILE), 'w') as f:
+        json.dump(schema, f, indent=2)
+    return schema
+
+
+def _consolidated_robots(run_path):
+    with open(os.path.join(run_path, MEASURES_FILE)) as f:
+        next(f)
+        return {int(line.split('\t', 1)[0]) for line in f if line.strip() != ''}
+
+
+def _headers(schema, group):
+    return [column['name'] for column in schema['columns'] if column.get('group') == group]
+
+
+def consolidate_run(run_path, incremental=True):
+    """
+    Consolidates the measures and the snapshots of a run
+    :param run_path: folder of the run
+    :param incremental: only add the robots that are not consolidated yet, if the run was consolidated before
+    :return: number of robots added to the consolidated measures
+    """
+    schema = read_schema(run_path) if incremental else None
+    if schema is not None and (len(_headers(schema, 'behavior')) == 0 or len(_headers(schema, 'phenotype')) == 0):
+        # consolidated before any robot was measured, the columns are still unknown
+        schema = None
+    consolidated = _consolidated_robots(run_path) if schema is not None else set()
+    behavior_headers = _headers(schema, 'behavior') if schema is not None else None
+    phenotype_headers = _headers(schema, 'phenotype') if schema is not None else None
+
+    measures_file = open(os.path.join(run_path, MEASURES_FILE), 'a') if schema is not None else None
+    # robots read before the columns are known, that is before the first robot with measures of both kinds
+    pending = []
+    n_added = 0
+    try:
+        for row in iter_robots(run_path, consolidated):
+            number, fitness, behavior, phenotype = row
+            n_added += 1
+            if measures_file is not None:
+                measures_file.write(_measures_row(row, behavior_headers, phenotype_headers))
+                continue
+
+            pending.append(row)
+            if behavior_headers is None and len(behavior) > 0:
+                behavior_headers = [measure for measure, _value in behavior]
+            if phenotype_headers is None and len(phenotype) > 0:
+                phenotype_headers = [measure for measure, _value in phenotype]
+            if behavior_headers is not None and phenotype_headers is not None:
+                measures_file = _create_measures_file(run_path, behavior_headers, phenotype_headers)
+                for pending_row in pending:
+                    measures_file.write(_measures_row(pending_row, behavior_headers, phenotype_headers))
+                pending = []
+
+        if measures_file is None:
+            behavior_headers, phenotype_headers = behavior_headers or [], phenotype_headers or []
+            measures_file = _create_measures_file(run_path, behavior_headers, phenotype_headers)
+            for pending_row in pending:
+                measures_file.write(_measures_row(pending_row, behavior_headers, phenotype_headers))
+    finally:
+        if measures_file is not None:
+            measures_file.close()
+
+    with open(os.path.join(run_path, SNAPSHOTS_FILE), 'w') as f:
+        f.write('generation\trobot_id\n')
+        for generation, number in iter_snapshots(run_path):
+            f.write(f'{generation}\t{number}\n')
+
+    return n_added
+
+
+def _create_measures_file(run_path, behavior_headers, phenotype_headers):
+    schema = _write_schema(run_path, behavior_headers, phenotype_headers)
+    measures_file = open(os.path.join(run_path, MEASURES_FILE), 'w')
+    measures_file.write('\t'.join(column['name'] for column in schema['columns']) + '\n')
+    return measures_file
+
+
+def _measures_row(row, behavior_headers, phenotype_headers):
+    number, fitness, behavior, phenotype = row
+    behavior = dict(behavior)
+    phenotype = dict(phenotype)
+    values = [str(number)]
+    values += [behavior.get(measure, NULL) for measure in behavior_headers]
+    values += [phenotype.get(measure, NULL) for measure in phenotype_headers]
+    values.append(fitness)
+    return '\t'.join(values) + '\n'
+
+
+def consolidate_experiments(data_path, experiments, runs, incremental=True, workers=None):
+    """
+    Consolidates all the runs of the experiments, in parallel
+    :param data_path: folder with a folder per experiment
+    :param experiments: names of the experiments
+    :param runs: number of runs of each experiment, numbered from 1
+    :param incremental: only add the robots that are not consolidated yet
+    :param workers: number of processes, by default the number of processors
+    """
+    run_paths = [os.path.join(data_path, str(experiment), str(run))
+                 for experiment in experiments
+                 for run in range(1, runs + 1)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(consolidate_run, run_path, incremental) for run_path in run_paths]
+        for run_path, future in zip(run_paths, futures):
+            print(f'{run_path}: {future.result()} robots added')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Consolidates the data of experiment runs in tables')
+    parser.add_argument('data_path', help='folder with a folder per experiment')
+    parser.add_argument('experiments', nargs='+', help='names of the experiments')
+    parser.add_argument('--runs', default=1, type=int, help='number of runs of each experiment. Default "1".')
+    parser.add_argument('--workers', default=None, type=int,
+                        help='number of processes. Default: the number of processors.')
+    parser.add_argument('--full', action='store_true',
+                        help='consolidate all the robots again, instead of only the ones added since the last time')
+    args = parser.parse_args()
+
+    consolidate_experiments(args.data_path, args.experiments, args.runs, not args.full, args.workers)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,9 +4,10 @@ from pyrevolve.evolution.individual import Individual
 from pyrevolve.SDF.math import Vector3
 from pyrevolve.tol.manage import measures
 from ..custom_logging.logger import logger
+from ..custom_logging.metrics import metrics
+from ..custom_logging.tracer import tracer
 import time
 import asyncio
-import os
 
 
 class PopulationConfig:
@@ -84,49 +85,53 @@ class Population:
         self.simulator_queue = simulator_queue
         self.next_robot_id = next_robot_id
 
-    def _new_individual(self, genotype):
+    def _new_individual(self, genotype, parents=None):
         individual = Individual(genotype)
+        # only the ids, a reference to the parents would keep the whole ancestry in memory
+        individual.parents = None if parents is None else [parent.id for parent in parents]
+        develop_start = time.perf_counter()
         individual.develop()
-        self.conf.experiment_management.export_genotype(individual)
-        self.conf.experiment_management.export_phenotype(individual)
-        self.conf.experiment_management.export_phenotype_images(os.path.join('data_fullevolution', 'phenotype_images'), individual)
-        individual.phenotype.measure_phenotype()
-        individual.phenotype.export_phenotype_measurements(self.conf.experiment_management.data_folder)
+        tracer.add_span('develop', develop_start, robot_id=individual.id)
+        with tracer.span('export', individual.id):
+            self.conf.experiment_management.export_genotype(individual)
+            self.conf.experiment_management.export_phenotype(individual)
+            self.conf.experiment_management.export_parents(individual)
+            self.conf.experiment_management.export_new_individual_images(individual)
+        with tracer.span('measure', individual.id):
+            individual.phenotype.measure_phenotype()
+        with tracer.span('export', individual.id):
+            self.conf.experiment_management.export_phenotype_measurements(individual)
 
         return individual
 
     async def load_individual(self, id):
-        data_path = self.conf.experiment_management.data_folder
         genotype = self.conf.genotype_constructor(self.conf.genotype_conf, id)
-        genotype.load_genotype(os.path.join(data_path, 'genotypes', f'genotype_{id}.txt'))
+        self.conf.experiment_management.load_genotype(genotype, id)
 
         individual = Individual(genotype)
         individual.develop()
         individual.phenotype.measure_phenotype()
 
-        with open(os.path.join(data_path, 'fitness', f'fitness_{id}.txt')) as f:
-            data = f.readlines()[0]
-            individual.fitness = None if data == 'None' else float(data)
+        individual.fitness = self.conf.experiment_management.read_fitness(id)
 
-        with open(os.path.join(data_path, 'descriptors', f'behavior_desc_{id}.txt')) as f:
-            lines = f.readlines()
-            if lines[0] == 'None':
-                individual.phenotype._behavioural_measurements = None
-            else:
-                individual.phenotype._behavioural_measurements = measures.BehaviouralMeasurements()
-                for line in lines:
-                    if line.split(' ')[0] == 'velocity':
-                        individual.phenotype._behavioural_measurements.velocity = float(line.split(' ')[1])
-                    #if line.split(' ')[0] == 'displacement':
-                     #   individual.phenotype._behavioural_measurements.displacement = float(line.split(' ')[1])
-                    if line.split(' ')[0] == 'displacement_velocity':
-                        individual.phenotype._behavioural_measurements.displacement_velocity = float(line.split(' ')[1])
-                    if line.split(' ')[0] == 'displacement_velocity_hill':
-                        individual.phenotype._behavioural_measurements.displacement_velocity_hill = float(line.split(' ')[1])
-                    if line.split(' ')[0] == 'head_balance':
-                        individual.phenotype._behavioural_measurements.head_balance = float(line.split(' ')[1])
-                    if line.split(' ')[0] == 'contacts':
-                        individual.phenotype._behavioural_measurements.contacts = float(line.split(' ')[1])
+        lines = self.conf.experiment_management.read_behavior_measures(id)
+        if lines[0] == 'None':
+            individual.phenotype._behavioural_measurements = None
+        else:
+            individual.phenotype._behavioural_measurements = measures.BehaviouralMeasurements()
+            for line in lines:
+                if line.split(' ')[0] == 'velocity':
+                    individual.phenotype._behavioural_measurements.velocity = float(line.split(' ')[1])
+                #if line.split(' ')[0] == 'displacement':
+                 #   individual.phenotype._behavioural_measurements.displacement = float(line.split(' ')[1])
+                if line.split(' ')[0] == 'displacement_velocity':
+                    individual.phenotype._behavioural_measurements.displacement_velocity = float(line.split(' ')[1])
+                if line.split(' ')[0] == 'displacement_velocity_hill':
+                    individual.phenotype._behavioural_measurements.displacement_velocity_hill = float(line.split(' ')[1])
+                if line.split(' ')[0] == 'head_balance':
+                    individual.phenotype._behavioural_measurements.head_balance = float(line.split(' ')[1])
+                if line.split(' ')[0] == 'contacts':
+                    individual.phenotype._behavioural_measurements.contacts = float(line.split(' ')[1])
 
         return individual
 
@@ -135,12 +140,13 @@ class Population:
         Recovers all genotypes and fitnesses of robots in the lastest selected population
         :param gen_num: number of the generation snapshot to recover
         """
-        data_path = self.conf.experiment_management.experiment_folder
-        for r, d, f in os.walk(data_path +'/selectedpop_'+str(gen_num)):
-            for file in f:
-                if 'body' in file:
-                    id = file.split('.')[0].split('_')[-2]+'_'+file.split('.')[0].split('_')[-1]
-                    self.individuals.append(await self.load_individual(id))
+        individuals = self.conf.experiment_management.read_checkpoint(gen_num)
+        if individuals is not None:
+            self.individuals.extend(individuals)
+            return
+
+        for id in self.conf.experiment_management.snapshot_robot_ids(gen_num):
+            self.individuals.append(await self.load_individual(id))
 
     async def load_offspring(self, last_snapshot, population_size, offspring_size, next_robot_id):
         """
@@ -165,6 +171,7 @@ class Population:
         """
         Populates the population (individuals list) with Individual objects that contains their respective genotype.
         """
+        tracer.start_generation(0)
         for i in range(self.conf.population_size-len(recovered_individuals)):
             individual = self._new_individual(self.conf.genotype_constructor(self.conf.genotype_conf, self.next_robot_id))
             self.individuals.append(individual)
@@ -182,9 +189,11 @@ class Population:
         :return: new population
         """
 
+        tracer.start_generation(gen_num)
         new_individuals = []
 
         for _i in range(self.conf.offspring_size-len(recovered_individuals)):
+            breed_start = time.perf_counter()
             # Selection operator (based on fitness)
             # Crossover
             if self.conf.crossover_operator is not None:
@@ -193,14 +202,17 @@ class Population:
                 child = Individual(child_genotype)
             else:
                 child = self.conf.selection(self.individuals)
+                parents = [child]
 
             child.genotype.id = self.next_robot_id
             self.next_robot_id += 1
 
             # Mutation operator
             child_genotype = self.conf.mutation_operator(child.genotype, self.conf.mutation_conf)
+            breed_end = time.perf_counter()
             # Insert individual in new population
-            individual = self._new_individual(child_genotype)
+            individual = self._new_individual(child_genotype, parents)
+            tracer.add_span('breed', breed_start, breed_end, individual.id)
 
             new_individuals.append(individual)
 
@@ -210,11 +222,12 @@ class Population:
         new_individuals = recovered_individuals + new_individuals
 
         # create next population
-        if self.conf.population_management_selector is not None:
-            new_individuals = self.conf.population_management(self.individuals, new_individuals,
-                                                              self.conf.population_management_selector)
-        else:
-            new_individuals = self.conf.population_management(self.individuals, new_individuals)
+        with tracer.span('selection'):
+            if self.conf.population_management_selector is not None:
+                new_individuals = self.conf.population_management(self.individuals, new_individuals,
+                                                                  self.conf.population_management_selector)
+            else:
+                new_individuals = self.conf.population_management(self.individuals, new_individuals)
         new_population = Population(self.conf, self.simulator_queue, self.analyzer_queue, self.next_robot_id)
         new_population.individuals = new_individuals
         logger.info(f'Population selected in gen {gen_num} with {len(new_population.individuals)} individuals...')
@@ -230,10 +243,13 @@ class Population:
         """
         # Parse command line / file input arguments
         # await self.simulator_connection.pause(True)
+        metrics.start_generation(gen_num, len(new_individuals))
         robot_futures = []
         for individual in new_individuals:
             logger.info(f'Evaluating individual (gen {gen_num}) {individual.genotype.id} ...')
-            robot_futures.append(asyncio.ensure_future(self.evaluate_single_robot(individual)))
+            future = asyncio.ensure_future(self.evaluate_single_robot(individual))
+            future.add_done_callback(lambda _future: metrics.inc('generation_robots_evaluated'))
+            robot_futures.append(future)
 
         await asyncio.sleep(1)
 
@@ -246,11 +262,13 @@ class Population:
                 assert (individual.fitness is None)
 
             if type_simulation == 'evolve':
-                self.conf.experiment_management.export_behavior_measures(individual.phenotype.id, individual.phenotype._behavioural_measurements)
+                with tracer.span('export', individual.id):
+                    self.conf.experiment_management.export_behavior_measures(individual.phenotype.id, individual.phenotype._behavioural_measurements)
 
             logger.info(f'Individual {individual.phenotype.id} has a fitness of {individual.fitness}')
             if type_simulation == 'evolve':
-                self.conf.experiment_management.export_fitness(individual)
+                with tracer.span('export', individual.id):
+                    self.conf.experiment_management.export_fitness(individual)
 
     async def evaluate_single_robot(self, individual):
         """
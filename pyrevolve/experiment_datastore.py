@@ -0,0 +1,331 @@
+"""
+Single file alternative to the folders of files written by `ExperimentManagement`
+"""
+import argparse
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+
+from pyrevolve.custom_logging.logger import logger
+
+
+def robot_number(robot_id):
+    """
+    :param robot_id: phenotype id, like 'robot_12'
+    :return: sequential number of the robot, 12, or None if the id does not end with a number
+    """
+    number = str(robot_id).split('_')[-1]
+    return int(number) if number.isdigit() else None
+
+
+class ExperimentDatastore:
+    """
+    SQLite database, in WAL mode, with the genotypes, phenotypes, fitnesses, descriptors, lineage and
+    selected populations of an experiment run.
+
+    Writes are queued and committed in batches by a background thread, so that exporting the data
+    of a robot does not wait for the disk. Reads first wait for the queued writes, and raise the errors of the
+    writes that failed.
+    """
+
+    # rows read at once when exporting the whole datastore
+    PAGE_SIZE = 100
+
+    SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS robots ('
+        ' id TEXT PRIMARY KEY,'
+        ' number INTEGER,'
+        ' genotype TEXT,'
+        ' phenotype TEXT,'
+        ' evaluated INTEGER NOT NULL DEFAULT 0,'
+        ' fitness REAL,'
+        ' behavior_desc TEXT,'
+        ' phenotype_desc TEXT)',
+        'CREATE INDEX IF NOT EXISTS robots_number ON robots (number)',
+        'CREATE INDEX IF NOT EXISTS robots_evaluated ON robots (evaluated, number)',
+        'CREATE TABLE IF NOT EXISTS lineage ('
+        ' robot_id TEXT,'
+        ' parent_id TEXT,'
+        ' PRIMARY KEY (robot_id, parent_id))',
+        'CREATE INDEX IF NOT EXISTS lineage_parent ON lineage (parent_id)',
+        'CREATE TABLE IF NOT EXISTS snapshots ('
+        ' generation INTEGER,'
+        ' position INTEGER,'
+        ' robot_id TEXT,'
+        ' fitness REAL,'
+        ' PRIMARY KEY (generation, position))',
+        'CREATE INDEX IF NOT EXISTS snapshots_robot ON snapshots (robot_id)',
+    )
+
+    def __init__(self, path, batch_size=500, max_queued=10000):
+        """
+        :param path: path of the database file, created if it does not exist
+        :param batch_size: maximum number of writes committed in one transaction
+        :param max_queued: maximum number of queued writes, further writes wait for the background thread
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        with self._connection:
+            for statement in self.SCHEMA:
+                self._connection.execute(statement)
+        self._lock = threading.Lock()
+        self._errors = []
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._writer = threading.Thread(target=self._write_loop, name='ExperimentDatastore', daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            items = [item for item in batch if item is not None]
+            try:
+                self._commit(items)
+            except Exception:
+                # rolled back, the valid items are committed one by one
+                for item in items:
+                    try:
+                        self._commit([item])
+                    except Exception as e:
+                        logger.exception(f'Failed writing {item} to the datastore {self.path}')
+                        with self._lock:
+                            self._errors.append(e)
+            for _ in batch:
+                self._queue.task_done()
+            if len(items) < len(batch):
+                return
+
+    def _commit(self, items):
+        """
+        Executes the statements of the items in one transaction, rolled back if any of them fails
+        """
+        with self._lock, self._connection:
+            for item in items:
+                for sql, params in item:
+                    self._connection.execute(sql, params)
+
+    def _write(self, *statements):
+        """
+        Queues statements that are committed together
+        :param statements: tuples of sql and parameters
+        """
+        if self._connection is None:
+            raise RuntimeError(f'Datastore {self.path} is closed')
+        self._queue.put(statements)
+
+    def _set_robot(self, robot_id, **columns):
+        names = ', '.join(columns)
+        placeholders = ', '.join('?' for _ in columns)
+        updates = ', '.join(f'{name} = excluded.{name}' for name in columns)
+        self._write((f'INSERT INTO robots (id, number, {names}) VALUES (?, ?, {placeholders}) '
+                     f'ON CONFLICT (id) DO UPDATE SET {updates}',
+                     (str(robot_id), robot_number(robot_id), *columns.values())))
+
+    def _query(self, sql, params=()):
+        if self._connection is None:
+            raise RuntimeError(f'Datastore {self.path} is closed')
+        self.flush()
+        with self._lock:
+            return self._connection.execute(sql, params).fetchall()
+
+    def _robot_column(self, robot_id, column):
+        rows = self._query(f'SELECT {column} FROM robots WHERE id = ?', (str(robot_id),))
+        if len(rows) == 0 or rows[0][0] is None:
+            raise KeyError(f'No {column} for robot {robot_id}')
+        return rows[0][0]
+
+    def flush(self):
+        """
+        Waits until all the queued writes are committed
+        :raises RuntimeError: if any write failed since the last flush
+        """
+        self._queue.join()
+        self._raise_errors()
+
+    def _raise_errors(self):
+        with self._lock:
+            errors, self._errors = self._errors, []
+        if len(errors) > 0:
+            raise RuntimeError(f'{len(errors)} writes to the datastore {self.path} failed, '
+                               f'the first with: {errors[0]!r}')
+
+    def close(self):
+        """
+        Waits for the queued writes and closes the database
+        :raises RuntimeError: if any write failed since the last flush
+        """
+        if self._connection is None:
+            return
+        self._queue.put(None)
+        self._writer.join()
+        self._connection.close()
+        self._connection = None
+        atexit.unregister(self.close)
+        self._raise_errors()
+
+    def add_genotype(self, robot_id, genotype):
+        """
+        :param genotype: genotype in text format
+        """
+        self._set_robot(robot_id, genotype=genotype)
+
+    def add_phenotype(self, robot_id, phenotype):
+        """
+        :param phenotype: phenotype in yaml format
+        """
+        self._set_robot(robot_id, phenotype=phenotype)
+
+    def add_fitness(self, robot_id, fitness):
+        """
+        :param fitness: fitness of the robot, None if the evaluation failed
+        """
+        self._set_robot(robot_id, evaluated=1, fitness=None if fitness is None else float(fitness))
+
+    def add_behavior_desc(self, robot_id, descriptors):
+        """
+        :param descriptors: behavioural descriptors, in the format of the descriptors files
+        """
+        self._set_robot(robot_id, behavior_desc=descriptors)
+
+    def add_phenotype_desc(self, robot_id, descriptors):
+        """
+        :param descriptors: morphological and brain descriptors, in the format of the descriptors files
+        """
+        self._set_robot(robot_id, phenotype_desc=descriptors)
+
+    def add_parents(self, robot_id, parent_ids):
+        self._write(*(('INSERT OR IGNORE INTO lineage (robot_id, parent_id) VALUES (?, ?)',
+                       (str(robot_id), str(parent_id))) for parent_id in parent_ids))
+
+    def add_snapshot(self, generation, robots):
+        """
+        Replaces the selected population of a generation, atomically
+        :param generation: number of the generation
+        :param robots: list of (robot id, fitness) tuples
+        """
+        self._write(('DELETE FROM snapshots WHERE generation = ?', (generation,)),
+                    *(('INSERT INTO snapshots (generation, position, robot_id, fitness) VALUES (?, ?, ?, ?)',
+                       (generation, position, str(robot_id), None if fitness is None else float(fitness)))
+                      for position, (robot_id, fitness) in enumerate(robots)))
+
+    def genotype(self, robot_id):
+        return self._robot_column(robot_id, 'genotype')
+
+    def phenotype(self, robot_id):
+        return self._robot_column(robot_id, 'phenotype')
+
+    def fitness(self, robot_id):
+        """
+        :return: fitness of the robot, None if the evaluation failed
+        :raises KeyError: if the robot was not evaluated
+        """
+        rows = self._query('SELECT evaluated, fitness FROM robots WHERE id = ?', (str(robot_id),))
+        if len(rows) == 0 or not rows[0][0]:
+            raise KeyError(f'Robot {robot_id} was not evaluated')
+        return rows[0][1]
+
+    def behavior_desc(self, robot_id):
+        return self._robot_column(robot_id, 'behavior_desc')
+
+    def phenotype_desc(self, robot_id):
+        return self._robot_column(robot_id, 'phenotype_desc')
+
+    def parents(self, robot_id):
+        return [row[0] for row in self._query('SELECT parent_id FROM lineage WHERE robot_id = ?', (str(robot_id),))]
+
+    def children(self, robot_id):
+        return [row[0] for row in self._query('SELECT robot_id FROM lineage WHERE parent_id = ?', (str(robot_id),))]
+
+    def evaluated_robots(self):
+        """
+        :return: list of (robot id, fitness, behaviour descriptors, phenotype descriptors) of the evaluated robots,
+         ordered by their sequential number
+        """
+        return self._query('SELECT id, fitness, behavior_desc, phenotype_desc FROM robots '
+                           'WHERE evaluated = 1 ORDER BY number')
+
+    def snapshot(self, generation):
+        """
+        :return: list of (robot id, fitness) of the selected population of a generation
+        """
+        return self._query('SELECT robot_id, fitness FROM snapshots WHERE generation = ? ORDER BY position',
+                           (generation,))
+
+    def snapshot_generations(self):
+        return [row[0] for row in self._query('SELECT DISTINCT generation FROM snapshots ORDER BY generation')]
+
+    def count_evaluated(self):
+        return self._query('SELECT COUNT(*) FROM robots WHERE evaluated = 1')[0][0]
+
+    def last_evaluated_number(self):
+        """
+        :return: highest sequential number of an evaluated robot, None if no robot was evaluated
+        """
+        return self._query('SELECT MAX(number) FROM robots WHERE evaluated = 1')[0][0]
+
+    def export_folders(self, data_folder):
+        """
+        Writes the content of the datastore in the folder layout of `ExperimentManagement`
+        :param data_folder: the `data_fullevolution` folder
+        """
+        for folder in ('genotypes', 'phenotypes', 'descriptors', 'fitness'):
+            os.makedirs(os.path.join(data_folder, folder), exist_ok=True)
+
+        exported = 0
+        for robot_id, genotype, phenotype, evaluated, fitness, behavior_desc, phenotype_desc in self._robots():
+            exported += 1
+            files = (
+                (genotype, 'genotypes', f'genotype_{robot_id}.txt'),
+                (phenotype, 'phenotypes', f'{robot_id}.yaml'),
+                (str(fitness) if evaluated else None, 'fitness', f'fitness_{robot_id}.txt'),
+                (behavior_desc, 'descriptors', f'behavior_desc_{robot_id}.txt'),
+                (phenotype_desc, 'descriptors', f'phenotype_desc_{robot_id}.txt'),
+            )
+            for content, folder, filename in files:
+                if content is not None:
+                    with open(os.path.join(data_folder, folder, filename), 'w') as f:
+                        f.write(content)
+        logger.info(f'Exported {exported} robots from {self.path} to {data_folder}')
+
+    def _robots(self):
+        """
+        :return: iterator on the (id, genotype, phenotype, evaluated, fitness, behaviour descriptors, phenotype
+         descriptors) of all the robots, read PAGE_SIZE robots at a time
+        """
+        last = 0
+        while True:
+            rows = self._query('SELECT rowid, id, genotype, phenotype, evaluated, fitness, behavior_desc, '
+                               'phenotype_desc FROM robots WHERE rowid > ? ORDER BY rowid LIMIT ?',
+                               (last, self.PAGE_SIZE))
+            for row in rows:
+                yield row[1:]
+            if len(rows) < self.PAGE_SIZE:
+                return
+            last = rows[-1][0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Exports an experiment datastore to the folders of files layout')
+    parser.add_argument('datastore', help='path of the datastore file')
+    parser.add_argument('data_folder', help='destination data_fullevolution folder')
+    args = parser.parse_args()
+
+    datastore = ExperimentDatastore(args.datastore)
+    try:
+        datastore.export_folders(args.data_folder)
+    finally:
+        datastore.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,20 +1,72 @@
+import copy
 import os
+import json
+import pickle
 import shutil
+import time
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from pyrevolve.custom_logging.logger import logger
+from pyrevolve.custom_logging.tracer import tracer
+from pyrevolve.experiment_datastore import ExperimentDatastore
+from pyrevolve.export_writer import ExportWriter, fsync_path
 import sys
 
 
+def render_phenotype(phenotype, body_path, brain_path):
+    """
+    Renders the body and brain images of a phenotype, in a process of the render pool or in the export thread
+    :return: paths of the images whose rendering failed, the failures are logged by the renderer
+    """
+    # traced only in the export thread, the processes of the render pool have no trace
+    with tracer.span('render', phenotype.id):
+        rendered = ((phenotype.render_body(body_path), body_path), (phenotype.render_brain(brain_path), brain_path))
+    return [path for success, path in rendered if not success]
+
+
+def link_file(source, destination):
+    """
+    Hardlinks the file, or copies it where hardlinks are not supported
+    """
+    if os.path.exists(destination):
+        if os.path.samefile(source, destination):
+            return
+        os.remove(destination)
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copyfile(source, destination)
+
+
 class ExperimentManagement:
     # ids of robots in the name of all types of files are always phenotype ids, and the standard for id is 'robot_ID'
 
+    # membership of a snapshot, written last in its folder, so that its presence marks the snapshot as complete
+    SNAPSHOT_MANIFEST = 'snapshot.json'
+
     def __init__(self, settings):
         self.settings = settings
         manager_folder = os.path.dirname(self.settings.manager)
         self._experiment_folder = os.path.join(manager_folder, 'data', self.settings.experiment_name, self.settings.run)
         self._data_folder = os.path.join(self._experiment_folder, 'data_fullevolution')
+        self._datastore = None
+        self.writer = ExportWriter()
+        self._render_pool = None
+        # ids of the robots whose images are rendered, or queued to be, in phenotype_images
+        self._rendered = set()
+        # paths of the images whose rendering failed, only used in the export thread
+        self._failed_renders = set()
+        trace_file = getattr(self.settings, 'trace_file', None)
+        if trace_file is not None and not tracer.enabled:
+            tracer.open(trace_file)
 
     def create_exp_folders(self):
+        self.flush()
+        self._rendered = set()
+        self._failed_renders = set()
+        if self._datastore is not None:
+            self._datastore.close()
+            self._datastore = None
         if os.path.exists(self.experiment_folder):
             shutil.rmtree(self.experiment_folder)
         os.makedirs(self.experiment_folder)
@@ -34,69 +86,379 @@ class ExperimentManagement:
     def data_folder(self):
         return self._data_folder
 
+    @property
+    def datastore_path(self):
+        return os.path.join(self.data_folder, 'datastore.db')
+
+    @property
+    def datastore(self):
+        """
+        Datastore of the experiment, None if the data is stored in a file per robot and descriptor
+        """
+        if self._datastore is None and getattr(self.settings, 'datastore', 'files') == 'sqlite':
+            self._datastore = ExperimentDatastore(self.datastore_path)
+        return self._datastore
+
+    def flush(self, sync=False):
+        """
+        Waits until the exports queued in the background are written
+        :param sync: also synchronize the written files to disk
+        """
+        self.writer.flush(sync)
+        if self._datastore is not None:
+            self._datastore.flush()
+
     def export_genotype(self, individual):
         if self.settings.recovery_enabled:
-            individual.export_genotype(self.data_folder)
+            if self.datastore is not None:
+                self.datastore.add_genotype(individual.phenotype.id, individual.genotype.to_txt())
+            else:
+                self.writer.write(os.path.join(self.data_folder, 'genotypes', f'genotype_{individual.phenotype.id}.txt'),
+                                  individual.genotype.to_txt())
 
     def export_phenotype(self, individual):
         if self.settings.export_phenotype:
-            individual.export_phenotype(self.data_folder)
+            if self.datastore is not None:
+                self.datastore.add_phenotype(individual.phenotype.id, individual.phenotype.to_yaml())
+            else:
+                self.writer.write(os.path.join(self.data_folder, 'phenotypes', f'{individual.phenotype.id}.yaml'),
+                                  individual.phenotype.to_yaml())
+
+    def export_parents(self, individual):
+        """
+        Records the lineage of the individual, only in the datastore since the files layout has no place for it
+        """
+        if self.datastore is not None and individual.parents:
+            self.datastore.add_parents(individual.phenotype.id, list(individual.parents))
+
+    def export_phenotype_measurements(self, individual):
+        if self.datastore is not None:
+            self.datastore.add_phenotype_desc(individual.phenotype.id, individual.phenotype.measurements_to_txt())
+        else:
+            self.writer.write(os.path.join(self.data_folder, 'descriptors', f'phenotype_desc_{individual.phenotype.id}.txt'),
+                              individual.phenotype.measurements_to_txt())
 
     def export_fitnesses(self, individuals):
-        folder = self.data_folder
+        if self.datastore is not None:
+            for individual in individuals:
+                self.datastore.add_fitness(individual.id, individual.fitness)
+            return
         for individual in individuals:
-            individual.export_fitness(folder)
+            self.writer.write(os.path.join(self.data_folder, f'fitness_{individual.id}.txt'), str(individual.fitness))
 
     def export_fitness(self, individual):
-        folder = os.path.join(self.data_folder, 'fitness')
-        individual.export_fitness(folder)
+        if self.datastore is not None:
+            self.datastore.add_fitness(individual.id, individual.fitness)
+            return
+        self.writer.write(os.path.join(self.data_folder, 'fitness', f'fitness_{individual.id}.txt'), str(individual.fitness))
+
+    @staticmethod
+    def behavior_measures_to_txt(measures):
+        """
+        :param measures: dictionary of behavioural measures, or None if the robot was not evaluated
+        :return: text of the behaviour descriptors file
+        """
+        if measures is None:
+            return str(None)
+        return ''.join(f"{key} {val}\n" for key, val in measures.items())
 
     def export_behavior_measures(self, _id, measures):
-        filename = os.path.join(self.data_folder, 'descriptors', f'behavior_desc_{_id}.txt')
-        with open(filename, "w") as f:
-            if measures is None:
-                f.write(str(None))
+        if self.datastore is not None:
+            self.datastore.add_behavior_desc(_id, self.behavior_measures_to_txt(measures))
+            return
+        self.writer.write(os.path.join(self.data_folder, 'descriptors', f'behavior_desc_{_id}.txt'),
+                          self.behavior_measures_to_txt(measures))
+
+    def load_genotype(self, genotype, _id):
+        """
+        Loads the exported genotype of a robot
+        :param genotype: empty genotype to load into
+        :param _id: phenotype id of the robot
+        """
+        self.writer.flush()
+        if self.datastore is not None:
+            genotype.load_txt(self.datastore.genotype(_id))
+        else:
+            genotype.load_genotype(os.path.join(self.data_folder, 'genotypes', f'genotype_{_id}.txt'))
+
+    def read_fitness(self, _id):
+        """
+        :return: exported fitness of a robot, None if its evaluation failed
+        """
+        self.writer.flush()
+        if self.datastore is not None:
+            return self.datastore.fitness(_id)
+        with open(os.path.join(self.data_folder, 'fitness', f'fitness_{_id}.txt')) as f:
+            data = f.readlines()[0]
+        return None if data == 'None' else float(data)
+
+    def read_behavior_measures(self, _id):
+        """
+        :return: lines of the exported behaviour descriptors of a robot, the only line is 'None' if it was not evaluated
+        """
+        self.writer.flush()
+        if self.datastore is not None:
+            return self.datastore.behavior_desc(_id).splitlines(keepends=True)
+        with open(os.path.join(self.data_folder, 'descriptors', f'behavior_desc_{_id}.txt')) as f:
+            return f.readlines()
+
+    @property
+    def render_pool(self):
+        """
+        Pool of processes rendering the phenotype images, None if they are rendered in the export thread
+        """
+        n_workers = getattr(self.settings, 'render_workers', 0)
+        if self._render_pool is None and n_workers > 0:
+            self._render_pool = ProcessPoolExecutor(max_workers=n_workers)
+        return self._render_pool
+
+    def phenotype_image_paths(self, _id):
+        """
+        :param _id: phenotype id of the robot
+        :return: paths of the body and brain images of the robot in the phenotype_images folder
+        """
+        folder = os.path.join(self.data_folder, 'phenotype_images')
+        return os.path.join(folder, f'body_{_id}.png'), os.path.join(folder, f'brain_{_id}.png')
+
+    def render_phenotype_images(self, individual, wait=False):
+        """
+        Renders the body and brain images of the individual in the phenotype_images folder,
+        unless they are already rendered
+        :param individual: individual to render
+        :param wait: wait until the images are written, otherwise they are rendered in the background
+        :return: paths of the body and brain images
+        """
+        _id = individual.phenotype.id
+        body_path, brain_path = self.phenotype_image_paths(_id)
+        if _id not in self._rendered and not (os.path.exists(body_path) and os.path.exists(brain_path)):
+            # the substrate is computed here so that the renderer only reads the phenotype
+            individual.phenotype.substrate
+            if self.render_pool is not None:
+                future = self.render_pool.submit(render_phenotype, individual.phenotype, body_path, brain_path)
+                self.writer.submit(self._wait_render, future, sync_paths=(body_path, brain_path))
             else:
-                for key, val in measures.items():
-                    f.write(f"{key} {val}\n")
+                # rendering happens in the writer thread, which is the only one drawing
+                self.writer.submit(self._render, individual.phenotype, body_path, brain_path,
+                                   sync_paths=(body_path, brain_path))
+        self._rendered.add(_id)
+        if wait:
+            self.writer.flush()
+        return body_path, brain_path
+
+    def _render(self, phenotype, body_path, brain_path):
+        self._failed_renders.update(render_phenotype(phenotype, body_path, brain_path))
+
+    def _wait_render(self, future):
+        self._failed_renders.update(future.result())
+
+    def _link_image(self, path, destination):
+        if path in self._failed_renders:
+            logger.warning(f'Not exporting {destination}, its rendering failed')
+            return
+        link_file(path, destination)
+
+    def export_new_individual_images(self, individual):
+        """
+        Renders the images of a newly created individual, if every individual is rendered.
+        Otherwise they are rendered when the individual is selected in a snapshot, or on request.
+        """
+        if getattr(self.settings, 'phenotype_images', 'snapshots') == 'all':
+            self.render_phenotype_images(individual)
 
     def export_phenotype_images(self, dirpath, individual):
-        individual.phenotype.render_body(os.path.join(self.experiment_folder, dirpath, f'body_{individual.phenotype.id}.png'))
-        individual.phenotype.render_brain(os.path.join(self.experiment_folder, dirpath, f'brain_{individual.phenotype.id}.png'))
+        """
+        Exports the body and brain images of the individual, rendered only once, in a folder of the experiment
+        :param dirpath: folder relative to the experiment folder
+        """
+        body_path, brain_path = self.render_phenotype_images(individual)
+        folder = os.path.join(self.experiment_folder, dirpath)
+        if os.path.abspath(folder) == os.path.abspath(os.path.dirname(body_path)):
+            return
+        for path in (body_path, brain_path):
+            destination = os.path.join(folder, os.path.basename(path))
+            self.writer.submit(self._link_image, path, destination, sync_paths=(destination,))
 
     def export_failed_eval_robot(self, individual):
-        individual.genotype.export_genotype(os.path.join(self.data_folder, 'failed_eval_robots', f'genotype_{individual.phenotype.id}.txt'))
-        individual.phenotype.save_file(os.path.join(self.data_folder, 'failed_eval_robots', f'phenotype_{individual.phenotype.id}.yaml'))
-        individual.phenotype.save_file(os.path.join(self.data_folder, 'failed_eval_robots', f'phenotype_{individual.phenotype.id}.sdf'), conf_type='sdf')
+        folder = os.path.join(self.data_folder, 'failed_eval_robots')
+        self.writer.write(os.path.join(folder, f'genotype_{individual.phenotype.id}.txt'), individual.genotype.to_txt())
+        self.writer.write(os.path.join(folder, f'phenotype_{individual.phenotype.id}.yaml'), individual.phenotype.to_yaml())
+        self.writer.write(os.path.join(folder, f'phenotype_{individual.phenotype.id}.sdf'), individual.phenotype.to_sdf(nice_format=True))
+
+    @property
+    def checkpoints_folder(self):
+        return os.path.join(self.experiment_folder, 'checkpoints')
+
+    @property
+    def checkpoint_manifest_path(self):
+        return os.path.join(self.checkpoints_folder, 'manifest.json')
+
+    @staticmethod
+    def _write_atomically(path, data):
+        """
+        Writes the file through a temporary one, so that a crash never leaves it partially written
+        :param data: bytes to write
+        """
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        fsync_path(os.path.dirname(path))
+
+    def export_checkpoint(self, individuals, gen_num, next_robot_id):
+        """
+        Saves the selected population, with developed and measured phenotypes, in a single file,
+        and then updates the manifest that points to it
+        :param individuals: selected population of the generation
+        :param gen_num: number of the generation
+        :param next_robot_id: (sequential) id of the next individual to be created
+        """
+        os.makedirs(self.checkpoints_folder, exist_ok=True)
+        if self.datastore is not None:
+            # the datastore must hold every robot the manifest counts as created
+            self.datastore.flush()
+        # only the ids of the parents, so that the checkpoint holds a single generation and not its ancestry
+        checkpoint = []
+        for individual in individuals:
+            individual = copy.copy(individual)
+            if individual.parents is not None:
+                individual.parents = [getattr(parent, 'id', parent) for parent in individual.parents]
+            checkpoint.append(individual)
+        self._write_atomically(os.path.join(self.checkpoints_folder, f'generation_{gen_num}.pickle'),
+                               pickle.dumps(checkpoint, protocol=pickle.HIGHEST_PROTOCOL))
+        manifest = {'generation': gen_num, 'next_robot_id': next_robot_id}
+        self._write_atomically(self.checkpoint_manifest_path, json.dumps(manifest).encode())
+
+    def read_checkpoint_manifest(self):
+        """
+        :return: dictionary with the `generation` of the latest checkpoint and the `next_robot_id` after it,
+         None if there are no checkpoints
+        """
+        if not os.path.exists(self.checkpoint_manifest_path):
+            return None
+        with open(self.checkpoint_manifest_path) as f:
+            return json.load(f)
 
-    def export_snapshots(self, individuals, gen_num):
+    def read_checkpoint(self, gen_num):
+        """
+        :param gen_num: number of the generation
+        :return: list of the individuals of the checkpoint, None if the generation has no checkpoint
+        """
+        path = os.path.join(self.checkpoints_folder, f'generation_{gen_num}.pickle')
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+    def export_snapshots(self, individuals, gen_num, next_robot_id=None):
+        """
+        :param individuals: selected population of the generation
+        :param gen_num: number of the generation
+        :param next_robot_id: (sequential) id of the next individual to be created, if given the
+         population is also saved in a checkpoint for fast recovery
+        """
         if self.settings.recovery_enabled:
+            snapshot_start = time.perf_counter()
+            self.writer.flush()
             path = os.path.join(self.experiment_folder, f'selectedpop_{gen_num}')
-            if os.path.exists(path):
-                shutil.rmtree(path)
-            os.mkdir(path)
+            os.makedirs(path, exist_ok=True)
+            # a snapshot exported again is incomplete until its new manifest is written,
+            # and keeps only the images of its new members
+            members = {f'{image}_{ind.id}.png' for ind in individuals for image in ('body', 'brain')}
+            for name in os.listdir(path):
+                if name not in members:
+                    os.remove(os.path.join(path, name))
             for ind in individuals:
                 self.export_phenotype_images(f'selectedpop_{str(gen_num)}', ind)
+            # the snapshot is recorded only once all the files of its robots are on disk
+            self.flush(sync=True)
+            manifest = {
+                'generation': gen_num,
+                'robots': [{'id': ind.id, 'fitness': ind.fitness} for ind in individuals],
+            }
+            self._write_atomically(os.path.join(path, self.SNAPSHOT_MANIFEST), json.dumps(manifest).encode())
+            if self.datastore is not None:
+                self.datastore.add_snapshot(gen_num, [(ind.id, ind.fitness) for ind in individuals])
+            if next_robot_id is not None:
+                self.export_checkpoint(individuals, gen_num, next_robot_id)
+            tracer.add_span('snapshot', snapshot_start)
             logger.info(f'Exported snapshot {str(gen_num)} with {str(len(individuals))} individuals')
 
+    def read_snapshot_manifest(self, gen_num):
+        """
+        :param gen_num: number of the generation
+        :return: dictionary with the `generation` and its `robots`, as a list of `id` and `fitness` dictionaries,
+         None if the snapshot is incomplete or was exported without manifest
+        """
+        path = os.path.join(self.experiment_folder, f'selectedpop_{gen_num}', self.SNAPSHOT_MANIFEST)
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def snapshot_robot_ids(self, gen_num):
+        """
+        :param gen_num: number of the generation
+        :return: ids of the robots in the exported snapshot of the generation
+        """
+        if self.datastore is not None:
+            return [robot_id for robot_id, _fitness in self.datastore.snapshot(gen_num)]
+        self.writer.flush()
+        manifest = self.read_snapshot_manifest(gen_num)
+        if manifest is not None:
+            return [robot['id'] for robot in manifest['robots']]
+        robot_ids = []
+        for r, d, f in os.walk(os.path.join(self.experiment_folder, f'selectedpop_{gen_num}')):
+            for file in f:
+                if 'body' in file:
+                    robot_ids.append(file.split('.')[0].split('_')[-2]+'_'+file.split('.')[0].split('_')[-1])
+        return robot_ids
+
     def experiment_is_new(self):
         if not os.path.exists(self.experiment_folder):
             return True
+        if getattr(self.settings, 'datastore', 'files') == 'sqlite':
+            return not os.path.exists(self.datastore_path) or self.datastore.count_evaluated() == 0
         path, dirs, files = next(os.walk(os.path.join(self.data_folder, 'fitness')))
         if len(files) == 0:
             return True
         else:
             return False
 
+    def _is_evaluated(self, _id):
+        if self.datastore is not None:
+            try:
+                self.datastore.fitness(_id)
+                return True
+            except KeyError:
+                return False
+        return os.path.exists(os.path.join(self.data_folder, 'fitness', f'fitness_{_id}.txt'))
+
     def read_recovery_state(self, population_size, offspring_size):
+        manifest = self.read_checkpoint_manifest()
+        if manifest is not None:
+            # robots evaluated after the checkpoint belong to the unfinished offspring
+            next_robot_id = manifest['next_robot_id']
+            while self._is_evaluated(f'robot_{next_robot_id}'):
+                next_robot_id += 1
+            return manifest['generation'], next_robot_id > manifest['next_robot_id'], next_robot_id
+
+        if self.datastore is not None:
+            return self._read_datastore_recovery_state(population_size, offspring_size)
+
         snapshots = []
 
-        for r, d, f in os.walk(self.experiment_folder):
-            for dir in d:
-                if 'selectedpop' in dir:
-                    exported_files = len([name for name in os.listdir(os.path.join(self.experiment_folder, dir)) if os.path.isfile(os.path.join(self.experiment_folder, dir, name))])
-                    if exported_files == (population_size * 2): # body and brain files
-                        snapshots.append(int(dir.split('_')[1]))
+        for dir in os.listdir(self.experiment_folder):
+            if dir.startswith('selectedpop_') and os.path.isdir(os.path.join(self.experiment_folder, dir)):
+                gen_num = int(dir.split('_')[1])
+                if os.path.exists(os.path.join(self.experiment_folder, dir, self.SNAPSHOT_MANIFEST)):
+                    snapshots.append(gen_num)
+                    continue
+                # snapshots exported without manifest are complete when they have all the images
+                exported_files = len([name for name in os.listdir(os.path.join(self.experiment_folder, dir)) if os.path.isfile(os.path.join(self.experiment_folder, dir, name))])
+                if exported_files == (population_size * 2): # body and brain files
+                    snapshots.append(gen_num)
 
         if len(snapshots) > 0:
             # the latest complete snapshot
@@ -121,3 +483,13 @@ class ExperimentManagement:
             has_offspring = False
 
         return last_snapshot, has_offspring, last_id+1
+
+    def _read_datastore_recovery_state(self, population_size, offspring_size):
+        # a snapshot is written in a single transaction, so the datastore never holds a partial one
+        snapshots = self.datastore.snapshot_generations()
+        last_snapshot = snapshots[-1] if len(snapshots) > 0 else -1
+        n_robots = population_size + last_snapshot * offspring_size if last_snapshot >= 0 else 0
+
+        last_id = self.datastore.last_evaluated_number()
+        has_offspring = last_id > n_robots
+        return last_snapshot, has_offspring, last_id+1
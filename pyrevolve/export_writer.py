@@ -0,0 +1,170 @@
+"""
+Background writer for the files exported during an experiment
+"""
+import atexit
+import os
+import queue
+import threading
+import time
+
+from pyrevolve.custom_logging.logger import logger
+from pyrevolve.custom_logging.tracer import tracer
+
+
+class ExportWriter:
+    """
+    Thread that writes the exported files in the background, so that the event loop does not wait for the disk.
+
+    Exports are executed in the order they are submitted, hence the files of a robot are written in order.
+    The queue is bounded: when it is full, exporting blocks until the writer catches up, and the time spent
+    waiting is reported as backpressure.
+    """
+
+    def __init__(self, max_queued=1000, batch_size=100, backpressure_warning=1.0):
+        """
+        :param max_queued: maximum number of pending exports
+        :param batch_size: maximum number of exports executed each time the writer wakes up
+        :param backpressure_warning: seconds of blocking, while submitting an export, after which a warning is logged
+        """
+        self.batch_size = batch_size
+        self.backpressure_warning = backpressure_warning
+        # number of times an export had to wait for a free slot in the queue, and total seconds waited
+        self.backpressure_count = 0
+        self.backpressure_time = 0.0
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._lock = threading.Lock()
+        self._errors = []
+        # files written since the last synchronization to disk
+        self._unsynced = set()
+        self._thread = None
+        self._closed = False
+
+    def _start(self):
+        if self._closed:
+            raise RuntimeError('ExportWriter is closed')
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._write_loop, name='ExportWriter', daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            for task in batch:
+                if task is None:
+                    continue
+                function, args, sync_paths = task
+                try:
+                    function(*args)
+                    if len(sync_paths) > 0:
+                        with self._lock:
+                            self._unsynced.update(sync_paths)
+                except Exception as e:
+                    logger.exception(f'Failed export {function.__name__}{args}')
+                    with self._lock:
+                        self._errors.append(e)
+                finally:
+                    self._queue.task_done()
+            if None in batch:
+                self._queue.task_done()
+                return
+
+    @property
+    def pending(self):
+        """
+        Number of exports not started yet
+        """
+        return self._queue.qsize()
+
+    def submit(self, function, *args, sync_paths=()):
+        """
+        Queues an export
+        :param function: function that does the export, called with `args` in the writer thread
+        :param sync_paths: files written by the export, synchronized to disk by `flush(sync=True)`
+        """
+        self._start()
+        task = (function, args, sync_paths)
+        try:
+            self._queue.put_nowait(task)
+            return
+        except queue.Full:
+            pass
+
+        start = time.perf_counter()
+        self._queue.put(task)
+        waited = time.perf_counter() - start
+        self.backpressure_count += 1
+        self.backpressure_time += waited
+        if waited > self.backpressure_warning:
+            logger.warning(f'Export writer is falling behind: waited {waited:.2f}s for the queue, '
+                           f'{self.backpressure_count} waits for {self.backpressure_time:.2f}s in total')
+
+    def write(self, path, content):
+        """
+        Queues writing a text file
+        :param path: path of the file, overwritten if it exists
+        :param content: string written in the file
+        """
+        self.submit(_write_file, path, content, sync_paths=(path,))
+
+    def flush(self, sync=False):
+        """
+        Waits until all the queued exports are done
+        :param sync: also synchronize the written files and their folders to disk
+        :raises RuntimeError: if any export failed since the last flush
+        """
+        if self._thread is not None:
+            tracer.gauge('export queue', self.pending)
+            with tracer.span('export wait'):
+                self._queue.join()
+
+        with self._lock:
+            errors, self._errors = self._errors, []
+            unsynced = self._unsynced if sync else set()
+            if sync:
+                self._unsynced = set()
+        if sync:
+            for path in unsynced | {os.path.dirname(path) for path in unsynced}:
+                fsync_path(path)
+        if len(errors) > 0:
+            raise RuntimeError(f'{len(errors)} exports failed, the first with: {errors[0]!r}')
+
+    def close(self):
+        """
+        Waits for the queued exports and stops the writer thread
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            atexit.unregister(self.close)
+
+
+def _write_file(path, content):
+    with open(path, 'w') as f:
+        f.write(content)
+
+
+def fsync_path(path):
+    """
+    Synchronizes a file or a folder to disk, if it still exists
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except FileNotFoundError:
+        # removed after being written
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        # some file systems do not support synchronizing folders
+        pass
+    finally:
+        os.close(fd)
@@ -0,0 +1,501 @@
+"""
+Local stand-in for gzserver, to load test the connections to the simulators without Gazebo.
+
+Implements the subset of the Gazebo transport protocol used by `pygazebo`: the master handshake, advertise and
+subscribe negotiation and the topic connections. Behind the topics, it answers the requests of `WorldManager`,
+`World` and `BodyAnalyzer` like the Revolve world and analyzer plugins do, and publishes robot states and ground
+contacts of the inserted robots at the requested state update frequency.
+
+Usage: python -m pyrevolve.gazebo.fake_server --port 11345 --real-time-factor 0
+"""
+import argparse
+import asyncio
+import math
+import re
+import time
+import zlib
+
+from pygazebo.msg import contacts_pb2
+from pygazebo.msg import gz_string_pb2
+from pygazebo.msg import gz_string_v_pb2
+from pygazebo.msg import packet_pb2
+from pygazebo.msg import publish_pb2
+from pygazebo.msg import publishers_pb2
+from pygazebo.msg import request_pb2
+from pygazebo.msg import response_pb2
+from pygazebo.msg import subscribe_pb2
+from pygazebo.msg import world_control_pb2
+
+from pyrevolve.custom_logging.logger import logger
+from pyrevolve.spec.msgs import BodyAnalysisResponse, ModelInserted, RobotStates
+
+# messages are prefixed by their length, as 8 hexadecimal digits
+HEADER_SIZE = 8
+
+_MODEL_RE = re.compile(r'<model name="([^"]+)"[^>]*>\s*(?:<pose>([^<]*)</pose>)?')
+_LINK_POSE_RE = re.compile(r'<link name="[^"]*"[^>]*>\s*<pose>([^<]*)</pose>')
+# half size of a module, added around the link positions to estimate the bounding box
+_MODULE_RADIUS = 0.0445
+
+
+def frame(data):
+    """
+    :param data: serialized message
+    :return: the message, prefixed by its length
+    """
+    return b'%08X' % len(data) + data
+
+
+def packet(packet_type, message):
+    """
+    :return: framed `Packet` wrapping the message, as exchanged with the master and to subscribe to a topic
+    """
+    msg = packet_pb2.Packet()
+    now = time.time()
+    msg.stamp.sec = int(now)
+    msg.stamp.nsec = int(math.fmod(now, 1) * 1e9)
+    msg.type = packet_type
+    msg.serialized_data = message.SerializeToString()
+    return frame(msg.SerializeToString())
+
+
+async def read_message(reader):
+    """
+    :return: next serialized message of the connection
+    :raises asyncio.IncompleteReadError: if the connection is closed
+    """
+    header = await reader.readexactly(HEADER_SIZE)
+    return await reader.readexactly(int(header, 16))
+
+
+def _set_time(msg, seconds):
+    msg.sec = int(seconds)
+    msg.nsec = int(round((seconds - int(seconds)) * 1e9))
+
+
+def _parse_pose(text):
+    if not text:
+        return 0.0, 0.0, 0.0
+    x, y, z = (float(value) for value in text.split()[:3])
+    return x, y, z
+
+
+class FakeModel:
+    """
+    Robot inserted in the fake world, moving in a straight line from its insertion pose,
+    with a heading and a speed derived from its name
+    """
+
+    def __init__(self, model_id, name, position, lifespan, n_links, speed):
+        self.id = model_id
+        self.name = name
+        self.start = position
+        self.lifespan = lifespan
+        self.n_links = n_links
+        self.age = 0.0
+        checksum = zlib.crc32(name.encode())
+        self.heading = (checksum % 3600) / 3600 * 2 * math.pi - math.pi
+        self.speed = speed * (0.5 + (checksum // 3600 % 1000) / 2000)
+
+    @property
+    def dead(self):
+        return self.lifespan is not None and self.age >= self.lifespan
+
+    def position(self):
+        distance = self.speed * self.age
+        x, y, z = self.start
+        return x + distance * math.cos(self.heading), y + distance * math.sin(self.heading), z
+
+    def set_pose(self, pose):
+        pose.position.x, pose.position.y, pose.position.z = self.position()
+        pose.orientation.w = math.cos(self.heading / 2)
+        pose.orientation.x = 0
+        pose.orientation.y = 0
+        pose.orientation.z = math.sin(self.heading / 2)
+
+
+class FakeGazeboServer:
+    """
+    Master and single node of a fake Gazebo transport network.
+
+    Clients connect to the master port, which relays the advertisements and subscriptions between them, and to the
+    topics of the server itself, which are served on a second port.
+    """
+
+    # topics published by the server, with their message types
+    PUBLISHED_TOPICS = {
+        '/gazebo/default/response': 'gazebo.msgs.Response',
+        '/gazebo/default/battery_level/response': 'gazebo.msgs.Response',
+        '/gazebo/default/revolve/robot_states': 'revolve.msgs.RobotStates',
+        '/gazebo/default/physics/contacts': 'gazebo.msgs.Contacts',
+    }
+
+    # topics the server subscribes to, with the name of their handler
+    SUBSCRIBED_TOPICS = {
+        '/gazebo/default/request': '_handle_request',
+        '/gazebo/default/battery_level/request': '_handle_battery_request',
+        '/gazebo/default/world_control': '_handle_world_control',
+    }
+
+    def __init__(self, host='127.0.0.1', port=11345, real_time_factor=1.0, speed=0.1, response_delay=0.0,
+                 state_update_frequency=5):
+        """
+        :param host: address the server listens on
+        :param port: port of the master, 0 for any free port
+        :param real_time_factor: simulation seconds per wall clock second, 0 to simulate as fast as possible
+        :param speed: speed, in meters per second, of the fastest robots
+        :param response_delay: seconds before answering a request
+        :param state_update_frequency: robot states published per simulation second,
+         until a client sets the frequency with a request
+        """
+        self.host = host
+        self.port = port
+        self.real_time_factor = real_time_factor
+        self.speed = speed
+        self.response_delay = response_delay
+        self.state_update_frequency = state_update_frequency
+        self.sim_time = 0.0
+        self.paused = False
+        self.models = {}
+        # counters of the handled traffic
+        self.stats = {'connections': 0, 'requests': 0, 'published': 0}
+        self._model_id = 0
+        self._master = None
+        self._node = None
+        self._node_port = None
+        self._simulation = None
+        # writers of the master connections
+        self._clients = set()
+        # advertised topics, as (Publish message, writer of the advertising client or None for the server)
+        self._publishers = []
+        # subscriptions, as (Subscribe message, writer of the subscribed client)
+        self._subscribers = []
+        # writers of the connections subscribed to the topics of the server, by topic
+        self._listeners = {topic: set() for topic in self.PUBLISHED_TOPICS}
+        # connections of the server to the publishers of the clients
+        self._subscriptions = set()
+
+    async def start(self):
+        self._node = await asyncio.start_server(self._handle_node_connection, self.host, 0)
+        self._node_port = self._node.sockets[0].getsockname()[1]
+        self._master = await asyncio.start_server(self._handle_master_connection, self.host, self.port)
+        self.port = self._master.sockets[0].getsockname()[1]
+        for topic, msg_type in self.PUBLISHED_TOPICS.items():
+            self._publishers.append((self._publish_msg(topic, msg_type, self.host, self._node_port), None))
+        self._simulation = asyncio.ensure_future(self._simulate())
+        logger.info(f'Fake gzserver listening on {self.host}:{self.port}')
+
+    async def stop(self):
+        self._simulation.cancel()
+        self._master.close()
+        self._node.close()
+        await self.drop_connections()
+        await self._master.wait_closed()
+        await self._node.wait_closed()
+
+    async def drop_connections(self):
+        """
+        Closes the connections of all clients, as a crashed simulator would, while still accepting new ones
+        """
+        writers = set(self._clients) | set(self._subscriptions)
+        for listeners in self._listeners.values():
+            writers |= listeners
+        for writer in writers:
+            writer.close()
+        self._clients.clear()
+        self._subscriptions.clear()
+        for listeners in self._listeners.values():
+            listeners.clear()
+        self._publishers = [(msg, owner) for msg, owner in self._publishers if owner is None]
+        self._subscribers = []
+
+    @staticmethod
+    def _publish_msg(topic, msg_type, host, port):
+        msg = publish_pb2.Publish()
+        msg.topic = topic
+        msg.msg_type = msg_type
+        msg.host = host
+        msg.port = port
+        return msg
+
+    # Master
+
+    async def _handle_master_connection(self, reader, writer):
+        self.stats['connections'] += 1
+        self._clients.add(writer)
+        version = gz_string_pb2.GzString()
+        version.data = 'gazebo 10.0'
+        namespaces = gz_string_v_pb2.GzString_V()
+        namespaces.data.append('default')
+        publishers = publishers_pb2.Publishers()
+        for msg, _owner in self._publishers:
+            publishers.publisher.add().CopyFrom(msg)
+        writer.write(packet('version_init', version))
+        # misspelled like in Gazebo
+        writer.write(packet('topic_namepaces_init', namespaces))
+        writer.write(packet('publishers_init', publishers))
+
+        try:
+            while True:
+                msg = packet_pb2.Packet.FromString(await read_message(reader))
+                if msg.type == 'advertise':
+                    self._advertise(publish_pb2.Publish.FromString(msg.serialized_data), writer)
+                elif msg.type == 'subscribe':
+                    self._subscribe(subscribe_pb2.Subscribe.FromString(msg.serialized_data), writer)
+                elif msg.type == 'unadvertise':
+                    publish = publish_pb2.Publish.FromString(msg.serialized_data)
+                    self._publishers = [(other, owner) for other, owner in self._publishers
+                                        if not (owner is writer and other.topic == publish.topic)]
+                elif msg.type == 'unsubscribe':
+                    subscribe = subscribe_pb2.Subscribe.FromString(msg.serialized_data)
+                    self._subscribers = [(other, owner) for other, owner in self._subscribers
+                                         if not (owner is writer and other.topic == subscribe.topic)]
+                else:
+                    logger.warning(f'Fake gzserver ignored master message {msg.type}')
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._clients.discard(writer)
+            self._publishers = [(msg, owner) for msg, owner in self._publishers if owner is not writer]
+            self._subscribers = [(msg, owner) for msg, owner in self._subscribers if owner is not writer]
+            writer.close()
+
+    def _advertise(self, publish, writer):
+        self._publishers.append((publish, writer))
+        for client in self._clients:
+            client.write(packet('publisher_add', publish))
+        for subscribe, subscriber in self._subscribers:
+            if subscribe.topic == publish.topic:
+                subscriber.write(packet('publisher_advertise', publish))
+        if publish.topic in self.SUBSCRIBED_TOPICS:
+            asyncio.ensure_future(self._subscribe_to_client(publish))
+
+    def _subscribe(self, subscribe, writer):
+        self._subscribers.append((subscribe, writer))
+        for publish, _owner in self._publishers:
+            if publish.topic == subscribe.topic:
+                writer.write(packet('publisher_subscribe', publish))
+
+    # Topics of the server
+
+    async def _handle_node_connection(self, reader, writer):
+        """
+        Connection of a client subscribing to a topic of the server
+        """
+        topic = None
+        try:
+            msg = packet_pb2.Packet.FromString(await read_message(reader))
+            if msg.type != 'sub':
+                logger.warning(f'Fake gzserver expected a subscription, received {msg.type}')
+                return
+            topic = subscribe_pb2.Subscribe.FromString(msg.serialized_data).topic
+            if topic not in self._listeners:
+                logger.warning(f'Fake gzserver does not publish {topic}')
+                return
+            self._listeners[topic].add(writer)
+            # subscribers do not send anything else, wait for the connection to be closed
+            await reader.read()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            if topic in self._listeners:
+                self._listeners[topic].discard(writer)
+            writer.close()
+
+    def _publish(self, topic, message):
+        data = frame(message.SerializeToString())
+        for writer in self._listeners[topic]:
+            writer.write(data)
+            self.stats['published'] += 1
+
+    # Topics of the clients
+
+    async def _subscribe_to_client(self, publish):
+        try:
+            reader, writer = await asyncio.open_connection(publish.host, publish.port)
+        except OSError:
+            logger.exception(f'Fake gzserver could not subscribe to {publish.topic} at {publish.host}:{publish.port}')
+            return
+        self._subscriptions.add(writer)
+        subscribe = subscribe_pb2.Subscribe()
+        subscribe.topic = publish.topic
+        subscribe.host = self.host
+        subscribe.port = self._node_port
+        subscribe.msg_type = publish.msg_type
+        subscribe.latching = False
+        writer.write(packet('sub', subscribe))
+
+        handler = getattr(self, self.SUBSCRIBED_TOPICS[publish.topic])
+        try:
+            while True:
+                handler(await read_message(reader))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._subscriptions.discard(writer)
+            writer.close()
+
+    def _handle_request(self, data):
+        request = request_pb2.Request.FromString(data)
+        self.stats['requests'] += 1
+        asyncio.ensure_future(self._respond('/gazebo/default/response', request))
+
+    def _handle_battery_request(self, data):
+        request = request_pb2.Request.FromString(data)
+        self.stats['requests'] += 1
+        asyncio.ensure_future(self._respond('/gazebo/default/battery_level/response', request))
+
+    def _handle_world_control(self, data):
+        msg = world_control_pb2.WorldControl.FromString(data)
+        if msg.HasField('pause'):
+            self.paused = msg.pause
+        if msg.HasField('reset'):
+            if msg.reset.all or msg.reset.time_only:
+                self.sim_time = 0.0
+            if msg.reset.all or msg.reset.model_only:
+                for model in self.models.values():
+                    model.age = 0.0
+
+    async def _respond(self, topic, request):
+        if self.response_delay > 0:
+            await asyncio.sleep(self.response_delay)
+        response = response_pb2.Response()
+        response.id = request.id
+        response.request = request.request
+        response.response = 'success'
+        try:
+            if request.request == 'insert_sdf':
+                self._insert_sdf(request, response)
+            elif request.request in ('delete_robot', 'entity_delete'):
+                if self.models.pop(request.data, None) is None:
+                    response.response = 'error'
+            elif request.request == 'set_robot_state_update_frequency':
+                self.state_update_frequency = int(request.data)
+            elif request.request == 'analyze_body':
+                response.serialized_data = self._analyze_body(request.data).SerializeToString()
+            elif request.request != 'set_battery_level':
+                response.response = 'error'
+        except Exception:
+            logger.exception(f'Fake gzserver failed handling request {request.request} {request.id}')
+            response.response = 'error'
+        self._publish(topic, response)
+
+    def _insert_sdf(self, request, response):
+        match = _MODEL_RE.search(request.data)
+        name = match.group(1)
+        if name in self.models:
+            response.response = 'error'
+            return
+        self._model_id += 1
+        lifespan = request.dbl_data if request.HasField('dbl_data') and request.dbl_data > 0 else None
+        model = FakeModel(self._model_id, name, _parse_pose(match.group(2)), lifespan,
+                          len(_LINK_POSE_RE.findall(request.data)), self.speed)
+        self.models[name] = model
+
+        inserted = ModelInserted()
+        _set_time(inserted.time, self.sim_time)
+        inserted.model.name = name
+        inserted.model.id = model.id
+        model.set_pose(inserted.model.pose)
+        response.serialized_data = inserted.SerializeToString()
+
+    @staticmethod
+    def _analyze_body(sdf):
+        """
+        :return: analysis of the body without internal collisions, with a bounding box around the links
+        """
+        analysis = BodyAnalysisResponse()
+        positions = [_parse_pose(pose) for pose in _LINK_POSE_RE.findall(sdf)]
+        if len(positions) > 0:
+            for corner, bound, offset in ((analysis.boundingBox.min, min, -_MODULE_RADIUS),
+                                          (analysis.boundingBox.max, max, _MODULE_RADIUS)):
+                corner.x = bound(x for x, _y, _z in positions) + offset
+                corner.y = bound(y for _x, y, _z in positions) + offset
+                corner.z = bound(z for _x, _y, z in positions) + offset
+        return analysis
+
+    # Simulation
+
+    async def _simulate(self):
+        """
+        Advances the simulation by one state update period at a time, publishing the states and contacts
+        """
+        while True:
+            period = 1.0 / self.state_update_frequency if self.state_update_frequency > 0 else 0.1
+            if self.real_time_factor > 0:
+                await asyncio.sleep(period / self.real_time_factor)
+            else:
+                await asyncio.sleep(0)
+            if self.paused:
+                continue
+
+            self.sim_time += period
+            for model in self.models.values():
+                model.age += period
+            if self.state_update_frequency > 0 and len(self.models) > 0:
+                self._publish_states()
+
+    def _publish_states(self):
+        states = RobotStates()
+        contacts = contacts_pb2.Contacts()
+        _set_time(states.time, self.sim_time)
+        _set_time(contacts.time, self.sim_time)
+        dead = []
+        for model in self.models.values():
+            state = states.robot_state.add()
+            state.id = model.id
+            state.name = model.name
+            model.set_pose(state.pose)
+            state.dead = model.dead
+            if model.dead:
+                dead.append(model.name)
+                continue
+
+            x, y, _z = model.position()
+            contact = contacts.contact.add()
+            contact.collision1 = f'{model.name}::Core::collision'
+            contact.collision2 = 'ground_plane::link::collision'
+            for _ in range(max(1, model.n_links // 2)):
+                position = contact.position.add()
+                position.x, position.y, position.z = x, y, 0.0
+                normal = contact.normal.add()
+                normal.x, normal.y, normal.z = 0.0, 0.0, 1.0
+                contact.depth.append(0.0)
+            _set_time(contact.time, self.sim_time)
+            contact.world = 'default'
+
+        self._publish('/gazebo/default/revolve/robot_states', states)
+        self._publish('/gazebo/default/physics/contacts', contacts)
+        for name in dead:
+            del self.models[name]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake gzserver, answering the requests of pyrevolve')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on. Default "127.0.0.1".')
+    parser.add_argument('--port', default=11345, type=int, help='port of the master. Default "11345".')
+    parser.add_argument('--real-time-factor', default=1.0, type=float,
+                        help='simulation seconds per wall clock second, 0 simulates as fast as possible. '
+                             'Default "1.0".')
+    parser.add_argument('--speed', default=0.1, type=float,
+                        help='speed of the fastest robots, in meters per second. Default "0.1".')
+    parser.add_argument('--response-delay', default=0.0, type=float,
+                        help='seconds before answering a request. Default "0.0".')
+    parser.add_argument('--state-update-frequency', default=5, type=int,
+                        help='robot states published per simulation second, until a client sets it. Default "5".')
+    args = parser.parse_args()
+
+    server = FakeGazeboServer(args.host, args.port, args.real_time_factor, args.speed, args.response_delay,
+                              args.state_update_frequency)
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(server.start())
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        loop.run_until_complete(server.stop())
+
+
+if __name__ == '__main__':
+    main()
@@ -14,6 +14,20 @@ class Genotype:
         """
         raise NotImplementedError("Method must be implemented by genome")
 
+    def to_txt(self):
+        """
+        Serializes the genome, in the format of the genotype files
+
+        :return: string
+        """
+        raise NotImplementedError("Method must be implemented by genome")
+
+    def load_txt(self, text):
+        """
+        Loads the genome from the string returned by `to_txt`
+        """
+        raise NotImplementedError("Method must be implemented by genome")
+
 
 class GenotypeConfig:
     def __init__(self,
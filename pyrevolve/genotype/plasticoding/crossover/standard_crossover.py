@@ -1,5 +1,6 @@
 from pyrevolve.genotype.plasticoding.plasticoding import Plasticoding, Alphabet, PlasticodingConfig
 from pyrevolve.evolution.individual import Individual
+import copy
 import random
 from ....custom_logging.logger import genotype_logger
 
@@ -12,19 +13,21 @@ def generate_child_genotype(parent_genotypes, genotype_conf, crossover_conf):
 
     :return: child genotype
     """
-    grammar = {}
+    # the child is developed incrementally from the first parent
+    genotype = parent_genotypes[0].clone()
+    genotype.conf = genotype_conf
+    genotype.id = 'tmp'
+
     crossover_attempt = random.uniform(0.0, 1.0)
-    if crossover_attempt > crossover_conf.crossover_prob:
-        grammar = parent_genotypes[0].grammar
-    else:
+    if crossover_attempt <= crossover_conf.crossover_prob:
         for letter in Alphabet.modules():
             parent = random.randint(0, 1)
             # gets the production rule for the respective letter
-            grammar[letter[0]] = parent_genotypes[parent].grammar[letter[0]]
+            if parent == 1 and parent_genotypes[1].grammar[letter[0]] != genotype.grammar[letter[0]]:
+                genotype.grammar[letter[0]] = copy.deepcopy(parent_genotypes[1].grammar[letter[0]])
+                genotype.rule_changed(letter[0])
 
-    genotype = Plasticoding(genotype_conf, 'tmp')
-    genotype.grammar = grammar
-    return genotype.clone()
+    return genotype
 
 
 def standard_crossover(parent_individuals, genotype_conf, crossover_conf):
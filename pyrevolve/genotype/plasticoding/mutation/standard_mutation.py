@@ -18,6 +18,7 @@ def handle_deletion(genotype):
         symbol_to_delete = random.choice(genotype.grammar[target_production_rule])
         if symbol_to_delete[0] != Alphabet.CORE_COMPONENT:
             genotype.grammar[target_production_rule].remove(symbol_to_delete)
+            genotype.rule_changed(target_production_rule)
             genotype_logger.info(
                 f'mutation: remove in {genotype.id} for {target_production_rule} at {symbol_to_delete[0]}.')
     return genotype
@@ -41,6 +42,7 @@ def handle_swap(genotype):
         item_index_2 = genotype.grammar[target_production_rule].index(symbols_to_swap[1])
         genotype.grammar[target_production_rule][item_index_2], genotype.grammar[target_production_rule][item_index_1] = \
             genotype.grammar[target_production_rule][item_index_1], genotype.grammar[target_production_rule][item_index_2]
+        genotype.rule_changed(target_production_rule)
         genotype_logger.info(
             f'mutation: swap in {genotype.id} for {target_production_rule} between {symbols_to_swap[0]} and {symbols_to_swap[1]}.')
     return genotype
@@ -98,6 +100,7 @@ def handle_addition(genotype, genotype_conf):
         addition_index = random.randint(0, len(genotype.grammar[target_production_rule]) - 1)
     symbol_to_add = generate_symbol(genotype_conf)
     genotype.grammar[target_production_rule].insert(addition_index, symbol_to_add)
+    genotype.rule_changed(target_production_rule)
     genotype_logger.info(
         f'mutation: add {symbol_to_add} in {genotype.id} for {target_production_rule} at {addition_index}.')
     return genotype
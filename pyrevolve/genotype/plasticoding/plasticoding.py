@@ -8,6 +8,7 @@ from pyrevolve.revolve_bot.revolve_module import CoreModule
 from pyrevolve.revolve_bot.revolve_module import ActiveHingeModule
 from pyrevolve.revolve_bot.revolve_module import BrickModule
 from pyrevolve.revolve_bot.revolve_module import TouchSensorModule
+from pyrevolve.revolve_bot.occupancy_grid import OccupancyGrid
 from pyrevolve.revolve_bot.brain.brain_nn import BrainNN
 from pyrevolve.revolve_bot.brain.brain_nn import Node
 from pyrevolve.revolve_bot.brain.brain_nn import Connection
@@ -113,29 +114,57 @@ class Plasticoding(Genotype):
         self.grammar = {}
 
         # Auxiliary variables
-        self.substrate_coordinates_all = {(0, 0): '1'}
         self.valid = False
         self.intermediate_phenotype = None
         self.phenotype = None
-        self.morph_mounting_container = None
-        self.mounting_reference = None
-        self.mounting_reference_stack = []
-        self.quantity_modules = 1
-        self.quantity_nodes = 0
         self.index_symbol = 0
         self.index_params = 1
-        self.inputs_stack = []
-        self.outputs_stack = []
-        self.edges = {}
+        self.reset_late_development()
+
+        # Incremental development
+        # expansions of the module symbols, {(symbol, iterations): (segment, production rules used)}
+        self.expansion_segments = {}
+        # production rules changed since cloning, None if there is no developed parent to build on
+        self.mutated_rules = None
+        self.parent_phenotype = None
 
     def clone(self):
-        return copy.deepcopy(self)
+        """
+        Creates a copy of the genotype without its developmental state.
+        The copy keeps track of the phenotype developed by this genotype, so that once some of its
+        production rules are changed (see `rule_changed`) it can be developed incrementally.
+        """
+        genotype = Plasticoding(self.conf, self.id)
+        genotype.valid = self.valid
+        genotype.grammar, genotype.expansion_segments = \
+            copy.deepcopy((self.grammar, self.expansion_segments))
+        if self.phenotype is not None:
+            genotype.mutated_rules = set()
+            genotype.parent_phenotype = self.phenotype
+        elif self.mutated_rules is not None:
+            # a clone not developed yet, such as the child of a crossover, builds on the same parent
+            genotype.mutated_rules = set(self.mutated_rules)
+            genotype.parent_phenotype = self.parent_phenotype
+        return genotype
+
+    def rule_changed(self, symbol):
+        """
+        Records that the production rule of `symbol` was changed
+        :param symbol: replaceable symbol of the production rule
+        """
+        if self.mutated_rules is not None:
+            self.mutated_rules.add(symbol)
 
     def load_genotype(self, genotype_file):
         with open(genotype_file) as f:
-            lines = f.readlines()
+            self.load_txt(f.read())
 
-        for line in lines:
+    def load_txt(self, text):
+        """
+        Loads the grammar from its text format, the content of a genotype file
+        :param text: string with a rule per line
+        """
+        for line in text.splitlines():
             line_array = line.split(' ')
             repleceable_symbol = Alphabet(line_array[0])
             self.grammar[repleceable_symbol] = []
@@ -150,7 +179,14 @@ class Plasticoding(Genotype):
                 self.grammar[repleceable_symbol].append([symbol, params])
 
     def export_genotype(self, filepath):
-        file = open(filepath, 'w+')
+        with open(filepath, 'w+') as file:
+            file.write(self.to_txt())
+
+    def to_txt(self):
+        """
+        :return: text format of the grammar, with a rule per line
+        """
+        lines = []
         for key, rule in self.grammar.items():
             line = key.value + ' '
             for item_rule in range(0, len(rule)):
@@ -163,8 +199,8 @@ class Plasticoding(Genotype):
                             params += '|'
                     symbol += params
                 line += symbol + ' '
-            file.write(line+'\n')
-        file.close()
+            lines.append(line+'\n')
+        return ''.join(lines)
 
     def load_and_develop(self, load, genotype_path='', id_genotype=None):
 
@@ -183,36 +219,95 @@ class Plasticoding(Genotype):
             self.valid = True
 
     def develop(self):
-        self.early_development()
-        phenotype = self.late_development()
+        if self.mutated_rules is not None and self.parent_phenotype is not None:
+            phenotype = self.incremental_development()
+        else:
+            self.expansion_segments = {}
+            self.early_development()
+            phenotype = self.late_development()
+        self.mutated_rules = None
+        self.parent_phenotype = None
         return phenotype
 
-    def early_development(self):
+    def incremental_development(self):
+        """
+        Develops the genotype reusing the development of the parent it was cloned from.
+        Only the expansion segments derived from the mutated production rules are expanded again.
+        If the intermediate phenotype did not change, the phenotype of the parent is reused,
+        otherwise the late development is done from scratch.
+        """
+        axiom = (self.conf.axiom_w, self.conf.i_iterations)
+        parent_intermediate_phenotype = self.expansion_segments[axiom][0] \
+            if axiom in self.expansion_segments else None
 
-        self.intermediate_phenotype = [[self.conf.axiom_w, []]]
+        self.expansion_segments = {key: segment for key, segment in self.expansion_segments.items()
+                                   if segment[1].isdisjoint(self.mutated_rules)}
+        self.early_development()
 
-        for i in range(0, self.conf.i_iterations):
+        if self.intermediate_phenotype != parent_intermediate_phenotype:
+            return self.late_development()
 
-            position = 0
-            for aux_index in range(0, len(self.intermediate_phenotype)):
+        self.phenotype = copy.deepcopy(self.parent_phenotype)
+        self.phenotype._id = self.phenotype_id()
+        self.phenotype._morphological_measurements = None
+        self.phenotype._brain_measurements = None
+        self.phenotype._behavioural_measurements = None
+        self.phenotype.invalidate_sdf()
+        logger.info('Robot ' + str(self.id) + ' was developed from its parent.')
 
-                symbol = self.intermediate_phenotype[position]
-                if [symbol[self.index_symbol], []] in Alphabet.modules():
-                    # removes symbol
-                    self.intermediate_phenotype.pop(position)
-                    # replaces by its production rule
-                    for ii in range(0, len(self.grammar[symbol[self.index_symbol]])):
-                        self.intermediate_phenotype.insert(position+ii,
-                                                           self.grammar[symbol[self.index_symbol]][ii])
-                    position = position+ii+1
-                else:
-                    position = position + 1
+        return self.phenotype
+
+    def phenotype_id(self):
+        return self.id if type(self.id) == str and self.id.startswith("robot") else "robot_{}".format(self.id)
+
+    def early_development(self):
+
+        if self.conf.i_iterations > 0:
+            segment, _ = self.expand(self.conf.axiom_w, self.conf.i_iterations)
+            self.intermediate_phenotype = list(segment)
+        else:
+            self.intermediate_phenotype = [[self.conf.axiom_w, []]]
         # logger.info('Robot ' + str(self.id) + ' was early-developed.')
 
+    def expand(self, symbol, iterations):
+        """
+        Replaces a module symbol by its production rule, expanding the modules of the rule
+        for the remaining iterations. Segments are cached in `expansion_segments`.
+        :param symbol: module symbol to expand
+        :param iterations: number of rewriting iterations, at least 1
+        :return: (list of symbols, set of the production rules used)
+        """
+        key = (symbol, iterations)
+        if key not in self.expansion_segments:
+            segment = []
+            rules = {symbol}
+            for item in self.grammar[symbol]:
+                if iterations > 1 and [item[self.index_symbol], []] in Alphabet.modules():
+                    item_segment, item_rules = self.expand(item[self.index_symbol], iterations - 1)
+                    segment.extend(item_segment)
+                    rules.update(item_rules)
+                else:
+                    segment.append(item)
+            self.expansion_segments[key] = (segment, frozenset(rules))
+        return self.expansion_segments[key]
+
+    def reset_late_development(self):
+        self.substrate_coordinates_all = OccupancyGrid()
+        self.substrate_coordinates_all.add((0, 0), '1')
+        self.morph_mounting_container = None
+        self.mounting_reference = None
+        self.mounting_reference_stack = []
+        self.quantity_modules = 1
+        self.quantity_nodes = 0
+        self.inputs_stack = []
+        self.outputs_stack = []
+        self.edges = {}
+
     def late_development(self):
 
+        self.reset_late_development()
         self.phenotype = RevolveBot()
-        self.phenotype._id = self.id if type(self.id) == str and self.id.startswith("robot") else "robot_{}".format(self.id)
+        self.phenotype._id = self.phenotype_id()
         self.phenotype._brain = BrainNN()
 
         for symbol in self.intermediate_phenotype:
@@ -255,6 +350,7 @@ class Plasticoding(Genotype):
                 self.decode_brain_moving(symbol)
 
         self.add_imu_nodes()
+        self.phenotype._substrate = self.substrate_coordinates_all
         logger.info('Robot ' + str(self.id) + ' was late-developed.')
 
         return self.phenotype
@@ -432,46 +528,29 @@ class Plasticoding(Genotype):
                 angle = 270
         return angle
 
+    def update_coordinates(self, parent, slot, module):
+        """
+        Update coordinates and orientation of module
+        :return: coordinates of module
+        """
+        direction = (OccupancyGrid.DIRECTIONS[parent.info['orientation']]
+                     + OccupancyGrid.DIRECTIONS[Orientation(slot)]) % len(OccupancyGrid.ORIENTATIONS)
+        coordinates = OccupancyGrid.move(parent.substrate_coordinates, direction)
+
+        module.substrate_coordinates = [coordinates[0], coordinates[1]]
+        module.info['orientation'] = OccupancyGrid.ORIENTATIONS[direction]
+        return coordinates
+
     def check_intersection(self, parent, slot, module):
         """
         Update coordinates of module
-        :return:
+        :return: True if the coordinates are already occupied
         """
-        dic = {Orientation.NORTH.value: 0,
-               Orientation.WEST.value: 1,
-               Orientation.SOUTH.value: 2,
-               Orientation.EAST.value: 3}
-
-        inverse_dic = {0: Orientation.NORTH.value,
-                       1: Orientation.WEST.value,
-                       2: Orientation.SOUTH.value,
-                       3: Orientation.EAST.value}
-
-        direction = dic[parent.info['orientation'].value] + dic[slot]
-        if direction >= len(dic):
-            direction = direction - len(dic)
-
-        new_direction = Orientation(inverse_dic[direction])
-        if new_direction == Orientation.WEST:
-            coordinates = [parent.substrate_coordinates[0],
-                           parent.substrate_coordinates[1] - 1]
-        if new_direction == Orientation.EAST:
-            coordinates = [parent.substrate_coordinates[0],
-                           parent.substrate_coordinates[1] + 1]
-        if new_direction == Orientation.NORTH:
-            coordinates = [parent.substrate_coordinates[0] + 1,
-                           parent.substrate_coordinates[1]]
-        if new_direction == Orientation.SOUTH:
-            coordinates = [parent.substrate_coordinates[0] - 1,
-                           parent.substrate_coordinates[1]]
-
-        module.substrate_coordinates = coordinates
-        module.info['orientation'] = new_direction
-        if (coordinates[0], coordinates[1]) in self.substrate_coordinates_all:
+        coordinates = self.update_coordinates(parent, slot, module)
+        if coordinates in self.substrate_coordinates_all:
             return True
         else:
-            self.substrate_coordinates_all[coordinates[0],
-                                           coordinates[1]] = module.id
+            self.substrate_coordinates_all.add(coordinates, module.id)
             return False
 
     def new_module(self, slot, new_module_type, symbol):
@@ -524,6 +603,9 @@ class Plasticoding(Genotype):
                 self.mounting_reference.children[slot] = module
                 self.morph_mounting_container = None
                 module.id = self.mounting_reference.id+'s'+str(slot)
+                self.substrate_coordinates_all.add(self.update_coordinates(self.mounting_reference, slot, module),
+                                                   module.id,
+                                                   sensor=True)
                 self.decode_brain_node(symbol, module.id)
 
     def decode_brain_node(self, symbol, part_id):
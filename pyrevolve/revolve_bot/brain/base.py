@@ -1,3 +1,4 @@
+import hashlib
 import pyrevolve.revolve_bot.brain
 
 
@@ -19,6 +20,13 @@ class Brain(object):
     def to_yaml(self):
         return {}
 
+    def canonical_hash(self):
+        """
+        Hash of the brain description, for brains that do not refer to node or part ids
+        :return: hex digest
+        """
+        return hashlib.sha1(repr(self.to_yaml()).encode()).hexdigest()
+
     def learner_sdf(self):
         return None
 
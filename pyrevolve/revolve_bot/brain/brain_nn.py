@@ -1,8 +1,10 @@
 """
 Class containing the brain parts to compose a robot
 """
+import hashlib
 import xml.etree.ElementTree
 from collections import OrderedDict
+import numpy as np
 import pyrevolve.SDF
 from .base import Brain
 
@@ -98,6 +100,84 @@ class BrainNN(Brain):
 
         return yaml_dict_brain
 
+    def params_array(self):
+        """
+        Oscillator parameters as an array with one row for each of period, phase_offset and amplitude,
+        and one column for each entry of `self.params`. Missing values are NaN.
+        :return: numpy array of shape (3, len(self.params))
+        """
+        params = self.params.values()
+        return np.array([
+            [param.period for param in params],
+            [param.phase_offset for param in params],
+            [param.amplitude for param in params],
+        ], dtype=float).reshape(3, len(self.params))
+
+    def connections_coo(self):
+        """
+        Sparse adjacency matrix of the connections, in coordinate format.
+        Nodes are indexed in the order of `self.nodes`, ids of connected nodes missing from it are appended.
+        :return: list of node ids, array of source indices, array of destination indices, array of weights
+        """
+        node_ids = [node.id for node in self.nodes.values()]
+        index = {node_id: i for i, node_id in enumerate(node_ids)}
+        src = np.empty(len(self.connections), dtype=int)
+        dst = np.empty(len(self.connections), dtype=int)
+        for i, connection in enumerate(self.connections):
+            for indices, node_id in ((src, connection.src), (dst, connection.dst)):
+                if node_id not in index:
+                    index[node_id] = len(node_ids)
+                    node_ids.append(node_id)
+                indices[i] = index[node_id]
+        weights = np.array([connection.weight for connection in self.connections], dtype=float)
+        return node_ids, src, dst, weights
+
+    def canonical_hash(self, iterations=3):
+        """
+        Hash of the network that does not depend on the ids of nodes and body parts.
+        Nodes are labelled with their layer, type and params, then the labels are refined
+        with the labels of their neighbours (Weisfeiler-Lehman), so that two networks
+        that differ only by the naming of their nodes get the same hash.
+        :param iterations: number of refinements of the node labels
+        :return: hex digest
+        """
+        def digest(value):
+            return hashlib.sha1(repr(value).encode()).hexdigest()
+
+        labels = {}
+        for node_id, node in self.nodes.items():
+            param = self.params.get(node_id)
+            values = None if param is None else \
+                (param.period, param.phase_offset, param.amplitude, param.bias, param.gain)
+            labels[node_id] = digest((node.layer, node.type, values))
+
+        neighbours = {node_id: [] for node_id in labels}
+        for connection in self.connections:
+            neighbours.setdefault(connection.src, []).append(('out', connection.weight, connection.dst))
+            neighbours.setdefault(connection.dst, []).append(('in', connection.weight, connection.src))
+        parts = {}
+        for node_id, node in self.nodes.items():
+            parts.setdefault(node.part_id, []).append(node_id)
+        for node_ids in parts.values():
+            for node_id in node_ids:
+                neighbours[node_id].extend(('part', None, other) for other in node_ids if other != node_id)
+        for node_id in neighbours:
+            labels.setdefault(node_id, digest(None))
+
+        for _ in range(iterations):
+            labels = {
+                node_id: digest((labels[node_id], sorted(
+                    (direction, repr(weight), labels[other]) for direction, weight, other in neighbours[node_id]
+                )))
+                for node_id in labels
+            }
+
+        connections = sorted(
+            (labels[connection.src], labels[connection.dst], repr(connection.weight))
+            for connection in self.connections
+        )
+        return digest((self.TYPE, sorted(labels.values()), connections))
+
     def learner_sdf(self):
         #TODO this is selecting the controller not the learner!
         return xml.etree.ElementTree.Element('rv:learner', {'type': 'offline'})
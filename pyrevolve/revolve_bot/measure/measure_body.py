@@ -1,13 +1,30 @@
 import math
-from ..render.render import Render
-from ..render.grid import Grid
+from ..occupancy_grid import OccupancyGrid
 from ..revolve_module import ActiveHingeModule, BrickModule, TouchSensorModule, BrickSensorModule, CoreModule
 from ...custom_logging.logger import logger
 
 
 class MeasureBody:
-    def __init__(self, body):
+    # counters collected in a single traversal of the body by `count_all`
+    COUNTERS = (
+        'branching_modules_count',
+        'extremities',
+        'extensiveness',
+        'active_hinges_count',
+        'free_slots',
+        'hinge_count',
+        'brick_count',
+        'brick_sensor_count',
+        'touch_sensor_count',
+    )
+
+    def __init__(self, body, substrate=None):
+        """
+        :param body: core module of the body to measure
+        :param substrate: OccupancyGrid of the body, computed from the body if None
+        """
         self.body = body
+        self._substrate = substrate
 
         # Absolute branching
         self.branching_modules_count = None
@@ -157,14 +174,18 @@ class MeasureBody:
         self.length_of_limbs = self.extensiveness / practical_limit_extensiveness
         return self.length_of_limbs
 
+    @property
+    def substrate(self):
+        if self._substrate is None:
+            self._substrate = OccupancyGrid.from_body(self.body)
+        return self._substrate
+
     def measure_symmetry(self):
         """
         Measure symmetry
         """
         try:
-            render = Render()
-            render.traverse_path_of_robot(self.body, 0, False)
-            coordinates = render.grid.visited_coordinates
+            coordinates = self.substrate
 
             horizontal_mirrored = 0
             horizontal_total = 0
@@ -172,13 +193,13 @@ class MeasureBody:
             vertical_total = 0
             # Calculate symmetry in body
             for position in coordinates:
-                if position[0] is not 0:
+                if position[0] != 0:
                     horizontal_total += 1
-                    if [-position[0], position[1]] in coordinates:
+                    if (-position[0], position[1]) in coordinates:
                         horizontal_mirrored += 1
-                if position[1] is not 0:
+                if position[1] != 0:
                     vertical_total += 1
-                    if [position[0], -position[1]] in coordinates:
+                    if (position[0], -position[1]) in coordinates:
                         vertical_mirrored += 1
 
             horizontal_symmetry = horizontal_mirrored / horizontal_total if horizontal_mirrored > 0 else 0
@@ -329,19 +350,83 @@ class MeasureBody:
         Measure width and height of body, excluding sensors
         """
         try:
-            render = Render()
-            render.traverse_path_of_robot(self.body, 0, False)
-            render.grid.calculate_grid_dimensions()
-            self.width = render.grid.width
-            self.height = render.grid.height
+            self.width = self.substrate.width
+            self.height = self.substrate.height
         except Exception as e:
             logger.exception(f'Exception: {e}. \nFailed measuring width and height')
 
+    def count_all(self):
+        """
+        Count all module based quantities of the body with a single iterative traversal
+        """
+        try:
+            (branching_modules, extremities, extensiveness, active_hinges, free_slots,
+             hinges, bricks, brick_sensors, touch_sensors) = range(len(self.COUNTERS))
+            counts = [0] * len(self.COUNTERS)
+
+            to_process = [self.body]
+            while len(to_process) > 0:
+                module = to_process.pop()
+
+                # children excluding touch sensors, and excluding all sensors
+                children_count = 0
+                branching_children_count = 0
+                has_children = False
+                for core_slot, child_module in module.iter_children():
+                    if child_module is None:
+                        continue
+                    has_children = True
+                    if not isinstance(child_module, TouchSensorModule):
+                        children_count += 1
+                        if not isinstance(child_module, BrickSensorModule):
+                            branching_children_count += 1
+                    to_process.append(child_module)
+
+                if isinstance(module, CoreModule):
+                    free_slot_count = 4
+                    if branching_children_count == 4:
+                        counts[branching_modules] += 1
+                elif isinstance(module, BrickModule):
+                    free_slot_count = 3
+                    if branching_children_count == 3:
+                        counts[branching_modules] += 1
+                else:
+                    free_slot_count = None
+
+                if free_slot_count is not None:
+                    counts[free_slots] += free_slot_count - children_count
+
+                if not (isinstance(module, CoreModule) or isinstance(module, TouchSensorModule)):
+                    if children_count == 0:
+                        counts[extremities] += 1
+                    elif children_count == 1:
+                        counts[extensiveness] += 1
+
+                if module is self.body:
+                    continue
+                if isinstance(module, ActiveHingeModule):
+                    counts[hinges] += 1
+                    if has_children:
+                        counts[active_hinges] += 1
+                elif isinstance(module, BrickModule):
+                    counts[bricks] += 1
+                elif isinstance(module, BrickSensorModule):
+                    counts[brick_sensors] += 1
+                elif isinstance(module, TouchSensorModule):
+                    counts[touch_sensors] += 1
+
+            for name, count in zip(self.COUNTERS, counts):
+                setattr(self, name, count)
+            self.absolute_size = self.brick_count + self.hinge_count + 1
+        except Exception as e:
+            logger.exception(f'Exception: {e}. \nFailed counting modules')
+
     def measure_all(self):
         """
         Perform all measurements
         :return:
         """
+        self.count_all()
         self.measure_limbs()
         self.measure_length_of_limbs()
         self.measure_width_height()
@@ -16,6 +16,8 @@ class MeasureBrain:
         self.brain = brain
         self.max_param = max_param
         self.params = None
+        # oscillator parameters, rows are periods, phase offsets and amplitudes
+        self.param_values = None
         self.count_oscillators = None
         self.periods = None
         self.phase_offsets = None
@@ -75,12 +77,8 @@ class MeasureBrain:
             return
         self.params = self.brain.params
         if self.params is not None:
-            if self.periods is None:
-                self.periods = [self.params[param].period for param in self.params]
-            if self.phase_offsets is None:
-                self.phase_offsets = [self.params[param].phase_offset for param in self.params]
-            if self.amplitudes is None:
-                self.amplitudes = [self.params[param].amplitude for param in self.params]
+            self.param_values = self.brain.params_array()
+            self.periods, self.phase_offsets, self.amplitudes = self.param_values
 
     def calc_count_oscillators(self):
         """
@@ -104,7 +102,7 @@ class MeasureBrain:
             return self.avg_period
         if self.periods is None:
             self.collect_sets_of_params()
-        median = np.median(self.periods) if self.periods else 0
+        median = np.median(self.periods) if len(self.periods) > 0 else 0
         if median == 0 or self.max_param == 0:
             self.avg_period = 0
         else:
@@ -120,7 +118,7 @@ class MeasureBrain:
             return self.dev_period
         if self.periods is None:
             self.collect_sets_of_params()
-        self.dev_period = self.sigmoid(np.std(self.periods)) if self.periods else 0
+        self.dev_period = self.sigmoid(np.std(self.periods)) if len(self.periods) > 0 else 0
         return self.dev_period
 
     def measure_avg_phase_offset(self):
@@ -132,7 +130,7 @@ class MeasureBrain:
             return self.avg_phase_offset
         if self.phase_offsets is None:
             self.collect_sets_of_params()
-        median = np.median(self.phase_offsets) if self.phase_offsets else 0
+        median = np.median(self.phase_offsets) if len(self.phase_offsets) > 0 else 0
         if median == 0 or self.max_param == 0:
             self.avg_phase_offset = 0
         else:
@@ -148,7 +146,7 @@ class MeasureBrain:
             return self.dev_phase_offset
         if self.phase_offsets is None:
             self.collect_sets_of_params()
-        self.dev_phase_offset = self.sigmoid(np.std(self.phase_offsets)) if self.phase_offsets else 0
+        self.dev_phase_offset = self.sigmoid(np.std(self.phase_offsets)) if len(self.phase_offsets) > 0 else 0
         return self.dev_phase_offset
 
     def measure_avg_amplitude(self):
@@ -160,7 +158,7 @@ class MeasureBrain:
             return self.avg_amplitude
         if self.amplitudes is None:
             self.collect_sets_of_params()
-        median = np.median(self.amplitudes) if self.amplitudes else 0
+        median = np.median(self.amplitudes) if len(self.amplitudes) > 0 else 0
         if median == 0 or self.max_param == 0:
             self.avg_amplitude = 0
         else:
@@ -176,7 +174,7 @@ class MeasureBrain:
             return self.dev_amplitude
         if self.amplitudes is None:
             self.collect_sets_of_params()
-        self.dev_amplitude = self.sigmoid(np.std(self.amplitudes)) if self.amplitudes else 0
+        self.dev_amplitude = self.sigmoid(np.std(self.amplitudes)) if len(self.amplitudes) > 0 else 0
         return self.dev_amplitude
 
     def measure_avg_intra_dev_params(self):
@@ -186,9 +184,10 @@ class MeasureBrain:
         if self.params is None:
             self.avg_intra_dev_params = 0
             return self.avg_intra_dev_params
-        params = self.params
-        dt = [np.std([params[param].period, params[param].phase_offset, params[param].amplitude]) for param in params] if params else 0
-        self.avg_intra_dev_params = self.sigmoid(np.median(dt)) if dt else 0
+        if self.param_values is None:
+            self.collect_sets_of_params()
+        dt = np.std(self.param_values, axis=0)
+        self.avg_intra_dev_params = self.sigmoid(np.median(dt)) if len(dt) > 0 else 0
         return self.avg_intra_dev_params
 
     def measure_avg_inter_dev_params(self):
@@ -200,9 +199,9 @@ class MeasureBrain:
             return self.avg_inter_dev_params
         if self.periods is None or self.phase_offsets is None or self.amplitudes is None:
             self.collect_sets_of_params()
-        periods_std = np.std(self.periods) if self.periods else 0
-        p_offset_std = np.std(self.phase_offsets) if self.phase_offsets else 0
-        amplitude_std = np.std(self.amplitudes) if self.amplitudes else 0
+        periods_std = np.std(self.periods) if len(self.periods) > 0 else 0
+        p_offset_std = np.std(self.phase_offsets) if len(self.phase_offsets) > 0 else 0
+        amplitude_std = np.std(self.amplitudes) if len(self.amplitudes) > 0 else 0
         self.avg_inter_dev_params = self.sigmoid((periods_std + p_offset_std + amplitude_std) / 3)
         return self.avg_inter_dev_params
 
@@ -293,23 +292,76 @@ class MeasureBrain:
 
     def measure_all(self):
         """
-        Perform all brain measurements
+        Perform all brain measurements, in one vectorized pass over the parameters and the connections
         """
         if not isinstance(self.brain, BrainNN):
             self.set_measurements_to_zero()
             raise RuntimeError('Brain not supported')
-        self.calc_count_oscillators()
-        self.measure_avg_period()
-        self.measure_dev_period()
-        self.measure_avg_phase_offset()
-        self.measure_dev_phase_offset()
-        self.measure_avg_amplitude()
-        self.measure_dev_amplitude()
-        self.measure_avg_intra_dev_params()
-        self.measure_avg_inter_dev_params()
-        self.measure_sensors_reach()
-        self.measure_recurrence()
-        self.measure_synaptic_reception()
+        if self.params is None:
+            self.set_measurements_to_zero()
+            return
+
+        if len(self.params) > 0:
+            medians = np.median(self.param_values, axis=1)
+            deviations = np.std(self.param_values, axis=1)
+            intra_deviations = np.std(self.param_values, axis=0)
+            if self.max_param == 0:
+                medians[:] = 0
+            self.avg_period, self.avg_phase_offset, self.avg_amplitude = \
+                [median / self.max_param if median != 0 else 0 for median in medians]
+            self.dev_period, self.dev_phase_offset, self.dev_amplitude = \
+                [self.sigmoid(deviation) for deviation in deviations]
+            self.avg_intra_dev_params = self.sigmoid(np.median(intra_deviations))
+            self.avg_inter_dev_params = self.sigmoid((deviations[0] + deviations[1] + deviations[2]) / 3)
+        else:
+            self.avg_period = self.avg_phase_offset = self.avg_amplitude = 0
+            self.dev_period = self.dev_phase_offset = self.dev_amplitude = 0
+            self.avg_intra_dev_params = 0
+            self.avg_inter_dev_params = self.sigmoid(0)
+
+        nodes = self.brain.nodes
+        node_ids, src, dst, weights = self.brain.connections_coo()
+        n_nodes = len(node_ids)
+        node_types = [node.type for node in nodes.values()]
+        oscillators = np.array([node_type == 'Oscillator' for node_type in node_types] +
+                               [False] * (n_nodes - len(nodes)), dtype=bool)
+        self.count_oscillators = int(np.count_nonzero(oscillators))
+
+        # sensors reach
+        # TODO REMOVE condition WHEN duplicated nodes bug is fixed -- duplicated nodes end in '-[0-9]+' or '-core[0-9]+' (node2-2, node2-core1)
+        duplicates = set(fnmatch.filter(nodes, 'node*-*'))
+        inputs = np.array([node_type == 'Input' and key not in duplicates
+                           for key, node_type in zip(nodes, node_types)] +
+                          [False] * (n_nodes - len(nodes)), dtype=bool)
+        if np.any(inputs):
+            out_degree = np.bincount(src, minlength=n_nodes)[inputs]
+            if self.count_oscillators == 0:
+                out_degree[:] = 0
+            self.sensors_reach = np.median(out_degree / max(self.count_oscillators, 1))
+        else:
+            self.sensors_reach = 0
+
+        # recurrence
+        loops = src == dst
+        recurrent = int(np.count_nonzero(loops))
+        if recurrent == 0 or self.count_oscillators == 0:
+            self.recurrence = 0
+        else:
+            self.recurrence = recurrent / self.count_oscillators
+
+        # synaptic reception
+        if self.count_oscillators > 0:
+            inhibitory = (~loops) & (weights < 0)
+            excitatory = (~loops) & (weights > 0)
+            inhibitory_sum = np.bincount(dst[inhibitory], weights=-weights[inhibitory], minlength=n_nodes)[oscillators]
+            excitatory_sum = np.bincount(dst[excitatory], weights=weights[excitatory], minlength=n_nodes)[oscillators]
+            min_value = np.minimum(inhibitory_sum, excitatory_sum)
+            max_value = np.maximum(inhibitory_sum, excitatory_sum)
+            balance = np.zeros(len(min_value))
+            np.divide(min_value, max_value, out=balance, where=min_value != 0)
+            self.synaptic_reception = np.median(balance)
+        else:
+            self.synaptic_reception = 0
 
     def set_all_zero(self):
         self.avg_period = 0
@@ -0,0 +1,137 @@
+"""
+Occupancy of the 2D substrate by the modules of a body
+"""
+from .revolve_module import Orientation, TouchSensorModule, BrickSensorModule
+
+
+class OccupancyGrid:
+    """
+    Hashed grid of the substrate coordinates occupied by a body, with the bounds of the occupied area.
+
+    Coordinates are (x, y) tuples, x grows towards the NORTH of the core and y towards its EAST.
+    Sensors are kept in a separate layer, so that the structural modules can be checked on their own.
+    The bounds always include the core, at the origin.
+    """
+
+    # absolute directions, counting counter-clockwise from NORTH
+    ORIENTATIONS = (
+        Orientation.NORTH,
+        Orientation.WEST,
+        Orientation.SOUTH,
+        Orientation.EAST,
+    )
+    DIRECTIONS = {orientation: direction for direction, orientation in enumerate(ORIENTATIONS)}
+    MOVEMENTS = (
+        (1, 0),   # NORTH
+        (0, -1),  # WEST
+        (-1, 0),  # SOUTH
+        (0, 1),   # EAST
+    )
+
+    def __init__(self):
+        self.cells = {}
+        self.sensors = {}
+        # coordinates that were occupied more than once
+        self.intersections = []
+        self.min_x = 0
+        self.max_x = 0
+        self.min_y = 0
+        self.max_y = 0
+
+    @staticmethod
+    def from_body(body):
+        """
+        Traverses the body once, updating the `substrate_coordinates` of every module
+        :param body: core module of the body
+        :return: OccupancyGrid of the body
+        """
+        grid = OccupancyGrid()
+        body.substrate_coordinates = (0, 0)
+        grid.add((0, 0), body.id)
+
+        to_process = [(body, 0)]
+        while len(to_process) > 0:
+            parent, parent_direction = to_process.pop()
+            for slot, module in parent.iter_children():
+                if module is None:
+                    continue
+                direction = (parent_direction + OccupancyGrid.DIRECTIONS[Orientation(slot)]) % len(OccupancyGrid.ORIENTATIONS)
+                coordinates = OccupancyGrid.move(parent.substrate_coordinates, direction)
+                module.substrate_coordinates = coordinates
+                grid.add(coordinates, module.id, OccupancyGrid.is_sensor(module))
+                to_process.append((module, direction))
+
+        return grid
+
+    @staticmethod
+    def move(coordinates, direction):
+        movement = OccupancyGrid.MOVEMENTS[direction]
+        return coordinates[0] + movement[0], coordinates[1] + movement[1]
+
+    @staticmethod
+    def is_sensor(module):
+        return isinstance(module, TouchSensorModule) or isinstance(module, BrickSensorModule)
+
+    def add(self, coordinates, value=None, sensor=False):
+        """
+        Occupies the coordinates
+        :param coordinates: (x, y) tuple
+        :param value: value stored in the cell, usually the module id
+        :param sensor: if True the coordinates are occupied in the sensors layer
+        """
+        if coordinates in self.cells or coordinates in self.sensors:
+            self.intersections.append(coordinates)
+        if sensor:
+            self.sensors[coordinates] = value
+            return
+
+        self.cells[coordinates] = value
+        x, y = coordinates
+        if x < self.min_x:
+            self.min_x = x
+        elif x > self.max_x:
+            self.max_x = x
+        if y < self.min_y:
+            self.min_y = y
+        elif y > self.max_y:
+            self.max_y = y
+
+    def bounds(self, include_sensors=False):
+        """
+        :param include_sensors: extend the bounds of the structural modules with the sensors
+        :return: min_x, max_x, min_y, max_y
+        """
+        min_x, max_x, min_y, max_y = self.min_x, self.max_x, self.min_y, self.max_y
+        if include_sensors:
+            for x, y in self.sensors:
+                min_x, max_x = min(min_x, x), max(max_x, x)
+                min_y, max_y = min(min_y, y), max(max_y, y)
+        return min_x, max_x, min_y, max_y
+
+    @property
+    def width(self):
+        """Span of the structural modules from WEST to EAST"""
+        return self.max_y - self.min_y + 1
+
+    @property
+    def height(self):
+        """Span of the structural modules from SOUTH to NORTH"""
+        return self.max_x - self.min_x + 1
+
+    def get(self, coordinates, default=None):
+        return self.cells.get(coordinates, default)
+
+    def __getitem__(self, coordinates):
+        return self.cells[coordinates]
+
+    def __contains__(self, coordinates):
+        return coordinates in self.cells
+
+    def __iter__(self):
+        return iter(self.cells)
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __repr__(self):
+        return f'OccupancyGrid({self.cells})'
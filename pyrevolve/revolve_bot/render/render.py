@@ -1,99 +1,136 @@
 import cairo
 from .canvas import Canvas
-from .grid import Grid
+from ..occupancy_grid import OccupancyGrid
 from ..revolve_module import RevolveModule, CoreModule, BrickModule, ActiveHingeModule, TouchSensorModule, BrickSensorModule
 from ...custom_logging.logger import logger
 
 
 class Render:
+    """
+    Draws bodies on canvases. Render keeps no state, so the same instance can draw from many threads.
+    """
 
-    def __init__(self):
-        """Instantiate grid"""
-        self.grid = Grid()
-
-    def parse_body_to_draw(self, canvas, module, slot):
+    def draw_module(self, canvas, module, slot):
         """
-        Parse the body to the canvas to draw the png
+        Draw a module on the canvas, next to its parent
         @param canvas: instance of the Canvas class
-        @param module: body of the robot
+        @param module: module to draw
         @param slot: parent slot of module
         """
         if isinstance(module, CoreModule):
             canvas.draw_controller(module.id)
         elif isinstance(module, ActiveHingeModule):
             canvas.move_by_slot(slot)
-            Canvas.rotating_orientation += module.orientation
+            canvas.rotating_orientation += module.orientation
             canvas.draw_hinge(module.id)
             canvas.draw_connector_to_parent()
         elif isinstance(module, BrickModule):
             canvas.move_by_slot(slot)
-            Canvas.rotating_orientation += module.orientation
+            canvas.rotating_orientation += module.orientation
             canvas.draw_module(module.id)
             canvas.draw_connector_to_parent()
         elif isinstance(module, TouchSensorModule) or isinstance(module, BrickSensorModule):
             canvas.move_by_slot(slot)
-            Canvas.rotating_orientation += module.orientation
+            canvas.rotating_orientation += module.orientation
             canvas.save_sensor_position()
 
-        if module.has_children():
-            # Traverse children of element to draw on canvas
-            for core_slot, child_module in module.iter_children():
-                if child_module is None:
-                    continue
-                self.parse_body_to_draw(canvas, child_module, core_slot)
-            canvas.move_back()
-        else:
-            # Element has no children, move back to previous state
-            canvas.move_back()
-
-    def traverse_path_of_robot(self, module, slot, include_sensors=True):
+    def parse_body_to_draw(self, canvas, module, slot):
         """
-        Traverse path of robot to obtain visited coordinates
+        Parse the body to the canvas to draw the png, depth first without recursion
+        @param canvas: instance of the Canvas class
         @param module: body of the robot
-        @param slot: attachment of parent slot
-        @param include_sensors: add sensors to visisted_cooridnates if True
+        @param slot: parent slot of module
         """
-        if isinstance(module, ActiveHingeModule) or isinstance(module, BrickModule) or isinstance(module, TouchSensorModule) or isinstance(module, BrickSensorModule):
-            self.grid.move_by_slot(slot)
-            self.grid.add_to_visited(include_sensors, isinstance(module, TouchSensorModule))
-        if module.has_children():
-            # Traverse path of children of module
-            for core_slot, child_module in module.iter_children():
-                if child_module is None:
-                    continue
-                self.traverse_path_of_robot(child_module, core_slot, include_sensors)
-            self.grid.move_back()
-        else:
-            # Element has no children, move back to previous state
-            self.grid.move_back()
+        # None marks that all the children of a module are drawn, and the canvas moves back to its parent
+        to_draw = [(module, slot)]
+        while len(to_draw) > 0:
+            entry = to_draw.pop()
+            if entry is None:
+                canvas.move_back()
+                continue
+            module, slot = entry
+            self.draw_module(canvas, module, slot)
+            to_draw.append(None)
+            if module.has_children():
+                children = [(child_module, child_slot)
+                            for child_slot, child_module in module.iter_children()
+                            if child_module is not None]
+                to_draw.extend(reversed(children))
+
+    def draw_robot(self, canvas, body, substrate, x=0, y=0):
+        """
+        Draw a robot on the canvas
+        @param canvas: instance of the Canvas class
+        @param body: body of robot
+        @param substrate: OccupancyGrid of the body
+        @param x, y: position on the canvas of the upper left corner of the drawing
+        """
+        # the drawing x axis points EAST and its y axis points SOUTH
+        min_x, max_x, min_y, max_y = substrate.bounds(include_sensors=True)
+        canvas.reset_canvas()
+        canvas.set_position(x - min_y, y + max_x)
+
+        # Draw body of robot
+        self.parse_body_to_draw(canvas, body, 0)
+
+        # Draw sensors after, so that they don't get overdrawn
+        canvas.draw_sensors()
 
-    def render_robot(self, body, image_path):
+    @staticmethod
+    def drawing_size(substrate):
+        """
+        @param substrate: OccupancyGrid of the body
+        @return: width and height of the drawing of the body, in modules
+        """
+        min_x, max_x, min_y, max_y = substrate.bounds(include_sensors=True)
+        return max_y - min_y + 1, max_x - min_x + 1
+
+    def render_robot(self, body, image_path, substrate=None):
         """
         Render robot and save image file
         @param body: body of robot
         @param image_path: file path for saving image
+        @param substrate: OccupancyGrid of the body, computed from the body if None
         """
         try:
-            # Calculate dimensions of drawing and core position
-            self.traverse_path_of_robot(body, 0)
-            self.grid.calculate_grid_dimensions()
-            core_position = self.grid.calculate_core_position()
+            if substrate is None:
+                substrate = OccupancyGrid.from_body(body)
 
-            # Draw canvas
-            cv = Canvas(self.grid.width, self.grid.height, 100)
-            cv.set_position(core_position[0], core_position[1])
+            width, height = self.drawing_size(substrate)
+            cv = Canvas(width, height, 100)
+            self.draw_robot(cv, body, substrate)
+            cv.save_png(image_path)
 
-            # Draw body of robot
-            self.parse_body_to_draw(cv, body, 0)
+        except Exception as e:
+            logger.exception('Could not render robot and save image file')
 
-            # Draw sensors after, so that they don't get overdrawn
-            cv.draw_sensors()
+    def render_contact_sheet(self, bodies, image_path, columns=10, substrates=None, scale=50):
+        """
+        Render many robots, for example a whole generation, in a grid in a single image file
+        @param bodies: list of bodies of robots
+        @param image_path: file path for saving image
+        @param columns: number of robots in each row of the grid
+        @param substrates: list of OccupancyGrid of the bodies, computed from the bodies if None
+        @param scale: size in pixels of a module
+        """
+        try:
+            if substrates is None:
+                substrates = [OccupancyGrid.from_body(body) for body in bodies]
+            if len(bodies) == 0:
+                raise ValueError('No robots to render')
 
-            cv.save_png(image_path)
+            sizes = [self.drawing_size(substrate) for substrate in substrates]
+            # every robot is drawn in a cell of the same size, with a module of margin
+            cell_width = max(width for width, height in sizes) + 1
+            cell_height = max(height for width, height in sizes) + 1
+            columns = min(columns, len(bodies))
+            rows = (len(bodies) + columns - 1) // columns
 
-            # Reset variables to default values
-            cv.reset_canvas()
-            self.grid.reset_grid()
+            cv = Canvas(columns * cell_width, rows * cell_height, scale)
+            for i, (body, substrate) in enumerate(zip(bodies, substrates)):
+                row, column = divmod(i, columns)
+                self.draw_robot(cv, body, substrate, column * cell_width, row * cell_height)
+            cv.save_png(image_path)
 
         except Exception as e:
-            logger.exception('Could not render robot and save image file')
+            logger.exception('Could not render contact sheet and save image file')
@@ -1,7 +1,7 @@
 """
 Revolve body generator based on RoboGen framework
 """
-import yaml
+import hashlib
 import traceback
 from collections import OrderedDict
 from collections import deque
@@ -9,17 +9,45 @@ from collections import deque
 from pyrevolve import SDF
 
 from .revolve_module import CoreModule, TouchSensorModule, Orientation
-from .revolve_module import Orientation
+from .occupancy_grid import OccupancyGrid
 from .brain import Brain, BrainNN
 
-from .render.render import Render
-from .render.brain_graph import BrainGraph
 from .measure.measure_body import MeasureBody
 from .measure.measure_brain import MeasureBrain
 
 from ..custom_logging.logger import logger
 import os
 
+_yaml = None
+
+
+def represent_ordereddict(dumper, data):
+    import yaml
+    value = []
+
+    for item_key, item_value in data.items():
+        node_key = dumper.represent_data(item_key)
+        node_value = dumper.represent_data(item_value)
+
+        value.append((node_key, node_value))
+
+    return yaml.nodes.MappingNode(u'tag:yaml.org,2002:map', value)
+
+
+def yaml_module():
+    """
+    Imports yaml on first use, so that the processes that do not read or write robots do not pay for it
+    :return: the yaml module, which dumps OrderedDict as a mapping
+    """
+    global _yaml
+    if _yaml is None:
+        import yaml
+        # Adds OrderedDict as possible yaml input
+        yaml.add_representer(OrderedDict, represent_ordereddict)
+        _yaml = yaml
+    return _yaml
+
+
 class RevolveBot:
     """
     Basic robot description class that contains robot's body and/or brain
@@ -34,6 +62,9 @@ class RevolveBot:
         self._morphological_measurements = None
         self._brain_measurements = None
         self._behavioural_measurements = None
+        self._substrate = None
+        # (key of the robot it was generated for, template) of the generated sdf
+        self._sdf_template = None
         self.self_collide = self_collide
         self.battery_level = 0.0
 
@@ -45,10 +76,20 @@ class RevolveBot:
     def body(self):
         return self._body
 
+    @body.setter
+    def body(self, body):
+        self._body = body
+        self.invalidate_sdf()
+
     @property
     def brain(self):
         return self._brain
 
+    @brain.setter
+    def brain(self, brain):
+        self._brain = brain
+        self.invalidate_sdf()
+
     def size(self):
         robot_size = 1 + self._recursive_size_measurement(self._body)
         return robot_size
@@ -80,7 +121,7 @@ class RevolveBot:
         if self._body is None:
             raise RuntimeError('Body not initialized')
         try:
-            measure = MeasureBody(self._body)
+            measure = MeasureBody(self._body, self.substrate)
             measure.measure_all()
             return measure
         except Exception as e:
@@ -89,10 +130,18 @@ class RevolveBot:
     def export_phenotype_measurements(self, data_path):
         filepath = os.path.join(data_path, 'descriptors', f'phenotype_desc_{self.id}.txt')
         with open(filepath, 'w+') as file:
-            for key, value in self._morphological_measurements.measurements_to_dict().items():
-                file.write(f'{key} {value}\n')
-            for key, value in self._brain_measurements.measurements_to_dict().items():
-                file.write(f'{key} {value}\n')
+            file.write(self.measurements_to_txt())
+
+    def measurements_to_txt(self):
+        """
+        :return: morphological and brain measurements, a `key value` pair per line
+        """
+        lines = []
+        for key, value in self._morphological_measurements.measurements_to_dict().items():
+            lines.append(f'{key} {value}\n')
+        for key, value in self._brain_measurements.measurements_to_dict().items():
+            lines.append(f'{key} {value}\n')
+        return ''.join(lines)
 
     def measure_brain(self):
         """
@@ -100,8 +149,10 @@ class RevolveBot:
         """
         try:
             measure = MeasureBrain(self._brain, 10)
-            measure_b = MeasureBody(self._body)
-            measure_b.count_active_hinges()
+            measure_b = self._morphological_measurements
+            if measure_b is None or measure_b.active_hinges_count is None:
+                measure_b = MeasureBody(self._body, self.substrate)
+                measure_b.count_active_hinges()
             if measure_b.active_hinges_count > 0:
                 measure.measure_all()
             else:
@@ -127,9 +178,11 @@ class RevolveBot:
         Load robot's description from a yaml string
         :param text: Robot's yaml description
         """
-        yaml_bot = yaml.safe_load(text)
+        yaml_bot = yaml_module().safe_load(text)
         self._id = yaml_bot['id'] if 'id' in yaml_bot else None
         self._body = CoreModule.FromYaml(yaml_bot['body'])
+        self._substrate = None
+        self.invalidate_sdf()
 
         try:
             if 'brain' in yaml_bot:
@@ -157,9 +210,34 @@ class RevolveBot:
         self.load(robot, conf_type)
 
     def to_sdf(self, pose=SDF.math.Vector3(0, 0, 0.25), nice_format=None):
+        """
+        Generates the sdf of the robot. The sdf is generated once and reused for any pose,
+        until the body or the brain is replaced or modified.
+        :param pose: position of the robot
+        :param nice_format: indentation string or True to pretty-print the sdf
+        :return: sdf string
+        """
         if type(nice_format) is bool:
             nice_format = '\t' if nice_format else None
-        return SDF.revolve_bot_to_sdf(self, pose, nice_format, self_collide=self.self_collide)
+        key = self._sdf_key()
+        if self._sdf_template is None or self._sdf_template[0] != key:
+            self._sdf_template = (key, SDF.revolve_bot_sdf_template(self, self_collide=self.self_collide))
+        return SDF.stamp_sdf_template(self._sdf_template[1], pose, nice_format)
+
+    def _sdf_key(self):
+        """
+        :return: description of everything the sdf depends on but the substrate, which clears the sdf when updated.
+         Much cheaper than generating the sdf, it tells when the body or the brain was modified in place.
+        """
+        return (self._id, self.self_collide,
+                None if self._body is None else repr(self._body.to_yaml()),
+                None if self._brain is None else repr(self._brain.to_yaml()))
+
+    def invalidate_sdf(self):
+        """
+        Discards the generated sdf
+        """
+        self._sdf_template = None
 
     def to_yaml(self):
         """
@@ -173,7 +251,29 @@ class RevolveBot:
         if self._brain is not None:
             yaml_dict['brain'] = self._brain.to_yaml()
 
-        return yaml.dump(yaml_dict)
+        return yaml_module().dump(yaml_dict)
+
+    def canonical_form(self):
+        """
+        Serialization of the structure of the body that does not depend on module ids
+        and on the rotation of the body around its core
+        :return: string
+        """
+        if self._body is None:
+            raise RuntimeError('Body not initialized')
+        return self._body.canonical_form()
+
+    def structural_hash(self, include_brain=True):
+        """
+        Hash of the robot that does not depend on ids, to cheaply find robots with the same phenotype
+        :param include_brain: if False, only the body is hashed
+        :return: hex digest
+        """
+        body_hash = self._body.structural_hash()
+        if not include_brain or self._brain is None:
+            return body_hash
+        brain_hash = self._brain.canonical_hash()
+        return hashlib.sha1('{}:{}'.format(body_hash, brain_hash).encode()).hexdigest()
 
     def save_file(self, path, conf_type='yaml'):
         """
@@ -191,85 +291,48 @@ class RevolveBot:
         with open(path, 'w') as robot_file:
             robot_file.write(robot)
 
+    @property
+    def substrate(self):
+        """
+        Occupancy grid of the body, computed once and shared by rendering and measuring
+        """
+        if self._substrate is None:
+            self.update_substrate()
+        return self._substrate
+
     def update_substrate(self, raise_for_intersections=False):
         """
         Update all coordinates for body components
 
         :param raise_for_intersections: enable raising an exception if a collision of coordinates is detected
         :raises self.ItersectionCollisionException: If a collision of coordinates is detected (and check is enabled)
+        :return: OccupancyGrid of the body
         """
-        substrate_coordinates_map = {(0, 0): self._body.id}
-        self._body.substrate_coordinates = (0, 0)
-        self._update_substrate(raise_for_intersections, self._body, Orientation.NORTH, substrate_coordinates_map)
+        self._substrate = OccupancyGrid.from_body(self._body)
+        # the coordinates of the joints are part of the sdf
+        self.invalidate_sdf()
+        if raise_for_intersections and len(self._substrate.intersections) > 0:
+            raise self.ItersectionCollisionException(self._substrate)
+        return self._substrate
 
     class ItersectionCollisionException(Exception):
         """
         A collision has been detected when updating the robot coordinates.
-        Check self.substrate_coordinates_map to know more.
-        """
-        def __init__(self, substrate_coordinates_map):
-            super().__init__(self)
-            self.substrate_coordinates_map = substrate_coordinates_map
-
-    def _update_substrate(self,
-                          raise_for_intersections,
-                          parent,
-                          parent_direction,
-                          substrate_coordinates_map):
-        """
-        Internal recursive function for self.update_substrate()
-        :param raise_for_intersections: same as in self.update_substrate
-        :param parent: updates the children of this parent
-        :param parent_direction: the "absolute" orientation of this parent
-        :param substrate_coordinates_map: map for all already explored coordinates(useful for coordinates conflict checks)
-        """
-        dic = {Orientation.NORTH: 0,
-               Orientation.WEST:  1,
-               Orientation.SOUTH: 2,
-               Orientation.EAST:  3}
-        inverse_dic = {0: Orientation.NORTH,
-                       1: Orientation.WEST,
-                       2: Orientation.SOUTH,
-                       3: Orientation.EAST}
-
-        movement_table = {
-            Orientation.NORTH: ( 1,  0),
-            Orientation.WEST:  ( 0, -1),
-            Orientation.SOUTH: (-1,  0),
-            Orientation.EAST:  ( 0,  1),
-        }
-
-        for slot, module in parent.iter_children():
-            if module is None:
-                continue
-
-            slot = Orientation(slot)
-
-            # calculate new direction
-            direction = dic[parent_direction] + dic[slot]
-            if direction >= len(dic):
-                direction = direction - len(dic)
-            new_direction = Orientation(inverse_dic[direction])
-
-            # calculate new coordinate
-            movement = movement_table[new_direction]
-            coordinates = (
-                parent.substrate_coordinates[0] + movement[0],
-                parent.substrate_coordinates[1] + movement[1],
-            )
-            module.substrate_coordinates = coordinates
-
-            # For Karine: If you need to validate old robots, remember to add this condition to this if:
-            # if raise_for_intersections and coordinates in substrate_coordinates_map and type(module) is not TouchSensorModule:
-            if raise_for_intersections:
-                if coordinates in substrate_coordinates_map:
-                    raise self.ItersectionCollisionException(substrate_coordinates_map)
-                substrate_coordinates_map[coordinates] = module.id
-
-            self._update_substrate(raise_for_intersections,
-                                   module,
-                                   new_direction,
-                                   substrate_coordinates_map)
+        Check self.substrate, and its intersections, to know more.
+        """
+        def __init__(self, substrate):
+            """
+            :param substrate: OccupancyGrid of the body, with the coordinates occupied more than once in intersections
+            """
+            super().__init__(f'Modules intersecting at {substrate.intersections}')
+            self.substrate = substrate
+
+        @property
+        def substrate_coordinates_map(self):
+            """
+            Former name of the substrate
+            """
+            return self.substrate
 
     def _iter_all_elements(self):
         to_process = deque([self._body])
@@ -284,16 +347,20 @@ class RevolveBot:
         """
         Render image of brain
         @param img_path: path to where to store image
+        :return: False if the rendering failed, the failure is logged
         """
         if self._brain is None:
             raise RuntimeError('Brain not initialized')
         elif isinstance(self._brain, BrainNN):
             try:
+                from .render.brain_graph import BrainGraph
                 brain_graph = BrainGraph(self._brain, img_path)
                 brain_graph.brain_to_graph(True)
                 brain_graph.save_graph()
+                return True
             except Exception as e:
                 logger.exception('Failed rendering brain. Exception:')
+                return False
         else:
             raise RuntimeError('Brain {} image rendering not supported'.format(type(self._brain)))
 
@@ -301,15 +368,19 @@ class RevolveBot:
         """
         Render 2d representation of robot and store as png
         :param img_path: path of storing png file
+        :return: False if the rendering failed, the failure is logged
         """
         if self._body is None:
             raise RuntimeError('Body not initialized')
         else:
             try:
+                from .render.render import Render
                 render = Render()
-                render.render_robot(self._body, img_path)
+                render.render_robot(self._body, img_path, self.substrate)
+                return True
             except Exception as e:
                 logger.exception('Failed rendering 2d robot')
+                return False
 
     def __repr__(self):
         return f'RevolveBot({self.id})'
@@ -1,6 +1,7 @@
 """
 Class containing the body parts to compose a Robogen robot
 """
+import hashlib
 from collections import OrderedDict
 from enum import Enum
 
@@ -135,6 +136,30 @@ class RevolveModule:
     def iter_children(self):
         return enumerate(self.children)
 
+    def canonical_form(self):
+        """
+        Serialization of the structure of the module and its children,
+        independent of module ids and colors
+        :return: string
+        """
+        return self._canonical_form(self._canonical_children())
+
+    def _canonical_children(self):
+        return [(slot, child.canonical_form()) for slot, child in self.iter_children() if child is not None]
+
+    def _canonical_form(self, children):
+        orientation = 0 if self.orientation is None else self.orientation % 360
+        children = ','.join('{}:{}'.format(slot, child) for slot, child in sorted(children))
+        return '{}[{:g}]({})'.format(self.TYPE, orientation, children)
+
+    def structural_hash(self):
+        """
+        Hash of the canonical form of the module tree. Two module trees have the same hash when they
+        describe the same morphology, whatever the ids of their modules.
+        :return: hex digest
+        """
+        return hashlib.sha1(self.canonical_form().encode()).hexdigest()
+
     def _generate_yaml_children(self):
         has_children = False
 
@@ -169,11 +194,11 @@ class RevolveModule:
         """
         name = 'component_{}_{}__box'.format(tree_depth, self.TYPE)
         visual = SDF.Visual(name, self.rgb)
-        geometry = SDF.MeshGeometry(self.VISUAL_MESH)
+        geometry = SDF.fragments.mesh_geometry(self.VISUAL_MESH)
         visual.append(geometry)
 
         collision = SDF.Collision(name, self.MASS)
-        geometry = SDF.BoxGeometry(self.COLLISION_BOX)
+        geometry = SDF.fragments.box_geometry(self.COLLISION_BOX)
         collision.append(geometry)
 
         return visual, collision, None
@@ -227,6 +252,23 @@ class CoreModule(RevolveModule):
             (-self.SLOT_COORDINATES, self.SLOT_COORDINATES),  # Z
         )
 
+    def canonical_form(self):
+        """
+        Serialization of the structure of the body, independent of module ids and colors
+        and normalized for the rotation of the whole body around the core:
+        the smallest serialization among the four rotations is chosen.
+        :return: string
+        """
+        # core slots in counter-clockwise order
+        slots = [Orientation.NORTH.value, Orientation.WEST.value, Orientation.SOUTH.value, Orientation.EAST.value]
+        children = self._canonical_children()
+        rotations = []
+        for rotation in range(len(slots)):
+            rotated_children = [(slots[(slots.index(slot) + rotation) % len(slots)], child)
+                                for slot, child in children]
+            rotations.append(self._canonical_form(rotated_children))
+        return min(rotations)
+
     def to_sdf(self, tree_depth='', parent_link=None, child_link=None):
         imu_sensor = SDF.IMUSensor('core-imu_sensor', parent_link, self)
         visual, collision, _ = super().to_sdf(tree_depth, parent_link, child_link)
@@ -248,8 +290,13 @@ class ActiveHingeModule(RevolveModule):
         SDF.math.Vector3(0, 0, 0),
         SDF.math.Vector3(-0.0091, 0, 0),
     )
+    COLLISION_POSITION_SERVO = (0.002375, 0, 0)
+    COLLISION_POSITION_SERVO_2 = (0.01175, 0.001, 0)
+    JOINT_POSITION = (-0.0085, 0, 0)
+    JOINT_AXIS = (0, 1, 0)
     MASS_FRAME = grams(1.7)
     MASS_SERVO = grams(9)
+    MASS_SERVO_2 = 0
 
     def __init__(self):
         super().__init__()
@@ -274,36 +321,36 @@ class ActiveHingeModule(RevolveModule):
         name_servo2 = 'component_{}_{}__servo2'.format(tree_depth, self.TYPE)
 
         visual_frame = SDF.Visual(name_frame, self.rgb)
-        geometry = SDF.MeshGeometry(self.VISUAL_MESH_FRAME)
+        geometry = SDF.fragments.mesh_geometry(self.VISUAL_MESH_FRAME)
         visual_frame.append(geometry)
 
         collision_frame = SDF.Collision(name_frame, self.MASS_FRAME)
-        geometry = SDF.BoxGeometry(self.COLLISION_BOX_FRAME)
+        geometry = SDF.fragments.box_geometry(self.COLLISION_BOX_FRAME)
         collision_frame.append(geometry)
 
         visual_servo = SDF.Visual(name_servo, self.rgb)
-        geometry = SDF.MeshGeometry(self.VISUAL_MESH_SERVO)
+        geometry = SDF.fragments.mesh_geometry(self.VISUAL_MESH_SERVO)
         visual_servo.append(geometry)
 
         collision_servo = SDF.Collision(name_servo, self.MASS_SERVO)
-        collision_servo.translate(SDF.math.Vector3(0.002375, 0, 0))
-        geometry = SDF.BoxGeometry(self.COLLISION_BOX_SERVO)
+        collision_servo.translate(SDF.math.Vector3(self.COLLISION_POSITION_SERVO))
+        geometry = SDF.fragments.box_geometry(self.COLLISION_BOX_SERVO)
         collision_servo.append(geometry)
 
-        collision_servo_2 = SDF.Collision(name_servo2, 0)
-        collision_servo_2.translate(SDF.math.Vector3(0.01175, 0.001, 0))
-        geometry = SDF.BoxGeometry(self.COLLISION_BOX_SERVO_2)
+        collision_servo_2 = SDF.Collision(name_servo2, self.MASS_SERVO_2)
+        collision_servo_2.translate(SDF.math.Vector3(self.COLLISION_POSITION_SERVO_2))
+        geometry = SDF.fragments.box_geometry(self.COLLISION_BOX_SERVO_2)
         collision_servo_2.append(geometry)
 
         joint = SDF.Joint(self.id,
                           name_joint,
                           parent_link,
                           child_link,
-                          axis=SDF.math.Vector3(0, 1, 0),
+                          axis=SDF.math.Vector3(self.JOINT_AXIS),
                           coordinates=self.substrate_coordinates,
                           motorized=True)
 
-        joint.set_position(SDF.math.Vector3(-0.0085, 0, 0))
+        joint.set_position(SDF.math.Vector3(self.JOINT_POSITION))
 
         return visual_frame, \
                [collision_frame], \
@@ -418,11 +465,11 @@ class TouchSensorModule(RevolveModule):
         name_sensor = 'sensor_{}_{}'.format(tree_depth, self.TYPE)
 
         visual = SDF.Visual(name, self.rgb)
-        geometry = SDF.MeshGeometry(self.VISUAL_MESH)
+        geometry = SDF.fragments.mesh_geometry(self.VISUAL_MESH)
         visual.append(geometry)
 
         collision = SDF.Collision(name, self.MASS)
-        geometry = SDF.BoxGeometry(self.COLLISION_BOX)
+        geometry = SDF.fragments.box_geometry(self.COLLISION_BOX)
         # collision.translate(SDF.math.Vector3(0.01175, 0.001, 0))
         collision.append(geometry)
 
@@ -1,3 +1,9 @@
 from __future__ import absolute_import
 
-from .world import World
+
+def __getattr__(name):
+    # the world is imported on first use, since it pulls in the Gazebo transport (pygazebo)
+    if name == 'World':
+        from .world import World
+        return World
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
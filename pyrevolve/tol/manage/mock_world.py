@@ -0,0 +1,212 @@
+"""
+In-process stand-in for a Gazebo world, to run the evaluation pipeline without a simulator
+"""
+import asyncio
+import math
+import random
+from types import SimpleNamespace
+
+from pyrevolve.SDF.math import Vector3, Quaternion
+from pyrevolve.custom_logging.logger import logger
+from pyrevolve.util import Time
+
+from .robotmanager import RobotManager
+
+NANOSECONDS = 10**9
+
+
+def _time(nanoseconds):
+    return Time(dbl=nanoseconds / NANOSECONDS)
+
+
+class KinematicModel:
+    """
+    Cheap replacement of the physics: the robot slides on the ground in a straight line, at a speed that grows
+    with its number of active hinges. Heading and speed are drawn from the structural hash of the robot,
+    so the same robot always follows the same trajectory.
+    """
+
+    def __init__(self, max_speed=0.1):
+        """
+        :param max_speed: speed, in meters per second, approached by robots with many active hinges
+        """
+        self.max_speed = max_speed
+
+    def __call__(self, revolve_bot, pose):
+        """
+        :param revolve_bot: inserted robot
+        :type revolve_bot: RevolveBot
+        :param pose: insertion position
+        :type pose: Vector3
+        :return: trajectory of the robot, a function of the simulation time since the insertion
+         that returns (position, orientation, number of contacts with the ground)
+        """
+        hinges = 0
+        extremities = 0
+        for module in revolve_bot._iter_all_elements():
+            if module.TYPE == 'ActiveHinge':
+                hinges += 1
+            if not any(child is not None for _slot, child in module.iter_children()):
+                extremities += 1
+
+        rng = random.Random(revolve_bot.structural_hash())
+        heading = rng.uniform(-math.pi, math.pi)
+        speed = self.max_speed * rng.uniform(0.5, 1.0) * hinges / (hinges + 2)
+        orientation = Quaternion.from_rpy(0, 0, heading)
+        direction = Vector3(math.cos(heading), math.sin(heading), 0)
+        start = Vector3(pose.x, pose.y, pose.z)
+
+        def trajectory(t):
+            return start + direction * (speed * t), orientation, extremities
+
+        return trajectory
+
+
+class MockWorld:
+    """
+    Implements the part of `pyrevolve.tol.manage.World` used by the `SimulatorQueue`.
+
+    Inserted robots get a `RobotManager` that is fed with robot states and ground contacts,
+    produced by a trajectory at the pose update frequency, until their life timeout.
+    """
+
+    def __init__(self, conf, trajectory=None, real_time_factor=None, build_sdf=True):
+        """
+        :param conf: settings of the experiment
+        :param trajectory: function (revolve_bot, insertion position) returning the trajectory of the robot,
+         see `KinematicModel`, which is the default
+        :param real_time_factor: simulation seconds per wall clock second, None to simulate as fast as possible
+        :param build_sdf: generate the SDF of the inserted robots, as the real world does
+        """
+        self.conf = conf
+        self.trajectory = KinematicModel() if trajectory is None else trajectory
+        self.real_time_factor = real_time_factor
+        self.build_sdf = build_sdf
+        self.robot_managers = {}
+        self.start_time = None
+        self.last_time = None
+        self._nanoseconds = 0
+        self._step = int(round(NANOSECONDS / conf.pose_update_frequency))
+        self._running = asyncio.Event()
+        self._running.set()
+        self._simulations = {}
+
+    @classmethod
+    async def create(cls, conf, trajectory=None, real_time_factor=None, build_sdf=True):
+        return cls(conf, trajectory, real_time_factor, build_sdf)
+
+    async def disconnect(self):
+        for simulation in self._simulations.values():
+            simulation.cancel()
+        self._simulations = {}
+
+    def age(self):
+        """
+        :return: age of the world, as a Time
+        """
+        if self.start_time is None:
+            return Time()
+        return self.last_time - self.start_time
+
+    async def insert_robot(self, revolve_bot, pose=Vector3(0, 0, 0.05), life_timeout=None):
+        """
+        :param revolve_bot: robot to insert
+        :type revolve_bot: RevolveBot
+        :param pose: insertion position
+        :param life_timeout: simulation seconds after which the robot dies, None for the evaluation time
+        :return: the manager of the inserted robot
+        """
+        assert (not str(revolve_bot.id).isdigit())
+        if self.build_sdf:
+            revolve_bot.to_sdf(pose)
+
+        life_timeout = self.conf.evaluation_time if life_timeout is None else life_timeout
+        robot_manager = RobotManager(
+            conf=self.conf,
+            robot=revolve_bot,
+            position=Vector3(pose.x, pose.y, pose.z),
+            time=_time(self._nanoseconds),
+            battery_level=revolve_bot.battery_level,
+            # the whole life of the robot is in the speed window
+            position_log_size=int(life_timeout * self.conf.pose_update_frequency) + 1,
+        )
+        if robot_manager.name in self.robot_managers:
+            raise ValueError("Duplicate robot: {}".format(robot_manager.name))
+        self.robot_managers[robot_manager.name] = robot_manager
+
+        trajectory = self.trajectory(revolve_bot, pose)
+        self._simulations[robot_manager.name] = asyncio.ensure_future(
+            self._simulate(robot_manager, trajectory, int(life_timeout * NANOSECONDS)))
+        return robot_manager
+
+    async def _simulate(self, robot_manager, trajectory, life_timeout):
+        inserted = self._nanoseconds
+        try:
+            while self._nanoseconds - inserted < life_timeout:
+                await self._running.wait()
+                if self.real_time_factor is None:
+                    await asyncio.sleep(0)
+                else:
+                    await asyncio.sleep(self._step / NANOSECONDS / self.real_time_factor)
+                if robot_manager.name not in self.robot_managers:
+                    return
+                self._nanoseconds += self._step
+                self._update(robot_manager, trajectory((self._nanoseconds - inserted) / NANOSECONDS))
+        except Exception:
+            logger.exception(f'Failed simulating robot {robot_manager.name}')
+        finally:
+            robot_manager.dead = True
+            self._simulations.pop(robot_manager.name, None)
+
+    def _update(self, robot_manager, robot_state):
+        """
+        Feeds the robot manager with a robot state and the ground contacts, like `WorldManager._update_states`
+        and `WorldManager._update_contacts` do with the messages of the simulator
+        """
+        position, orientation, contacts = robot_state
+        self.last_time = t = _time(self._nanoseconds)
+        if self.start_time is None or t < self.start_time:
+            self.start_time = t
+
+        state = SimpleNamespace(
+            name=robot_manager.name,
+            dead=False,
+            pose=SimpleNamespace(
+                position=SimpleNamespace(x=position[0], y=position[1], z=position[2]),
+                orientation=SimpleNamespace(w=orientation[0], x=orientation[1], y=orientation[2], z=orientation[3]),
+            ),
+        )
+        robot_manager.update_state(self, t, state, None)
+        if contacts > 0:
+            robot_manager.update_contacts(self, SimpleNamespace(position=range(contacts)))
+
+    def unregister_robot(self, robot_manager):
+        del self.robot_managers[robot_manager.name]
+
+    async def delete_robot(self, robot_manager):
+        self.unregister_robot(robot_manager)
+
+    async def delete_all_robots(self):
+        for robot_manager in list(self.robot_managers.values()):
+            await self.delete_robot(robot_manager)
+
+    async def pause(self, pause=True):
+        """
+        Pauses or resumes the simulation of the inserted robots
+        """
+        if pause:
+            self._running.clear()
+        else:
+            self._running.set()
+
+    async def reset(self, rall=False, time_only=True, model_only=False):
+        """
+        Resets the simulation time. With `rall` or `model_only`, also kills the inserted robots
+        """
+        if rall or model_only:
+            for simulation in self._simulations.values():
+                simulation.cancel()
+        if rall or not model_only:
+            self._nanoseconds = 0
+            self.start_time = None
+            self.last_time = None
@@ -4,4 +4,11 @@ from .time import Time
 
 from .functions import *
 from .futures import *
-from .supervisor import Supervisor
+
+
+def __getattr__(name):
+    # the supervisors are imported on first use, they are only needed to launch simulators
+    if name == 'Supervisor':
+        from .supervisor import Supervisor
+        return Supervisor
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
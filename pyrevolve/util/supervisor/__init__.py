@@ -1,3 +1,9 @@
 from __future__ import absolute_import
 
-from .supervisor import Supervisor
+
+def __getattr__(name):
+    # imported on first use, so that importing the simulator queues does not import the single process supervisor
+    if name == 'Supervisor':
+        from .supervisor import Supervisor
+        return Supervisor
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -1,16 +1,19 @@
 import os
 
 from pyrevolve.custom_logging.logger import logger
+from pyrevolve.custom_logging.tracer import tracer
 from pyrevolve.gazebo.analyze import BodyAnalyzer
+from pyrevolve.util.supervisor.simulator_backend import GazeboBackend
 from pyrevolve.util.supervisor.simulator_queue import SimulatorQueue
 from pyrevolve.util.supervisor.supervisor_collision import CollisionSimSupervisor
 
 
 class AnalyzerQueue(SimulatorQueue):
     EVALUATION_TIMEOUT = 30  # seconds
+    TRACE_NAME = 'analyzer'
 
     def __init__(self, n_cores: int, settings, port_start=11345, simulator_cmd='gzserver'):
-        super(AnalyzerQueue, self).__init__(n_cores, settings, port_start, simulator_cmd)
+        super(AnalyzerQueue, self).__init__(n_cores, settings, port_start, simulator_cmd, backend=GazeboBackend())
 
     def _simulator_supervisor(self, simulator_name_postfix):
         return CollisionSimSupervisor(
@@ -31,5 +34,6 @@ class AnalyzerQueue(SimulatorQueue):
             analyze_result = None
             return analyze_result
         else:
-            analyze_result = await simulator_connection.analyze_robot(robot.phenotype)
+            with tracer.span('analyzer run', robot.id):
+                analyze_result = await simulator_connection.analyze_robot(robot.phenotype)
             return analyze_result
@@ -0,0 +1,589 @@
+"""
+Evaluation of the robots by simulators on other machines.
+
+A `DistributedSimulatorQueue`, in the process of the experiment, hands the robots out to worker agents over TCP.
+Each worker runs its own simulators with a local `SimulatorQueue`, supervised as usual, and returns the fitness
+and behavioural measurements of the robots. Start a worker from the revolve folder of each machine with:
+
+    python -m pyrevolve.util.supervisor.distributed --coordinator <host>:<port> --n-cores <simulators>
+
+The coordinator listens on the same machine only, unless it is given another `--distributed-address` together with
+a `--distributed-token` that the workers send as well.
+
+The messages are lines of JSON:
+- worker -> coordinator: `hello` (name, slots, token, robots still running), `result`, `error` and `heartbeat`
+- coordinator -> worker: `job` (robot as YAML, evaluation time, fitness function), `ack` of the results and
+  `heartbeat`
+
+Both sides send heartbeats, and drop the connection when the other side is silent for too long. A worker then
+reconnects.
+
+Workers pull as many robots as they have free simulators, so faster machines evaluate more robots. When the queue
+is empty, an idle worker also evaluates the robots running for much longer than usual elsewhere, and the first
+result wins. A robot is handed out again when its worker is lost, and workers send their results again after
+reconnecting until the coordinator acknowledges them: every robot is evaluated at least once.
+"""
+import asyncio
+import hmac
+import importlib
+import ipaddress
+import json
+import os
+import socket
+import statistics
+import time
+from collections import deque
+
+from pyrevolve.custom_logging.logger import logger
+from pyrevolve.custom_logging.metrics import metrics
+from pyrevolve.custom_logging.tracer import tracer
+from pyrevolve.evolution.individual import Individual
+from pyrevolve.revolve_bot import RevolveBot
+from pyrevolve.tol.manage import measures
+from pyrevolve.util.supervisor.simulator_queue import SimulatorQueue
+
+# longest message, a robot in YAML
+MESSAGE_LIMIT = 2 ** 24  # bytes
+
+# type of the messages sent by the workers: types of their fields
+_WORKER_MESSAGES = {
+    'hello': {'name': str, 'slots': int, 'token': str, 'running': list},
+    'result': {'id': str, 'fitness': (float, int, type(None)), 'measurements': (dict, type(None)), 'abandoned': bool},
+    'error': {'id': str, 'message': str},
+    'heartbeat': {},
+}
+
+
+def send_message(writer, message):
+    """
+    :param writer: asyncio stream of the connection, the message is dropped if it is closed
+    :param message: dictionary sent as a line of JSON
+    """
+    if writer is None or writer.is_closing():
+        return
+    writer.write((json.dumps(message) + '\n').encode('utf-8'))
+
+
+async def read_message(reader):
+    """
+    :param reader: asyncio stream of the connection
+    :return: dictionary read from a line of JSON, None when the connection is closed
+    :raises ValueError: if the line is not a JSON object
+    """
+    line = await reader.readline()
+    if not line:
+        return None
+    message = json.loads(line.decode('utf-8'))
+    if not isinstance(message, dict):
+        raise ValueError(f'Message is not a JSON object: {line[:100]!r}')
+    return message
+
+
+def check_worker_message(message):
+    """
+    :param message: message received from a worker
+    :raises ValueError: if its type is unknown, or one of its fields is missing or of the wrong type
+    """
+    fields = _WORKER_MESSAGES.get(message.get('type'))
+    if fields is None:
+        raise ValueError(f'unknown message type {message.get("type")!r}')
+    for field, field_type in fields.items():
+        if not isinstance(message.get(field), field_type):
+            raise ValueError(f'{message["type"]} message with a missing or invalid {field}')
+
+
+def function_path(function):
+    """
+    :param function: function defined at the top level of a module, such as a fitness function
+    :return: "module:name" string to import it in another process
+    """
+    path = f'{function.__module__}:{function.__qualname__}'
+    if '<' in path:
+        raise ValueError(f'{path} cannot be imported by the workers, define it at the top level of a module')
+    return path
+
+
+def import_function(path):
+    """
+    :param path: "module:name" string from `function_path`
+    :return: the function
+    """
+    module, name = path.split(':')
+    function = importlib.import_module(module)
+    for attribute in name.split('.'):
+        function = getattr(function, attribute)
+    return function
+
+
+def is_loopback(address):
+    """
+    :param address: host name or IP address
+    :return: whether only the same machine can connect to the address
+    """
+    if address == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(address).is_loopback
+    except ValueError:
+        return False
+
+
+def _float(value):
+    return None if value is None else float(value)
+
+
+class _Job:
+    def __init__(self, job_id, robot, conf, future, message):
+        self.id = job_id
+        self.robot = robot
+        self.conf = conf
+        self.future = future
+        self.message = message
+        self.errors = 0
+        self.enqueued = time.perf_counter()
+        # worker name: time the worker received the robot
+        self.workers = {}
+
+
+class _WorkerConnection:
+    def __init__(self, name, slots, writer):
+        self.name = name
+        self.slots = slots
+        self.writer = writer
+        self.running = set()
+        self.last_seen = time.monotonic()
+
+    @property
+    def free_slots(self):
+        return self.slots - len(self.running)
+
+
+class DistributedSimulatorQueue:
+    """
+    Coordinator handing the robots out to worker agents, in place of a `SimulatorQueue`
+    """
+    # retries of a robot whose evaluation raised an error on a worker, as for the failed attempts of SimulatorQueue
+    MAX_ATTEMPTS = 3
+    # seconds without message after which a worker is considered lost
+    WORKER_TIMEOUT = 30
+    # seconds between two heartbeats sent to the workers
+    HEARTBEAT_INTERVAL = 5
+    # a robot running for longer than this factor times the median evaluation is evaluated by an idle worker as well
+    STEAL_FACTOR = 2
+    # evaluations needed to estimate the median
+    STEAL_MIN_SAMPLES = 5
+    # prefix of the stages traced by the queue
+    TRACE_NAME = 'distributed'
+
+    def __init__(self, settings, port=None, address=None, token=None, steal_after=None):
+        """
+        :param settings: settings of the experiment
+        :param port: port where the workers connect, by default `--distributed-port`, 0 picks a free port
+        :param address: address the coordinator listens on, by default `--distributed-address`
+        :param token: secret the workers have to send, by default `--distributed-token`
+        :param steal_after: seconds after which a running robot can be evaluated by an idle worker as well,
+         by default estimated from the past evaluations
+        """
+        self._settings = settings
+        self.port = getattr(settings, 'distributed_port', 0) if port is None else port
+        self._address = getattr(settings, 'distributed_address', '127.0.0.1') if address is None else address
+        self._token = getattr(settings, 'distributed_token', '') if token is None else token
+        self._steal_after = steal_after
+        self._session = f'{socket.gethostname()}-{os.getpid()}-{int(time.time())}'
+        self._next_job = 0
+        # job id: pending job
+        self._jobs = {}
+        self._queue = deque()
+        # worker name: connection
+        self._workers = {}
+        self._durations = deque(maxlen=100)
+        self._server = None
+        self._tick_task = None
+        self._last_heartbeat = time.monotonic()
+
+    async def start(self):
+        if self._token == '' and not is_loopback(self._address):
+            raise ValueError(f'Refusing to wait for workers on {self._address} without a secret, '
+                             f'set --distributed-token or listen on 127.0.0.1')
+        self._server = await asyncio.start_server(self._handle_worker, self._address, self.port, limit=MESSAGE_LIMIT)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._tick_task = asyncio.ensure_future(self._tick())
+        logger.info(f'Waiting for workers on {self._address}:{self.port}')
+
+    async def stop(self):
+        if self._tick_task is not None:
+            self._tick_task.cancel()
+        for worker in list(self._workers.values()):
+            self._drop(worker)
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def test_robot(self, robot, conf):
+        """
+        :param robot: robot phenotype
+        :param conf: configuration of the experiment
+        :return: future of the fitness and behavioural measurements of the robot
+        """
+        job_id = f'{self._session}-{self._next_job}'
+        self._next_job += 1
+        message = {
+            'type': 'job',
+            'id': job_id,
+            'robot': robot.phenotype.to_yaml(),
+            'evaluation_time': conf.evaluation_time,
+            'fitness': function_path(conf.fitness_function),
+        }
+        future = asyncio.Future()
+        self._jobs[job_id] = _Job(job_id, robot, conf, future, message)
+        self._queue.append(job_id)
+        self._trace_queue()
+        self._dispatch()
+        return future
+
+    def _trace_queue(self):
+        tracer.gauge(f'{self.TRACE_NAME} queue', len(self._queue))
+        metrics.set('queue_depth', len(self._queue), queue=self.TRACE_NAME)
+        metrics.set('workers', len(self._workers))
+
+    async def _tick(self):
+        while True:
+            await asyncio.sleep(1)
+            now = time.monotonic()
+            for worker in list(self._workers.values()):
+                if now - worker.last_seen > self.WORKER_TIMEOUT:
+                    logger.warning(f'Worker {worker.name} did not answer for {self.WORKER_TIMEOUT}s')
+                    self._drop(worker)
+            if now - self._last_heartbeat >= self.HEARTBEAT_INTERVAL:
+                # lets the workers tell a silent coordinator from a lost one
+                self._last_heartbeat = now
+                for worker in self._workers.values():
+                    send_message(worker.writer, {'type': 'heartbeat'})
+            # idle workers may steal the robots that became slow
+            self._dispatch()
+
+    async def _handle_worker(self, reader, writer):
+        worker = None
+        try:
+            hello = await asyncio.wait_for(read_message(reader), self.WORKER_TIMEOUT)
+            if hello is None:
+                return
+            try:
+                check_worker_message(hello)
+                if hello['type'] != 'hello':
+                    raise ValueError(f'{hello["type"]} message instead of hello')
+            except ValueError as e:
+                logger.warning(f'Refused worker: {e}')
+                return
+            # compared as bytes, any character can be part of the token
+            if not hmac.compare_digest(hello['token'].encode('utf-8'), self._token.encode('utf-8')):
+                logger.warning(f'Refused worker {hello["name"]}: wrong token')
+                return
+            worker = self._register(hello, writer)
+            while True:
+                message = await read_message(reader)
+                if message is None:
+                    break
+                # a malformed message drops the worker, and its robots are handed out again
+                check_worker_message(message)
+                worker.last_seen = time.monotonic()
+                if message['type'] == 'result':
+                    self._on_result(worker, message)
+                elif message['type'] == 'error':
+                    self._on_error(worker, message)
+        except (OSError, ValueError, KeyError, TypeError, asyncio.TimeoutError) as e:
+            logger.warning(f'Connection with worker {worker.name if worker else "?"} failed: {e}')
+        finally:
+            if worker is not None and self._workers.get(worker.name) is worker:
+                self._drop(worker)
+            writer.close()
+
+    def _register(self, hello, writer):
+        name = hello['name']
+        if name in self._workers:
+            # reconnected before its previous connection timed out, its robots are handed out below if it lost them
+            self._drop(self._workers[name], dispatch=False)
+        worker = _WorkerConnection(name, hello['slots'], writer)
+        self._workers[name] = worker
+        # the robots it kept evaluating while disconnected are not handed out again
+        for job_id in hello['running']:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.workers[name] = time.perf_counter()
+                worker.running.add(job_id)
+                if job_id in self._queue:
+                    self._queue.remove(job_id)
+        logger.info(f'Worker {name} connected with {worker.slots} simulators')
+        self._trace_queue()
+        self._dispatch()
+        return worker
+
+    def _drop(self, worker, dispatch=True):
+        """
+        Forgets a lost worker and hands its robots out again
+        :param worker: connection of the worker
+        :param dispatch: whether to send the robots to the other workers right away
+        """
+        del self._workers[worker.name]
+        worker.writer.close()
+        requeued = 0
+        for job_id in worker.running:
+            job = self._jobs.get(job_id)
+            if job is None:
+                continue
+            job.workers.pop(worker.name, None)
+            if len(job.workers) == 0:
+                self._queue.appendleft(job_id)
+                requeued += 1
+        logger.warning(f'Worker {worker.name} disconnected, {requeued} robots handed out again')
+        self._trace_queue()
+        if dispatch:
+            self._dispatch()
+
+    def _dispatch(self):
+        """
+        Sends the queued robots to the workers with free simulators, the most free first
+        """
+        while True:
+            workers = [worker for worker in self._workers.values() if worker.free_slots > 0]
+            if len(workers) == 0:
+                return
+            worker = max(workers, key=lambda w: w.free_slots)
+            job = self._next(worker)
+            if job is None:
+                return
+            if len(job.workers) == 0:
+                tracer.add_span(f'{self.TRACE_NAME} wait', job.enqueued, robot_id=job.robot.id)
+            job.workers[worker.name] = time.perf_counter()
+            worker.running.add(job.id)
+            send_message(worker.writer, job.message)
+            self._trace_queue()
+
+    def _next(self, worker):
+        while len(self._queue) > 0:
+            job = self._jobs.get(self._queue.popleft())
+            if job is not None:
+                return job
+        return self._steal(worker)
+
+    def _steal(self, worker):
+        """
+        :param worker: idle worker
+        :return: the robot running for the longest time on a single other worker, if it is running for longer than
+         expected
+        """
+        steal_after = self._steal_after
+        if steal_after is None:
+            if len(self._durations) < self.STEAL_MIN_SAMPLES:
+                return None
+            steal_after = self.STEAL_FACTOR * statistics.median(self._durations)
+        now = time.perf_counter()
+        candidates = [job for job in self._jobs.values()
+                      if len(job.workers) == 1 and worker.name not in job.workers
+                      and now - min(job.workers.values()) > steal_after]
+        if len(candidates) == 0:
+            return None
+        job = min(candidates, key=lambda j: min(j.workers.values()))
+        logger.info(f'Worker {worker.name} also evaluates robot {job.robot.id}, slow on {list(job.workers)[0]}')
+        return job
+
+    def _on_result(self, worker, message):
+        worker.running.discard(message['id'])
+        send_message(worker.writer, {'type': 'ack', 'id': message['id']})
+        job = self._jobs.pop(message['id'], None)
+        if job is None:
+            # evaluated by another worker first
+            self._dispatch()
+            return
+        start = job.workers.get(worker.name)
+        if start is not None:
+            self._durations.append(time.perf_counter() - start)
+            tracer.add_span(f'{self.TRACE_NAME} evaluation', start, robot_id=job.robot.id)
+        metrics.evaluation_finished(self.TRACE_NAME)
+        if message['abandoned']:
+            self._abandon(job)
+            return
+        behavioural_measurements = None
+        if message['measurements'] is not None:
+            behavioural_measurements = measures.BehaviouralMeasurements()
+            for name, value in message['measurements'].items():
+                setattr(behavioural_measurements, name, value)
+        job.future.set_result((message['fitness'], behavioural_measurements))
+        self._dispatch()
+
+    def _on_error(self, worker, message):
+        worker.running.discard(message['id'])
+        send_message(worker.writer, {'type': 'ack', 'id': message['id']})
+        job = self._jobs.get(message['id'])
+        if job is None:
+            self._dispatch()
+            return
+        job.workers.pop(worker.name, None)
+        job.errors += 1
+        metrics.inc('failed_evaluations_total', queue=self.TRACE_NAME)
+        logger.error(f'Worker {worker.name} failed evaluating robot {job.robot.id}: {message["message"]}')
+        if job.errors >= self.MAX_ATTEMPTS:
+            del self._jobs[job.id]
+            self._abandon(job)
+            return
+        if len(job.workers) == 0:
+            self._queue.appendleft(job.id)
+        self._trace_queue()
+        self._dispatch()
+
+    def _abandon(self, job):
+        logger.info(f'Robot {job.robot.id} evaluation failed (reached max attempt of 3), fitness set to None.')
+        metrics.inc('abandoned_robots_total', queue=self.TRACE_NAME)
+        if job.conf.experiment_management is not None:
+            job.conf.experiment_management.export_failed_eval_robot(job.robot)
+        job.future.set_result((None, None))
+        self._dispatch()
+
+    async def _joint(self):
+        while len(self._jobs) > 0:
+            await asyncio.wait([job.future for job in self._jobs.values()])
+
+
+class _JobConfig:
+    """
+    Part of the configuration of the experiment used by the local queue of a worker
+    """
+
+    def __init__(self, evaluation_time, fitness_function):
+        self.evaluation_time = evaluation_time
+        self.fitness_function = fitness_function
+        self.experiment_management = self
+        self.abandoned = False
+
+    def export_failed_eval_robot(self, _robot):
+        # reported to the coordinator, which exports the robot
+        self.abandoned = True
+
+
+class DistributedWorker:
+    """
+    Worker agent evaluating the robots of a coordinator with its local simulators
+    """
+    HEARTBEAT_INTERVAL = 5  # seconds
+    # seconds without message after which the coordinator is considered lost
+    COORDINATOR_TIMEOUT = 30
+    RECONNECT_DELAY = 1  # seconds, doubled after each failure
+    MAX_RECONNECT_DELAY = 30  # seconds
+
+    def __init__(self, settings, coordinator, name=None, token=None, queue=None):
+        """
+        :param settings: settings of the worker, for its simulators
+        :param coordinator: "host:port" of the coordinator
+        :param name: name of the worker, unique among the workers of the coordinator
+        :param token: secret expected by the coordinator, by default `--distributed-token`
+        :param queue: local queue of `--n-cores` simulators, by default a SimulatorQueue
+        """
+        self._host, port = coordinator.rsplit(':', 1)
+        self._port = int(port)
+        self.name = f'{socket.gethostname()}-{os.getpid()}' if name is None else name
+        self._token = getattr(settings, 'distributed_token', '') if token is None else token
+        self._queue = SimulatorQueue(settings.n_cores, settings, settings.port_start) if queue is None else queue
+        self._slots = settings.n_cores
+        self._writer = None
+        # job id: task evaluating the robot
+        self._running = {}
+        # job id: result not yet acknowledged by the coordinator
+        self._outbox = {}
+        self._stopped = asyncio.Event()
+
+    async def run(self):
+        """
+        Evaluates robots until stopped, reconnecting to the coordinator when the connection is lost
+        """
+        await self._queue.start()
+        delay = self.RECONNECT_DELAY
+        while not self._stopped.is_set():
+            try:
+                reader, writer = await asyncio.open_connection(self._host, self._port, limit=MESSAGE_LIMIT)
+            except OSError as e:
+                logger.warning(f'Cannot reach the coordinator {self._host}:{self._port} ({e}), retrying in {delay}s')
+                try:
+                    await asyncio.wait_for(self._stopped.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                delay = min(2 * delay, self.MAX_RECONNECT_DELAY)
+                continue
+            delay = self.RECONNECT_DELAY
+            logger.info(f'Connected to the coordinator {self._host}:{self._port}')
+            await self._serve(reader, writer)
+            if not self._stopped.is_set():
+                logger.warning('Lost the coordinator, reconnecting')
+
+    def stop(self):
+        self._stopped.set()
+        if self._writer is not None:
+            self._writer.close()
+
+    async def _serve(self, reader, writer):
+        self._writer = writer
+        send_message(writer, {'type': 'hello', 'name': self.name, 'slots': self._slots, 'token': self._token,
+                              'running': list(self._running)})
+        for result in self._outbox.values():
+            send_message(writer, result)
+        heartbeat = asyncio.ensure_future(self._heartbeat(writer))
+        try:
+            while True:
+                message = await asyncio.wait_for(read_message(reader), self.COORDINATOR_TIMEOUT)
+                if message is None:
+                    break
+                if message.get('type') == 'job' and message['id'] not in self._running:
+                    self._running[message['id']] = asyncio.ensure_future(self._evaluate(message))
+                elif message.get('type') == 'ack':
+                    self._outbox.pop(message['id'], None)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f'Connection with the coordinator failed: {e}')
+        except asyncio.TimeoutError:
+            logger.warning(f'The coordinator did not answer for {self.COORDINATOR_TIMEOUT}s')
+        finally:
+            heartbeat.cancel()
+            self._writer = None
+            writer.close()
+
+    async def _heartbeat(self, writer):
+        while True:
+            await asyncio.sleep(self.HEARTBEAT_INTERVAL)
+            send_message(writer, {'type': 'heartbeat'})
+
+    async def _evaluate(self, message):
+        job_id = message['id']
+        try:
+            phenotype = RevolveBot()
+            phenotype.load_yaml(message['robot'])
+            phenotype.measure_phenotype()
+            conf = _JobConfig(message['evaluation_time'], import_function(message['fitness']))
+            fitness, behavioural_measurements = await self._queue.test_robot(Individual(None, phenotype), conf)
+            result = {
+                'type': 'result',
+                'id': job_id,
+                'fitness': _float(fitness),
+                'measurements': None if behavioural_measurements is None else
+                {name: _float(value) for name, value in behavioural_measurements.items()},
+                'abandoned': conf.abandoned,
+            }
+        except Exception as e:
+            logger.exception(f'Exception evaluating job {job_id}')
+            result = {'type': 'error', 'id': job_id, 'message': repr(e)}
+        del self._running[job_id]
+        self._outbox[job_id] = result
+        send_message(self._writer, result)
+
+
+def main():
+    from pyrevolve import parser
+    settings = parser.parse_args()
+    if settings.coordinator is None:
+        parser.error('the address of the coordinator is required: --coordinator <host>:<port>')
+    try:
+        asyncio.get_event_loop().run_until_complete(DistributedWorker(settings, settings.coordinator).run())
+    except KeyboardInterrupt:
+        print("Got CtrlC, shutting down.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Order in which the simulators of a queue evaluate the robots, to shorten the tail of the generations
+"""
+import heapq
+
+import numpy as np
+
+
+class EvaluationCostModel:
+    """
+    Estimates the wall clock duration of the evaluation of a robot from its body, fitted on the past evaluations.
+
+    The model is linear in the absolute size and the number of hinges of the body, and predicts the wall clock
+    seconds per simulated second, so that it holds for any evaluation time. It is a ridge regression pulled
+    towards the real time, one wall clock second per simulated second, until enough robots are evaluated.
+    """
+
+    # weight of the prior, in evaluations
+    PRIOR_WEIGHT = 0.01
+    # shortest predicted duration, per simulated second
+    MIN_RATE = 1e-3
+
+    def __init__(self):
+        prior = np.array([1.0, 0.0, 0.0])
+        self._xtx = np.eye(3) * self.PRIOR_WEIGHT
+        self._xty = prior * self.PRIOR_WEIGHT
+        self._weights = prior
+        self.samples = 0
+
+    @staticmethod
+    def features(robot):
+        """
+        :param robot: individual with a measured phenotype
+        :return: features of the body of the robot: 1, absolute size, number of hinges
+        """
+        measurements = robot.phenotype._morphological_measurements
+        if measurements is None:
+            return np.array([1.0, 0.0, 0.0])
+        return np.array([1.0, measurements.absolute_size or 0, measurements.hinge_count or 0], dtype=float)
+
+    def add(self, robot, evaluation_time, duration):
+        """
+        Fits the model to an evaluation
+        :param robot: individual evaluated
+        :param evaluation_time: simulated seconds of the evaluation
+        :param duration: wall clock seconds the evaluation took
+        """
+        if evaluation_time <= 0:
+            return
+        x = self.features(robot)
+        self._xtx += np.outer(x, x)
+        self._xty += x * (duration / evaluation_time)
+        self._weights = np.linalg.solve(self._xtx, self._xty)
+        self.samples += 1
+
+    def expected(self, robot, evaluation_time):
+        """
+        :param robot: individual to evaluate
+        :param evaluation_time: simulated seconds of the evaluation
+        :return: expected wall clock seconds of the evaluation
+        """
+        return max(float(self.features(robot) @ self._weights), self.MIN_RATE) * evaluation_time
+
+
+def expected_makespan(durations, remaining, n_simulators):
+    """
+    Time until the last robot is evaluated, when each free simulator takes the longest queued robot
+    :param durations: expected durations of the queued robots
+    :param remaining: expected remaining durations of the robots being evaluated
+    :param n_simulators: number of simulators
+    :return: expected makespan in seconds
+    """
+    loads = list(remaining) + [0.0] * (n_simulators - len(remaining))
+    heapq.heapify(loads)
+    for duration in sorted(durations, reverse=True):
+        heapq.heappush(loads, heapq.heappop(loads) + duration)
+    return max(loads, default=0.0)
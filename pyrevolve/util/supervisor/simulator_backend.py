@@ -0,0 +1,71 @@
+"""
+Simulators that the `SimulatorQueue` can evaluate the robots in
+"""
+from pyrevolve.tol.manage.mock_world import MockWorld
+
+
+class SimulatorBackend:
+    """
+    Creates the connections of a `SimulatorQueue` to its simulators.
+    A connection implements the part of `pyrevolve.tol.manage.World` used by the queue:
+    `insert_robot`, `unregister_robot`, `reset`, `pause` and `disconnect`.
+    """
+    # whether the queue launches and supervises a simulator process for each connection
+    needs_simulator_process = True
+    # seconds between two checks of whether the evaluated robot is dead
+    poll_interval = 0.5
+
+    async def connect(self, settings, address, port):
+        """
+        :param settings: settings of the experiment
+        :param address: address of the simulator
+        :param port: port of the simulator
+        :return: connection to the simulator
+        """
+        raise NotImplementedError
+
+
+class GazeboBackend(SimulatorBackend):
+    """
+    Gazebo simulators, launched by the queue
+    """
+
+    async def connect(self, settings, address, port):
+        # imported here, since it pulls in the Gazebo transport (pygazebo)
+        from pyrevolve.tol.manage import World
+        return await World.create(settings, world_address=(address, port))
+
+
+class MockBackend(SimulatorBackend):
+    """
+    In-process stand-in for the simulators, see `MockWorld`.
+    Useful to test and profile the evolution without Gazebo.
+    """
+    needs_simulator_process = False
+    poll_interval = 0.01
+
+    def __init__(self, trajectory=None, real_time_factor=None, build_sdf=True):
+        """
+        :param trajectory: trajectories of the robots, see `MockWorld`
+        :param real_time_factor: simulation seconds per wall clock second, None to simulate as fast as possible
+        :param build_sdf: generate the SDF of the inserted robots, as Gazebo requires
+        """
+        self.trajectory = trajectory
+        self.real_time_factor = real_time_factor
+        self.build_sdf = build_sdf
+
+    async def connect(self, settings, address, port):
+        return await MockWorld.create(settings, self.trajectory, self.real_time_factor, self.build_sdf)
+
+
+def simulator_backend(settings):
+    """
+    :param settings: settings of the experiment
+    :return: the simulator backend selected with `--simulator-backend`
+    """
+    backend = getattr(settings, 'simulator_backend', 'gazebo')
+    if backend == 'gazebo':
+        return GazeboBackend()
+    elif backend == 'mock':
+        return MockBackend()
+    raise ValueError(f'Unknown simulator backend "{backend}"')
@@ -1,29 +1,58 @@
 import asyncio
+import itertools
 import os
 import time
 
 from pyrevolve.custom_logging.logger import logger
+from pyrevolve.custom_logging.metrics import metrics
+from pyrevolve.custom_logging.tracer import tracer
 from pyrevolve.evolution.population import PopulationConfig
-from pyrevolve.tol.manage import World
+from pyrevolve.util.supervisor.scheduling import EvaluationCostModel, expected_makespan
+from pyrevolve.util.supervisor.simulator_backend import simulator_backend
 from pyrevolve.util.supervisor.supervisor_multi import DynamicSimSupervisor
 from pyrevolve.SDF.math import Vector3
 from pyrevolve.tol.manage import measures
 
 
 class SimulatorQueue:
+    """
+    Evaluates the robots in a pool of simulators. The free simulators take the robots expected to take the longest
+    first (see `EvaluationCostModel`), so that no long evaluation starts at the end of a generation, and the robots
+    to evaluate again after a failure before the others.
+    """
     EVALUATION_TIMEOUT = 120  # seconds
+    # prefix of the stages traced by the queue
+    TRACE_NAME = 'simulator'
 
-    def __init__(self, n_cores: int, settings, port_start=11345, simulator_cmd=None):
+    def __init__(self, n_cores: int, settings, port_start=11345, simulator_cmd=None, backend=None):
+        """
+        :param n_cores: number of simulators evaluating robots at the same time
+        :param settings: settings of the experiment
+        :param port_start: port of the first simulator
+        :param simulator_cmd: command launching a simulator, by default the one in the settings
+        :param backend: SimulatorBackend, by default the one selected in the settings
+        """
         assert (n_cores > 0)
+        self._backend = simulator_backend(settings) if backend is None else backend
         self._n_cores = n_cores
         self._settings = settings
         self._port_start = port_start
         self._simulator_cmd = settings.simulator_cmd if simulator_cmd is None else simulator_cmd
         self._supervisors = []
         self._connections = []
-        self._robot_queue = asyncio.Queue()
+        self._robot_queue = asyncio.PriorityQueue()
+        self._cost_model = EvaluationCostModel()
+        # order of arrival, between robots of the same priority
+        self._order = itertools.count()
+        # expected duration of each queued robot
+        self._expected = {}
+        # simulator: (start, expected duration) of the robot it evaluates
+        self._running = {}
+        self._report_scheduled = False
         self._free_simulator = [True for _ in range(n_cores)]
         self._workers = []
+        # time each queued robot entered the queue
+        self._enqueued = {}
 
     def _simulator_supervisor(self, simulator_name_postfix):
         return DynamicSimSupervisor(
@@ -36,7 +65,7 @@ class SimulatorQueue:
         )
 
     async def _connect_to_simulator(self, settings, address, port):
-        return await World.create(settings, world_address=(address, port))
+        return await self._backend.connect(settings, address, port)
 
     async def _start_debug(self):
         connection = await self._connect_to_simulator(self._settings, "127.0.0.1", self._port_start)
@@ -47,6 +76,11 @@ class SimulatorQueue:
         if self._settings.simulator_cmd == 'debug':
             await self._start_debug()
             return
+        if not self._backend.needs_simulator_process:
+            for i in range(self._n_cores):
+                self._connections.append(await self._connect_to_simulator(self._settings, "127.0.0.1", self._port_start+i))
+                self._workers.append(asyncio.ensure_future(self._simulator_queue_worker(i)))
+            return
         future_launches = []
         future_connections = []
         for i in range(self._n_cores):
@@ -78,22 +112,61 @@ class SimulatorQueue:
         :return:
         """
         future = asyncio.Future()
-        self._robot_queue.put_nowait((robot, future, conf))
+        self._enqueue(robot, future, conf)
         return future
 
+    def _enqueue(self, robot, future, conf):
+        expected = self._cost_model.expected(robot, conf.evaluation_time)
+        retry = robot.failed_eval_attempt_count > 0
+        self._enqueued[future] = time.perf_counter()
+        self._expected[future] = expected
+        self._robot_queue.put_nowait(((not retry, -expected, next(self._order)), robot, future, conf))
+        self._trace_queue()
+        if not self._report_scheduled:
+            # once all the robots enqueued together are in the queue
+            self._report_scheduled = True
+            asyncio.get_event_loop().call_soon(self._report_makespan)
+
+    def expected_makespan(self):
+        """
+        :return: expected seconds until the robots in the queue and in the simulators are evaluated
+        """
+        now = time.perf_counter()
+        remaining = [max(expected - (now - start), 0.0) for start, expected in self._running.values()]
+        return expected_makespan(self._expected.values(), remaining, self._n_cores)
+
+    def _report_makespan(self):
+        self._report_scheduled = False
+        makespan = self.expected_makespan()
+        logger.info(f'{len(self._expected)} robots in the {self.TRACE_NAME} queue, expected makespan {makespan:.1f}s '
+                    f'(durations fitted on {self._cost_model.samples} evaluations)')
+        tracer.gauge(f'{self.TRACE_NAME} expected makespan', makespan)
+        metrics.set('expected_makespan_seconds', makespan, queue=self.TRACE_NAME)
+
+    def _trace_queue(self):
+        tracer.gauge(f'{self.TRACE_NAME} queue', self._robot_queue.qsize())
+        metrics.set('queue_depth', self._robot_queue.qsize(), queue=self.TRACE_NAME)
+
+    def _set_free(self, i, free):
+        self._free_simulator[i] = free
+        tracer.gauge(f'busy {self.TRACE_NAME}s', self._free_simulator.count(False))
+        metrics.set_busy(self.TRACE_NAME, i, not free)
+
     async def _restart_simulator(self, i):
         # restart simulator
         address = '127.0.0.1'
         port = self._port_start+i
         logger.error("Restarting simulator")
+        metrics.inc('restarts_total', queue=self.TRACE_NAME)
         logger.error("Restarting simulator... disconnecting")
         try:
             await asyncio.wait_for(self._connections[i].disconnect(), 10)
         except asyncio.TimeoutError:
             pass
-        logger.error("Restarting simulator... restarting")
-        await self._supervisors[i].relaunch(10, address=address, port=port)
-        await asyncio.sleep(10)
+        if i < len(self._supervisors):
+            logger.error("Restarting simulator... restarting")
+            await self._supervisors[i].relaunch(10, address=address, port=port)
+            await asyncio.sleep(10)
         logger.debug("Restarting simulator done... connecting")
         self._connections[i] = await self._connect_to_simulator(self._settings, address, port)
         logger.debug("Restarting simulator done... connection done")
@@ -116,33 +189,43 @@ class SimulatorQueue:
         elapsed = time.time()-start
         logger.info(f"time taken to do a simulation {elapsed}")
 
-        robot.failed_eval_attempt_count = 0
+        if robot.failed_eval_attempt_count < 3:
+            self._cost_model.add(robot, conf.evaluation_time, elapsed)
+        # the attempts are reset by the worker, after saving the robots that failed every attempt
         future.set_result(result)
         return True
 
     async def _simulator_queue_worker(self, i):
         try:
-            self._free_simulator[i] = True
+            self._set_free(i, True)
             while True:
                 logger.info(f"simulator {i} waiting for robot")
-                (robot, future, conf) = await self._robot_queue.get()
-                self._free_simulator[i] = False
+                (_priority, robot, future, conf) = await self._robot_queue.get()
+                self._running[i] = (time.perf_counter(), self._expected.pop(future))
+                self._set_free(i, False)
+                tracer.add_span(f'{self.TRACE_NAME} wait', self._enqueued.pop(future), robot_id=robot.id)
+                self._trace_queue()
                 logger.info(f"Picking up robot {robot.phenotype.id} into simulator {i}")
                 success = await self._worker_evaluate_robot(self._connections[i], robot, future, conf)
                 if success:
                     if robot.failed_eval_attempt_count == 3:
                         logger.info("Robot failed to be evaluated 3 times. Saving robot to failed_eval file")
                         conf.experiment_management.export_failed_eval_robot(robot)
+                        metrics.inc('abandoned_robots_total', queue=self.TRACE_NAME)
                     robot.failed_eval_attempt_count = 0
+                    metrics.evaluation_finished(self.TRACE_NAME)
                     logger.info(f"simulator {i} finished robot {robot.phenotype.id}")
                 else:
                     # restart of the simulator happened
                     robot.failed_eval_attempt_count += 1
+                    metrics.inc('failed_evaluations_total', queue=self.TRACE_NAME)
                     logger.info(f"Robot {robot.phenotype.id} current failed attempt: {robot.failed_eval_attempt_count}")
-                    await self._robot_queue.put((robot, future, conf))
-                    await self._restart_simulator(i)
+                    self._enqueue(robot, future, conf)
+                    with tracer.span(f'{self.TRACE_NAME} restart'):
+                        await self._restart_simulator(i)
+                del self._running[i]
                 self._robot_queue.task_done()
-                self._free_simulator[i] = True
+                self._set_free(i, True)
         except Exception:
             logger.exception(f"Exception occurred for Simulator worker {i}")
 
@@ -154,22 +237,27 @@ class SimulatorQueue:
         else:
             # Change this `max_age` from the command line parameters (--evalution-time)
             max_age = conf.evaluation_time
-            robot_manager = await simulator_connection.insert_robot(robot.phenotype, Vector3(0, 0, self._settings.z_start), max_age)
+            with tracer.span('insert', robot.id):
+                robot_manager = await simulator_connection.insert_robot(robot.phenotype, Vector3(0, 0, self._settings.z_start), max_age)
             start = time.time()
+            simulate_start = time.perf_counter()
             # Start a run loop to do some stuff
             while not robot_manager.dead:  # robot_manager.age() < max_age:
-                await asyncio.sleep(1.0 / 2)  # 5= state_update_frequency
+                await asyncio.sleep(self._backend.poll_interval)
+            tracer.add_span('simulate', simulate_start, robot_id=robot.id)
             end = time.time()
             elapsed = end-start
             logger.info(f'Time taken: {elapsed}')
 
-            robot_fitness = conf.fitness_function(robot_manager, robot)
+            with tracer.span('fitness', robot.id):
+                robot_fitness = conf.fitness_function(robot_manager, robot)
 
             simulator_connection.unregister_robot(robot_manager)
             # await simulator_connection.delete_all_robots()
             # await simulator_connection.delete_robot(robot_manager)
             # await simulator_connection.pause(True)
-            await simulator_connection.reset(rall=True, time_only=True, model_only=False)
+            with tracer.span('reset', robot.id):
+                await simulator_connection.reset(rall=True, time_only=True, model_only=False)
             return robot_fitness, measures.BehaviouralMeasurements(robot_manager, robot)
 
     async def _joint(self):
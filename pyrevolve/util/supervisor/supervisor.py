@@ -4,7 +4,6 @@ from __future__ import print_function
 import atexit
 import subprocess
 import os
-import psutil
 import sys
 import time
 
@@ -26,6 +25,7 @@ def terminate_process(proc):
     TODO Check if terminate fails and kill instead?
     :return:
     """
+    import psutil
     process = psutil.Process(proc.pid)
     for child in process.children(recursive=True):
         child.terminate()
@@ -4,14 +4,13 @@ from __future__ import print_function
 import atexit
 import subprocess
 import os
-import psutil
 import sys
 import asyncio
 import platform
 
 from datetime import datetime
 
-from ...custom_logging.logger import create_logger
+from ...custom_logging.logger import create_child_logger, create_logger
 from ...custom_logging.logger import logger as revolve_logger
 
 from .stream import PrettyStreamReader
@@ -29,6 +28,7 @@ def terminate_process(proc):
     TODO Check if terminate fails and kill instead?
     :return:
     """
+    import psutil
     process = psutil.Process(proc.pid)
     for child in process.children(recursive=True):
         child.terminate()
@@ -49,6 +49,8 @@ class DynamicSimSupervisor(object):
     The experiment is considered finished if any of the processes exit with 0
     code. If any of processes exit with non zero code, the experiment dies.
     """
+    # lines of simulator output logged per second, the rest is dropped, the records of the supervisor are all logged
+    LOG_RATE_LIMIT = 50
 
     def __init__(self,
                  world_file,
@@ -111,6 +113,7 @@ class DynamicSimSupervisor(object):
         self.streams = {}
         self.procs = {}
         self._logger = create_logger(simulator_name)
+        self._output_logger = create_child_logger(self._logger, 'output', rate_limit=self.LOG_RATE_LIMIT)
         self._process_terminated_callback = process_terminated_callback
         self._process_terminated_futures = []
 
@@ -178,6 +181,7 @@ class DynamicSimSupervisor(object):
         """
         Terminates all running processes and sub-processes
         """
+        import psutil
         self._logger.info("Terminating processes...")
         for proc in list(self.procs.values()):
             try:
@@ -221,8 +225,8 @@ class DynamicSimSupervisor(object):
                 logger(line)
 
         self.streams[name] = (
-            asyncio.ensure_future(poll_output(stdout, self._logger.info)),
-            asyncio.ensure_future(poll_output(stderr, self._logger.error)),
+            asyncio.ensure_future(poll_output(stdout, self._output_logger.info)),
+            asyncio.ensure_future(poll_output(stderr, self._output_logger.error)),
         )
 
     async def _launch_simulator(self, ready_str="World plugin loaded", output_tag="simulator", address='localhost',
@@ -7,6 +7,9 @@ import importlib
 from pyrevolve.data_analisys.visualize_robot import test_robot_run
 from pyrevolve.data_analisys.check_robot_collision import test_collision_robot
 from pyrevolve import parser
+from pyrevolve.custom_logging.logger import configure_logging, parse_levels
+from pyrevolve.custom_logging.metrics import metrics
+from pyrevolve.custom_logging.profiler import SamplingProfiler
 from experiments.examples import only_gazebo
 
 here = os.path.dirname(os.path.abspath(__file__))
@@ -57,11 +60,31 @@ def main():
 
     try:
         arguments = parser.parse_args()
+        configure_logging(
+            levels=parse_levels(arguments.log_levels),
+            json_format=arguments.log_json,
+            rate_limits={'gazebo_*.output': arguments.simulator_log_rate,
+                         'analyzer_*.output': arguments.simulator_log_rate},
+        )
+        if arguments.metrics_port is not None:
+            metrics.serve(arguments.metrics_port)
+        if arguments.metrics_file is not None:
+            metrics.write_periodically(arguments.metrics_file, arguments.metrics_interval)
         loop = asyncio.get_event_loop()
         loop.set_exception_handler(handler)
-        run(loop, arguments)
+        if arguments.profile is not None:
+            profiler = SamplingProfiler(arguments.profile, arguments.profile_interval, arguments.slow_callback_duration)
+            profiler.start(loop)
+            try:
+                run(loop, arguments)
+            finally:
+                profiler.stop(loop)
+        else:
+            run(loop, arguments)
     except KeyboardInterrupt:
         print("Got CtrlC, shutting down.")
+    finally:
+        metrics.stop()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,89 @@
+import json
+import logging
+import os
+import tempfile
+import unittest
+
+from pyrevolve.custom_logging.logger import RateLimitFilter, configure_logging, create_child_logger, create_logger, \
+    flush_logs, parse_levels
+
+
+class TestLogger(unittest.TestCase):
+    """
+    Tests the loggers writing from the background thread
+    """
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.addCleanup(self.folder.cleanup)
+        self.addCleanup(configure_logging)
+
+    def read_log(self, handler):
+        flush_logs()
+        handler.flush()
+        with open(handler.baseFilename) as f:
+            return f.read().splitlines()
+
+    def test_levels(self):
+        handler = logging.FileHandler(os.path.join(self.folder.name, 'gazebo_test.log'))
+        self.addCleanup(handler.close)
+        configure_logging(levels=parse_levels('gazebo_*=warning'))
+        log = create_logger('gazebo_test', handlers=handler)
+        log.info('gazebo started')
+        log.error('gazebo crashed')
+        lines = self.read_log(handler)
+        self.assertEqual(len(lines), 1)
+        self.assertTrue(lines[0].endswith('gazebo crashed'))
+
+        configure_logging(levels={'gazebo_*': 'DEBUG'})
+        log.info('gazebo restarted')
+        self.assertTrue(self.read_log(handler)[-1].endswith('gazebo restarted'))
+
+    def test_child_logger(self):
+        handler = logging.FileHandler(os.path.join(self.folder.name, 'parent_test.log'))
+        self.addCleanup(handler.close)
+        create_logger('parent_test', handlers=handler)
+        logging.getLogger('parent_test.child').warning('from the child')
+        lines = self.read_log(handler)
+        self.assertEqual(len(lines), 1)
+        self.assertIn('parent_test.child', lines[0])
+        self.assertTrue(lines[0].endswith('from the child'))
+
+    def test_json(self):
+        handler = logging.FileHandler(os.path.join(self.folder.name, 'json_test.log'))
+        self.addCleanup(handler.close)
+        log = create_logger('json_test', handlers=handler)
+        configure_logging(json_format=True)
+        log.info('robot %s inserted', 'robot_1')
+        record = json.loads(self.read_log(handler)[-1])
+        self.assertEqual((record['logger'], record['level'], record['message']),
+                         ('json_test', 'INFO', 'robot robot_1 inserted'))
+
+    def test_rate_limit(self):
+        handler = logging.FileHandler(os.path.join(self.folder.name, 'analyzer_test.log'))
+        self.addCleanup(handler.close)
+        log = create_logger('analyzer_test', handlers=handler, rate_limit=0.001)
+        self.assertIsInstance(log.handlers[0].filters[0], RateLimitFilter)
+        log.handlers[0].filters[0].burst = log.handlers[0].filters[0]._tokens = 5
+        for i in range(100):
+            log.info(f'line {i}')
+        self.assertEqual(len(self.read_log(handler)), 5)
+
+        log.handlers[0].filters[0]._tokens = 1
+        log.info('line 100')
+        self.assertTrue(self.read_log(handler)[-1].endswith('line 100 [95 lines dropped by the rate limit]'))
+
+    def test_rate_limit_child(self):
+        handler = logging.FileHandler(os.path.join(self.folder.name, 'supervisor_test.log'))
+        self.addCleanup(handler.close)
+        log = create_logger('supervisor_test', handlers=handler)
+        output = create_child_logger(log, 'output', rate_limit=0.001)
+        output.filters[0].burst = output.filters[0]._tokens = 5
+        for i in range(100):
+            output.info(f'line {i}')
+            if i == 50:
+                log.error('process exited')
+        lines = self.read_log(handler)
+        # only the output of the process is limited
+        self.assertEqual(len(lines), 6)
+        self.assertTrue(lines[-1].endswith('process exited'))
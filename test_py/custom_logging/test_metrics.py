@@ -0,0 +1,104 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+import unittest
+import urllib.request
+
+from pyrevolve.custom_logging.metrics import Metrics, metrics
+from pyrevolve.util.supervisor.simulator_backend import MockBackend
+from pyrevolve.util.supervisor.simulator_queue import SimulatorQueue
+from test_py.util.test_simulator_backend import load_individual, mock_conf, mock_settings
+
+
+def samples(collected, name):
+    return {tuple(sorted(labels.items())): value for labels, value in collected.get(name, [])}
+
+
+class TestMetrics(unittest.TestCase):
+    """
+    Tests the live metrics of the experiment
+    """
+
+    def test_counters_and_gauges(self):
+        metrics = Metrics()
+        metrics.start_generation(2, 10)
+        metrics.inc('generation_robots_evaluated')
+        metrics.inc('restarts_total', queue='simulator')
+        metrics.inc('restarts_total', queue='simulator')
+        metrics.set('queue_depth', 4, queue='analyzer')
+        for _ in range(3):
+            metrics.evaluation_finished('simulator')
+
+        collected = metrics.collect()
+        self.assertEqual(samples(collected, 'generation'), {(): 2})
+        self.assertEqual(samples(collected, 'generation_robots_evaluated'), {(): 1})
+        self.assertEqual(samples(collected, 'restarts_total'), {(('queue', 'simulator'),): 2})
+        self.assertEqual(samples(collected, 'queue_depth'), {(('queue', 'analyzer'),): 4})
+        self.assertEqual(samples(collected, 'evaluations_total'), {(('queue', 'simulator'),): 3})
+        self.assertEqual(samples(collected, 'evaluations_per_minute'), {(('queue', 'simulator'),): 3})
+
+    def test_busy_ratio(self):
+        metrics = Metrics()
+        metrics.set_busy('simulator', 0, False)
+        metrics.set_busy('simulator', 1, True)
+        time.sleep(0.05)
+        collected = metrics.collect()
+        ratios = samples(collected, 'busy_ratio')
+        self.assertEqual(ratios[(('queue', 'simulator'), ('simulator', '0'))], 0)
+        self.assertGreater(ratios[(('queue', 'simulator'), ('simulator', '1'))], 0.9)
+        busy = samples(collected, 'busy_seconds_total')[(('queue', 'simulator'), ('simulator', '1'))]
+        self.assertGreaterEqual(busy, 0.05)
+
+    def test_prometheus_text(self):
+        metrics = Metrics()
+        metrics.set('generation', 1)
+        metrics.inc('failed_evaluations_total', queue='simulator')
+        lines = metrics.prometheus_text().splitlines()
+        self.assertIn('# TYPE revolve_failed_evaluations_total counter', lines)
+        self.assertIn('revolve_failed_evaluations_total{queue="simulator"} 1', lines)
+        self.assertIn('revolve_generation 1', lines)
+
+    def test_serve_and_write(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        path = os.path.join(folder.name, 'metrics.json')
+        metrics = Metrics()
+        self.addCleanup(metrics.stop)
+        metrics.inc('restarts_total', queue='simulator')
+        port = metrics.serve(0)
+        metrics.write_periodically(path, interval=60)
+
+        with urllib.request.urlopen(f'http://127.0.0.1:{port}/metrics') as response:
+            self.assertIn('revolve_restarts_total{queue="simulator"} 1', response.read().decode())
+        with urllib.request.urlopen(f'http://127.0.0.1:{port}/metrics.json') as response:
+            document = json.loads(response.read().decode())
+        self.assertEqual(document['metrics']['restarts_total'], [{'labels': {'queue': 'simulator'}, 'value': 1}])
+
+        metrics.inc('restarts_total', queue='simulator')
+        metrics.stop()
+        # the last state is written when stopping
+        with open(path) as f:
+            document = json.load(f)
+        self.assertEqual(document['metrics']['restarts_total'][0]['value'], 2)
+
+    def test_simulator_queue(self):
+        individual = load_individual(176)
+        settings = mock_settings()
+        conf = mock_conf()
+
+        async def run():
+            queue = SimulatorQueue(2, settings, backend=MockBackend())
+            queue.TRACE_NAME = 'test_simulator'
+            await queue.start()
+            return await queue.test_robot(individual, conf)
+
+        asyncio.run(run())
+        collected = metrics.collect()
+        self.assertEqual(samples(collected, 'evaluations_total')[(('queue', 'test_simulator'),)], 1)
+        self.assertEqual(samples(collected, 'queue_depth')[(('queue', 'test_simulator'),)], 0)
+        busy = {labels: value for labels, value in samples(collected, 'busy_seconds_total').items()
+                if ('queue', 'test_simulator') in labels}
+        self.assertEqual(len(busy), 2)
+        self.assertGreater(sum(busy.values()), 0)
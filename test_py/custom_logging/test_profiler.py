@@ -0,0 +1,43 @@
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+
+from pyrevolve.custom_logging.profiler import SamplingProfiler
+from pyrevolve.custom_logging.tracer import tracer
+
+
+async def busy_generation(gen_num):
+    tracer.start_generation(gen_num)
+    # holds the event loop
+    time.sleep(0.1)
+    await asyncio.sleep(0.05)
+
+
+class TestSamplingProfiler(unittest.TestCase):
+    """
+    Tests the profiles written for each generation
+    """
+
+    def test_generations(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        profiler = SamplingProfiler(folder.name, interval=0.005, slow_callback_duration=0.05)
+        profiler.start(loop)
+        try:
+            for gen_num in range(2):
+                loop.run_until_complete(busy_generation(gen_num))
+        finally:
+            profiler.stop(loop)
+        self.assertFalse(loop.get_debug())
+
+        for gen_num in range(2):
+            with open(os.path.join(folder.name, f'profile_{gen_num}.folded')) as f:
+                stacks = [line.rsplit(' ', 1) for line in f.read().splitlines()]
+            self.assertTrue(any('busy_generation' in stack and int(count) > 0 for stack, count in stacks))
+            with open(os.path.join(folder.name, f'slow_callbacks_{gen_num}.txt')) as f:
+                lines = f.read().splitlines()
+            self.assertIn('busy_generation', lines[1])
@@ -0,0 +1,97 @@
+import asyncio
+import csv
+import json
+import os
+import tempfile
+import unittest
+
+from pyrevolve.custom_logging.tracer import Tracer, tracer
+from pyrevolve.util.supervisor.simulator_backend import MockBackend
+from pyrevolve.util.supervisor.simulator_queue import SimulatorQueue
+from test_py.util.test_simulator_backend import load_individual, mock_conf, mock_settings
+
+
+def read_chrome_trace(path):
+    with open(path) as f:
+        # the trace is left open, without closing bracket
+        return json.loads(f.read().rstrip().rstrip(',') + ']')
+
+
+class TestTracer(unittest.TestCase):
+    """
+    Tests the tracing of the stages of the evolution
+    """
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.addCleanup(self.folder.cleanup)
+
+    def test_disabled(self):
+        tracer = Tracer()
+        with tracer.span('develop', 'robot_1'):
+            pass
+        tracer.gauge('simulator queue', 1)
+        self.assertFalse(tracer.enabled)
+
+    def test_chrome_trace(self):
+        path = os.path.join(self.folder.name, 'trace.json')
+        tracer = Tracer()
+        tracer.open(path)
+        tracer.start_generation(0)
+        with tracer.span('develop', 'robot_1'):
+            pass
+        with tracer.span('develop', 'robot_2'):
+            pass
+        tracer.gauge('simulator queue', 2)
+        tracer.start_generation(1)
+        with tracer.span('develop', 'robot_3'):
+            pass
+        tracer.close()
+
+        events = read_chrome_trace(path)
+        spans = [event for event in events if event['ph'] == 'X' and event['name'] == 'develop']
+        self.assertEqual([span['args']['generation'] for span in spans], [0, 0, 1])
+        # a row per robot, after the row of the experiment
+        self.assertEqual([span['tid'] for span in spans], [1, 2, 3])
+        self.assertIn('generation 1', [event['name'] for event in events])
+        self.assertIn({'value': 2}, [event['args'] for event in events if event['ph'] == 'C'])
+
+        with open(os.path.join(self.folder.name, 'trace_generations.csv')) as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual([(row['generation'], row['stage'], row['count']) for row in rows],
+                         [('0', 'develop', '2'), ('1', 'develop', '1')])
+
+    def test_csv_trace(self):
+        path = os.path.join(self.folder.name, 'trace.csv')
+        tracer = Tracer()
+        tracer.open(path)
+        tracer.start_generation(3)
+        with tracer.span('measure', 'robot_1'):
+            pass
+        tracer.gauge('export queue', 5)
+        aggregates = tracer.end_generation()
+        tracer.close()
+
+        self.assertEqual(aggregates['measure'][0], 1)
+        with open(path) as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual([(row['type'], row['name'], row['generation'], row['robot'], row['value']) for row in rows],
+                         [('span', 'measure', '3', 'robot_1', ''), ('gauge', 'export queue', '3', '', '5')])
+
+    def test_simulator_stages(self):
+        individual = load_individual(176)
+        settings = mock_settings()
+        conf = mock_conf()
+
+        async def run():
+            queue = SimulatorQueue(1, settings, backend=MockBackend())
+            await queue.start()
+            return await queue.test_robot(individual, conf)
+
+        path = os.path.join(self.folder.name, 'trace.json')
+        tracer.open(path)
+        self.addCleanup(tracer.close)
+        tracer.start_generation(0)
+        asyncio.run(run())
+        aggregates = tracer.end_generation()
+        self.assertEqual(list(aggregates), ['simulator wait', 'insert', 'simulate', 'fitness', 'reset'])
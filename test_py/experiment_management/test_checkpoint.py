@@ -0,0 +1,123 @@
+import asyncio
+import os
+import random
+import tempfile
+import unittest
+
+from pyrevolve.evolution import fitness
+from pyrevolve.evolution.individual import Individual
+from pyrevolve.evolution.pop_management.steady_state import steady_state_population_management
+from pyrevolve.evolution.population import Population, PopulationConfig
+from pyrevolve.evolution.selection import multiple_selection, tournament_selection
+from pyrevolve.experiment_management import ExperimentManagement
+from pyrevolve.genotype.plasticoding.crossover.crossover import CrossoverConfig
+from pyrevolve.genotype.plasticoding.crossover.standard_crossover import standard_crossover
+from pyrevolve.genotype.plasticoding.initialization import random_initialization
+from pyrevolve.genotype.plasticoding.mutation.mutation import MutationConfig
+from pyrevolve.genotype.plasticoding.mutation.standard_mutation import standard_mutation
+from pyrevolve.genotype.plasticoding.plasticoding import Plasticoding, PlasticodingConfig
+from pyrevolve.util.supervisor.simulator_backend import MockBackend
+from pyrevolve.util.supervisor.simulator_queue import SimulatorQueue
+from test_py.util.test_simulator_backend import mock_settings
+
+LOCAL_FOLDER = os.path.join(os.path.dirname(__file__), '..', 'plasticonding')
+
+
+class TestCheckpoint(unittest.TestCase):
+    """
+    Tests the recovery of an experiment from the checkpoints of the selected populations
+    """
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        settings = mock_settings(
+            manager=os.path.join(self.folder.name, 'manager.py'),
+            experiment_name='test',
+            run='1',
+            recovery_enabled=True,
+            export_phenotype=True,
+            phenotype_images='snapshots',
+        )
+        self.settings = settings
+        self.experiment_management = ExperimentManagement(settings)
+        self.experiment_management.create_exp_folders()
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_checkpoint(self):
+        conf = PlasticodingConfig()
+        individuals = []
+        for genotype_id in (176, 180):
+            genotype = Plasticoding(conf, genotype_id)
+            genotype.load_genotype(os.path.join(LOCAL_FOLDER, f'genotype_{genotype_id}.txt'))
+            individual = Individual(genotype)
+            individual.develop()
+            individual.phenotype.measure_phenotype()
+            individual.fitness = genotype_id / 100
+            individuals.append(individual)
+        # parents kept as individuals, as done before the ids
+        individuals[1].parents = [individuals[0]]
+
+        self.assertIsNone(self.experiment_management.read_checkpoint_manifest())
+        self.experiment_management.export_checkpoint(individuals, 3, 181)
+        self.assertEqual(self.experiment_management.read_checkpoint_manifest(),
+                         {'generation': 3, 'next_robot_id': 181})
+        self.assertIsNone(self.experiment_management.read_checkpoint(2))
+
+        recovered = self.experiment_management.read_checkpoint(3)
+        self.assertEqual([individual.id for individual in recovered], ['robot_176', 'robot_180'])
+        self.assertEqual(recovered[1].fitness, 1.8)
+        self.assertEqual(recovered[1].parents, ['robot_176'])
+        self.assertEqual(individuals[1].parents, [individuals[0]])
+        self.assertEqual(recovered[0].phenotype.to_yaml(), individuals[0].phenotype.to_yaml())
+        self.assertEqual(recovered[0].phenotype._morphological_measurements.measurements_to_dict(),
+                         individuals[0].phenotype._morphological_measurements.measurements_to_dict())
+
+        self.assertEqual(self.experiment_management.read_recovery_state(2, 1), (3, False, 181))
+        for _id in (181, 182):
+            with open(os.path.join(self.experiment_management.data_folder, 'fitness', f'fitness_robot_{_id}.txt'), 'w') as f:
+                f.write('None')
+        self.assertEqual(self.experiment_management.read_recovery_state(2, 1), (3, True, 183))
+
+    def test_checkpoint_size(self):
+        random.seed(0)
+        genotype_conf = PlasticodingConfig(max_structural_modules=20)
+        conf = PopulationConfig(
+            population_size=10,
+            genotype_constructor=random_initialization,
+            genotype_conf=genotype_conf,
+            fitness_function=fitness.displacement_velocity,
+            mutation_operator=standard_mutation,
+            mutation_conf=MutationConfig(mutation_prob=0.8, genotype_conf=genotype_conf),
+            crossover_operator=standard_crossover,
+            crossover_conf=CrossoverConfig(crossover_prob=0.8),
+            selection=lambda individuals: tournament_selection(individuals, 2),
+            parent_selection=lambda individuals: multiple_selection(individuals, 2, tournament_selection),
+            population_management=steady_state_population_management,
+            population_management_selector=tournament_selection,
+            evaluation_time=2,
+            offspring_size=5,
+            experiment_name='test',
+            experiment_management=self.experiment_management,
+        )
+        path = os.path.join(self.experiment_management.checkpoints_folder, 'generation_{}.pickle')
+
+        async def run():
+            simulator_queue = SimulatorQueue(1, self.settings, backend=MockBackend())
+            await simulator_queue.start()
+            population = Population(conf, simulator_queue)
+            await population.init_pop()
+            self.experiment_management.export_checkpoint(population.individuals, 0, population.next_robot_id)
+            for gen_num in range(1, 5):
+                population = await population.next_gen(gen_num)
+                self.experiment_management.export_checkpoint(population.individuals, gen_num,
+                                                             population.next_robot_id)
+
+        asyncio.run(run())
+        sizes = [os.path.getsize(path.format(gen_num)) for gen_num in range(5)]
+        # a checkpoint holds one generation, not its ancestry
+        self.assertLess(max(sizes), 2 * min(sizes))
+        for individual in self.experiment_management.read_checkpoint(4):
+            for parent in individual.parents or []:
+                self.assertIsInstance(parent, str)
@@ -0,0 +1,80 @@
+import json
+import os
+import tempfile
+import unittest
+
+from pyrevolve.data_analisys.consolidate_experiments import consolidate_experiments, consolidate_run
+from pyrevolve.experiment_datastore import ExperimentDatastore
+
+BEHAVIOR = 'velocity {}\ndisplacement_velocity 0.1\n'
+PHENOTYPE = 'branching 0.5\nlimbs {}\n'
+
+
+class TestConsolidate(unittest.TestCase):
+    """
+    Tests the consolidation of the experiment runs in tables
+    """
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.addCleanup(self.folder.cleanup)
+        self.run_path = os.path.join(self.folder.name, 'plane', '1')
+        self.data_folder = os.path.join(self.run_path, 'data_fullevolution')
+        for folder in ('fitness', 'descriptors'):
+            os.makedirs(os.path.join(self.data_folder, folder))
+
+    def _add_robot(self, number, fitness, measured=True):
+        with open(os.path.join(self.data_folder, 'fitness', f'fitness_robot_{number}.txt'), 'w') as f:
+            f.write(str(fitness))
+        with open(os.path.join(self.data_folder, 'descriptors', f'behavior_desc_robot_{number}.txt'), 'w') as f:
+            f.write(BEHAVIOR.format(number) if measured else 'None')
+        with open(os.path.join(self.data_folder, 'descriptors', f'phenotype_desc_robot_{number}.txt'), 'w') as f:
+            f.write(PHENOTYPE.format(number))
+
+    def _read(self, filename):
+        with open(os.path.join(self.run_path, filename)) as f:
+            return [line.rstrip('\n').split('\t') for line in f]
+
+    def test_files(self):
+        self._add_robot(1, None, measured=False)
+        self._add_robot(2, 0.5)
+        self._add_robot(10, 0.25)
+        os.makedirs(os.path.join(self.run_path, 'selectedpop_0'))
+        for name in ('body_robot_2.png', 'brain_robot_2.png', 'body_robot_10.png'):
+            open(os.path.join(self.run_path, 'selectedpop_0', name), 'w').close()
+
+        self.assertEqual(consolidate_run(self.run_path), 3)
+        self.assertEqual(self._read('all_measures.tsv'), [
+            ['robot_id', 'velocity', 'displacement_velocity', 'branching', 'limbs', 'fitness'],
+            ['1', 'None', 'None', '0.5', '1', 'None'],
+            ['2', '2', '0.1', '0.5', '2', '0.5'],
+            ['10', '10', '0.1', '0.5', '10', '0.25'],
+        ])
+        self.assertEqual(self._read('snapshots_ids.tsv'), [['generation', 'robot_id'], ['0', '2'], ['0', '10']])
+        with open(os.path.join(self.run_path, 'all_measures.schema.json')) as f:
+            schema = json.load(f)
+        self.assertEqual([column['name'] for column in schema['columns']][-1], 'fitness')
+
+        self._add_robot(11, 0.75)
+        self.assertEqual(consolidate_run(self.run_path), 1)
+        self.assertEqual(self._read('all_measures.tsv')[-1], ['11', '11', '0.1', '0.5', '11', '0.75'])
+        self.assertEqual(len(self._read('all_measures.tsv')), 5)
+
+        self.assertEqual(consolidate_run(self.run_path, incremental=False), 4)
+        self.assertEqual(len(self._read('all_measures.tsv')), 5)
+
+    def test_datastore(self):
+        datastore = ExperimentDatastore(os.path.join(self.data_folder, 'datastore.db'))
+        for number in (1, 2):
+            datastore.add_fitness(f'robot_{number}', number / 4)
+            datastore.add_behavior_desc(f'robot_{number}', BEHAVIOR.format(number))
+            datastore.add_phenotype_desc(f'robot_{number}', PHENOTYPE.format(number))
+        datastore.add_snapshot(0, [('robot_2', 0.5)])
+        datastore.close()
+
+        consolidate_experiments(self.folder.name, ['plane'], 1, workers=1)
+        self.assertEqual(self._read('all_measures.tsv')[1:], [
+            ['1', '1', '0.1', '0.5', '1', '0.25'],
+            ['2', '2', '0.1', '0.5', '2', '0.5'],
+        ])
+        self.assertEqual(self._read('snapshots_ids.tsv')[1:], [['0', '2']])
@@ -0,0 +1,155 @@
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from pyrevolve.evolution.individual import Individual
+from pyrevolve.experiment_datastore import ExperimentDatastore
+from pyrevolve.experiment_management import ExperimentManagement
+from pyrevolve.genotype.plasticoding.plasticoding import Plasticoding, PlasticodingConfig
+
+LOCAL_FOLDER = os.path.join(os.path.dirname(__file__), '..', 'plasticonding')
+
+
+class TestDatastore(unittest.TestCase):
+    """
+    Tests the single file datastore of the experiments
+    """
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.datastore = ExperimentDatastore(os.path.join(self.folder.name, 'datastore.db'), batch_size=3)
+
+    def tearDown(self):
+        self.datastore.close()
+        self.folder.cleanup()
+
+    def test_robots(self):
+        for i in range(1, 11):
+            self.datastore.add_genotype(f'robot_{i}', f'genotype {i}\n')
+            self.datastore.add_fitness(f'robot_{i}', None if i == 4 else i / 10)
+        self.datastore.add_behavior_desc('robot_2', 'velocity 0.5\n')
+        self.datastore.add_parents('robot_10', ['robot_2', 'robot_3'])
+
+        self.assertEqual(self.datastore.genotype('robot_7'), 'genotype 7\n')
+        self.assertAlmostEqual(self.datastore.fitness('robot_7'), 0.7)
+        self.assertIsNone(self.datastore.fitness('robot_4'))
+        self.assertEqual(self.datastore.behavior_desc('robot_2'), 'velocity 0.5\n')
+        self.assertEqual(sorted(self.datastore.parents('robot_10')), ['robot_2', 'robot_3'])
+        self.assertEqual(self.datastore.children('robot_3'), ['robot_10'])
+        self.assertEqual(self.datastore.count_evaluated(), 10)
+        self.assertEqual(self.datastore.last_evaluated_number(), 10)
+        with self.assertRaises(KeyError):
+            self.datastore.fitness('robot_11')
+        with self.assertRaises(KeyError):
+            self.datastore.phenotype('robot_1')
+
+    def test_snapshots(self):
+        self.datastore.add_snapshot(0, [('robot_1', 0.1), ('robot_2', 0.2)])
+        self.datastore.add_snapshot(1, [('robot_3', 0.3)])
+        self.datastore.add_snapshot(0, [('robot_2', 0.2), ('robot_1', 0.1)])
+        self.assertEqual(self.datastore.snapshot_generations(), [0, 1])
+        self.assertEqual(self.datastore.snapshot(0), [('robot_2', 0.2), ('robot_1', 0.1)])
+
+    def test_export_folders(self):
+        self.datastore.add_genotype('robot_1', 'genotype\n')
+        self.datastore.add_phenotype('robot_1', 'id: robot_1\n')
+        self.datastore.add_fitness('robot_1', 0.5)
+        self.datastore.add_phenotype_desc('robot_1', 'branching 1\n')
+        data_folder = os.path.join(self.folder.name, 'data_fullevolution')
+        self.datastore.export_folders(data_folder)
+
+        with open(os.path.join(data_folder, 'genotypes', 'genotype_robot_1.txt')) as f:
+            self.assertEqual(f.read(), 'genotype\n')
+        with open(os.path.join(data_folder, 'fitness', 'fitness_robot_1.txt')) as f:
+            self.assertEqual(f.read(), '0.5')
+        with open(os.path.join(data_folder, 'descriptors', 'phenotype_desc_robot_1.txt')) as f:
+            self.assertEqual(f.read(), 'branching 1\n')
+        self.assertFalse(os.path.exists(os.path.join(data_folder, 'descriptors', 'behavior_desc_robot_1.txt')))
+
+    def test_failed_write(self):
+        self.datastore.add_genotype('robot_1', 'genotype 1\n')
+        self.datastore._write(('INSERT INTO missing_table VALUES (?)', (1,)))
+        self.datastore.add_genotype('robot_2', 'genotype 2\n')
+        with self.assertRaises(RuntimeError):
+            self.datastore.flush()
+        # the valid writes of the batch are kept
+        self.assertEqual(self.datastore.genotype('robot_1'), 'genotype 1\n')
+        self.assertEqual(self.datastore.genotype('robot_2'), 'genotype 2\n')
+
+        self.datastore._write(('INSERT INTO missing_table VALUES (?)', (1,)))
+        with self.assertRaises(RuntimeError):
+            self.datastore.close()
+        with self.assertRaises(RuntimeError):
+            self.datastore.genotype('robot_1')
+
+    def test_export_pages(self):
+        self.datastore.PAGE_SIZE = 2
+        for i in range(1, 6):
+            self.datastore.add_genotype(f'robot_{i}', f'genotype {i}\n')
+        data_folder = os.path.join(self.folder.name, 'data_fullevolution')
+        self.datastore.export_folders(data_folder)
+        self.assertEqual(sorted(os.listdir(os.path.join(data_folder, 'genotypes'))),
+                         [f'genotype_robot_{i}.txt' for i in range(1, 6)])
+
+    def test_persistence(self):
+        self.datastore.add_fitness('robot_1', 0.5)
+        self.datastore.close()
+        self.datastore = ExperimentDatastore(self.datastore.path)
+        self.assertEqual(self.datastore.fitness('robot_1'), 0.5)
+
+
+class TestExperimentManagementDatastore(unittest.TestCase):
+    """
+    Tests the export and recovery of the experiment data through the datastore
+    """
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        settings = SimpleNamespace(
+            manager=os.path.join(self.folder.name, 'manager.py'),
+            experiment_name='test',
+            run='1',
+            recovery_enabled=True,
+            export_phenotype=True,
+            datastore='sqlite',
+        )
+        self.experiment_management = ExperimentManagement(settings)
+        self.experiment_management.create_exp_folders()
+
+    def tearDown(self):
+        self.experiment_management.datastore.close()
+        self.folder.cleanup()
+
+    def test_recovery(self):
+        conf = PlasticodingConfig()
+        self.assertTrue(self.experiment_management.experiment_is_new())
+
+        individuals = []
+        for i, genotype_id in enumerate((176, 180)):
+            genotype = Plasticoding(conf, genotype_id)
+            genotype.load_genotype(os.path.join(LOCAL_FOLDER, f'genotype_{genotype_id}.txt'))
+            individual = Individual(genotype)
+            individual.develop()
+            individual.fitness = i + 0.5
+            self.experiment_management.export_genotype(individual)
+            self.experiment_management.export_phenotype(individual)
+            self.experiment_management.export_fitness(individual)
+            self.experiment_management.export_behavior_measures(individual.id, {'velocity': i})
+            individuals.append(individual)
+        # the parents are kept as ids
+        individuals[1].parents = ['robot_176']
+        self.experiment_management.export_parents(individuals[1])
+        self.experiment_management.datastore.add_snapshot(0, [(ind.id, ind.fitness) for ind in individuals])
+
+        self.assertFalse(self.experiment_management.experiment_is_new())
+        self.assertEqual(self.experiment_management.read_recovery_state(2, 1), (0, True, 181))
+        self.assertEqual(self.experiment_management.snapshot_robot_ids(0), ['robot_176', 'robot_180'])
+        self.assertEqual(self.experiment_management.read_fitness('robot_180'), 1.5)
+        self.assertEqual(self.experiment_management.read_behavior_measures('robot_176'), ['velocity 0\n'])
+        self.assertEqual(self.experiment_management.datastore.parents('robot_180'), ['robot_176'])
+
+        genotype = Plasticoding(conf, 176)
+        self.experiment_management.load_genotype(genotype, 'robot_176')
+        self.assertEqual(genotype.to_txt(), individuals[0].genotype.to_txt())
+        self.assertEqual(genotype.develop().to_yaml(), individuals[0].phenotype.to_yaml())
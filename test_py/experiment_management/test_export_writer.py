@@ -0,0 +1,64 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from pyrevolve.export_writer import ExportWriter
+
+
+class TestExportWriter(unittest.TestCase):
+    """
+    Tests the background writer of the exported files
+    """
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.writer = ExportWriter(max_queued=2, batch_size=2)
+        self.addCleanup(self.folder.cleanup)
+        self.addCleanup(self.writer.close)
+
+    def test_order(self):
+        path = os.path.join(self.folder.name, 'fitness_robot_1.txt')
+        for i in range(20):
+            self.writer.write(path, str(i))
+        self.writer.flush(sync=True)
+        with open(path) as f:
+            self.assertEqual(f.read(), '19')
+
+    def test_backpressure(self):
+        started = threading.Event()
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def block():
+            started.set()
+            release.wait()
+
+        self.writer.submit(block)
+        started.wait()
+        self.writer.submit(lambda: None)
+        self.writer.submit(lambda: None)
+        self.assertEqual(self.writer.backpressure_count, 0)
+        self.assertEqual(self.writer.pending, 2)
+
+        threading.Timer(0.1, release.set).start()
+        self.writer.submit(lambda: None)
+        self.assertEqual(self.writer.backpressure_count, 1)
+        self.assertGreater(self.writer.backpressure_time, 0)
+        self.writer.flush()
+        self.assertEqual(self.writer.pending, 0)
+
+    def test_errors(self):
+        self.writer.write(os.path.join(self.folder.name, 'missing', 'genotype_robot_1.txt'), '')
+        with self.assertRaises(RuntimeError):
+            self.writer.flush()
+        # errors are reported once
+        self.writer.flush()
+
+    def test_close(self):
+        path = os.path.join(self.folder.name, 'genotype_robot_1.txt')
+        self.writer.write(path, 'genotype')
+        self.writer.close()
+        self.assertTrue(os.path.exists(path))
+        with self.assertRaises(RuntimeError):
+            self.writer.write(path, 'genotype')
@@ -0,0 +1,109 @@
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from pyrevolve.evolution.individual import Individual
+from pyrevolve.experiment_management import ExperimentManagement
+from pyrevolve.genotype.plasticoding.plasticoding import Plasticoding, PlasticodingConfig
+
+LOCAL_FOLDER = os.path.join(os.path.dirname(__file__), '..', 'plasticonding')
+
+
+def fake_render(phenotype, body_path, brain_path):
+    for path in (body_path, brain_path):
+        with open(path, 'w') as f:
+            f.write(phenotype.id)
+    return []
+
+
+def failing_render(phenotype, body_path, brain_path):
+    # the renderer logs its failures and writes no image
+    return [body_path, brain_path]
+
+
+class TestPhenotypeImages(unittest.TestCase):
+    """
+    Tests that the phenotype images are rendered once and reused by the snapshots
+    """
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.addCleanup(self.folder.cleanup)
+        settings = SimpleNamespace(
+            manager=os.path.join(self.folder.name, 'manager.py'),
+            experiment_name='test',
+            run='1',
+            recovery_enabled=True,
+            export_phenotype=True,
+        )
+        self.experiment_management = ExperimentManagement(settings)
+        self.experiment_management.create_exp_folders()
+        self.addCleanup(self.experiment_management.writer.close)
+
+        conf = PlasticodingConfig()
+        self.individuals = []
+        for genotype_id in (176, 180):
+            genotype = Plasticoding(conf, genotype_id)
+            genotype.load_genotype(os.path.join(LOCAL_FOLDER, f'genotype_{genotype_id}.txt'))
+            individual = Individual(genotype)
+            individual.develop()
+            self.individuals.append(individual)
+
+    @mock.patch('pyrevolve.experiment_management.render_phenotype', side_effect=fake_render)
+    def test_render_once(self, render):
+        for individual in self.individuals:
+            self.experiment_management.export_new_individual_images(individual)
+        self.experiment_management.flush()
+        self.assertEqual(render.call_count, 0)
+
+        for gen_num in range(3):
+            self.experiment_management.export_snapshots(self.individuals, gen_num)
+        self.assertEqual(render.call_count, 2)
+
+        body_path, _brain_path = self.experiment_management.phenotype_image_paths('robot_176')
+        snapshot_path = os.path.join(self.experiment_management.experiment_folder, 'selectedpop_2', 'body_robot_176.png')
+        self.assertTrue(os.path.samefile(body_path, snapshot_path))
+        self.assertEqual(sorted(os.listdir(os.path.dirname(snapshot_path))), [
+            'body_robot_176.png', 'body_robot_180.png', 'brain_robot_176.png', 'brain_robot_180.png', 'snapshot.json'])
+
+    @mock.patch('pyrevolve.experiment_management.render_phenotype', side_effect=fake_render)
+    def test_snapshot_manifest(self, render):
+        self.individuals[0].fitness = 0.5
+        self.experiment_management.export_snapshots(self.individuals, 0)
+        self.experiment_management.export_snapshots(self.individuals[:1], 1)
+        self.assertEqual(self.experiment_management.read_snapshot_manifest(1),
+                         {'generation': 1, 'robots': [{'id': 'robot_176', 'fitness': 0.5}]})
+        self.assertEqual(self.experiment_management.snapshot_robot_ids(0), ['robot_176', 'robot_180'])
+
+        # exported again with other members
+        self.experiment_management.export_snapshots(self.individuals[1:], 0)
+        self.assertEqual(self.experiment_management.snapshot_robot_ids(0), ['robot_180'])
+        self.assertEqual(sorted(os.listdir(os.path.join(self.experiment_management.experiment_folder, 'selectedpop_0'))),
+                         ['body_robot_180.png', 'brain_robot_180.png', 'snapshot.json'])
+
+        # a snapshot without manifest is complete only if it has the images of the whole population
+        os.remove(os.path.join(self.experiment_management.experiment_folder, 'selectedpop_1', 'snapshot.json'))
+        with open(os.path.join(self.experiment_management.data_folder, 'fitness', 'fitness_robot_180.txt'), 'w') as f:
+            f.write('None')
+        self.assertEqual(self.experiment_management.read_recovery_state(2, 1)[0], 0)
+
+    @mock.patch('pyrevolve.experiment_management.render_phenotype', side_effect=fake_render)
+    def test_render_on_request(self, render):
+        body_path, brain_path = self.experiment_management.render_phenotype_images(self.individuals[0], wait=True)
+        self.assertTrue(os.path.exists(body_path))
+        self.assertTrue(os.path.exists(brain_path))
+        self.experiment_management.render_phenotype_images(self.individuals[0], wait=True)
+        self.assertEqual(render.call_count, 1)
+
+    @mock.patch('pyrevolve.experiment_management.render_phenotype', side_effect=failing_render)
+    def test_failed_render(self, render):
+        self.experiment_management.export_snapshots(self.individuals, 0)
+        self.assertEqual(self.experiment_management.snapshot_robot_ids(0), ['robot_176', 'robot_180'])
+
+    @mock.patch('pyrevolve.experiment_management.render_phenotype', return_value=[])
+    def test_missing_image(self, render):
+        # an image missing without a logged failure is an export error
+        with self.assertRaises(RuntimeError):
+            self.experiment_management.export_snapshots(self.individuals, 0)
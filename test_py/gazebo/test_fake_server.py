@@ -0,0 +1,72 @@
+import asyncio
+import unittest
+
+from pyrevolve import parser
+from pyrevolve.SDF.math import Vector3
+from pyrevolve.gazebo.analyze import BodyAnalyzer
+from pyrevolve.gazebo.fake_server import FakeGazeboServer
+from pyrevolve.tol.manage import World, measures
+from test_py.util.test_simulator_backend import load_individual
+
+
+class TestFakeServer(unittest.TestCase):
+    """
+    Tests the Gazebo connections of pyrevolve against the fake gzserver
+    """
+
+    def setUp(self):
+        self.settings = parser.parse_args([])
+        self.individual = load_individual(176)
+
+    def run_with_server(self, test, **kwargs):
+        async def run():
+            server = FakeGazeboServer(port=0, real_time_factor=0, **kwargs)
+            await server.start()
+            try:
+                await asyncio.wait_for(test(server), 30)
+            finally:
+                await server.stop()
+        asyncio.run(run())
+
+    def test_evaluate_robot(self):
+        async def test(server):
+            world = await World.create(self.settings, world_address=('127.0.0.1', server.port))
+            robot_manager = await world.insert_robot(self.individual.phenotype, Vector3(0, 0, 0.03), 2)
+            while not robot_manager.dead:
+                await asyncio.sleep(0.01)
+            self.assertGreater(measures.displacement_velocity(robot_manager), 0)
+            self.assertGreater(len(robot_manager._contacts), 0)
+            world.unregister_robot(robot_manager)
+            await world.reset(rall=True, time_only=True, model_only=False)
+            await world.disconnect()
+        self.run_with_server(test)
+
+    def test_analyze_robot(self):
+        async def test(server):
+            analyzer = await BodyAnalyzer.create('127.0.0.1', server.port)
+            collisions, bounding_box = await analyzer.analyze_robot(self.individual.phenotype)
+            self.assertEqual(collisions, 0)
+            self.assertLess(bounding_box.min.x, bounding_box.max.x)
+            await analyzer.disconnect()
+        self.run_with_server(test)
+
+    def test_pipelined_requests(self):
+        async def test(server):
+            world = await World.create(self.settings, world_address=('127.0.0.1', server.port))
+            responses = await asyncio.gather(*(world.set_state_update_frequency(100) for _ in range(500)))
+            self.assertEqual({response.response for response in responses}, {'success'})
+            self.assertEqual(server.state_update_frequency, 100)
+            await world.disconnect()
+        self.run_with_server(test, response_delay=0.01)
+
+    def test_reconnect(self):
+        async def test(server):
+            world = await World.create(self.settings, world_address=('127.0.0.1', server.port))
+            await server.drop_connections()
+            world = await World.create(self.settings, world_address=('127.0.0.1', server.port))
+            robot_manager = await world.insert_robot(self.individual.phenotype, Vector3(0, 0, 0.03), 1)
+            while not robot_manager.dead:
+                await asyncio.sleep(0.01)
+            self.assertEqual(server.stats['connections'], 2)
+            await world.disconnect()
+        self.run_with_server(test)
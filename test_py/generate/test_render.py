@@ -0,0 +1,73 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from pyrevolve.revolve_bot import RevolveBot
+from pyrevolve.revolve_bot.render.canvas import Canvas
+from pyrevolve.revolve_bot.render.render import Render
+from pyrevolve.revolve_bot.revolve_module import BrickModule, CoreModule, Orientation
+
+LOCAL_FOLDER = os.path.dirname(__file__)
+
+
+class TestRender(unittest.TestCase):
+    """
+    Tests the 2d rendering of bodies
+    """
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.addCleanup(self.folder.cleanup)
+
+    def _robots(self):
+        robots = []
+        for filename in ('spider.yaml', 'gecko.yaml', 'snake.yaml'):
+            robot = RevolveBot()
+            robot.load_file(os.path.join(LOCAL_FOLDER, '..', '..', 'experiments', 'examples', 'yaml', filename))
+            robots.append(robot)
+        return robots
+
+    def test_canvas_state(self):
+        a = Canvas(2, 2, 10)
+        b = Canvas(2, 2, 10)
+        a.draw_controller('robot_1')
+        a.move_up()
+        self.assertEqual(len(a.movement_stack), 1)
+        self.assertEqual(b.movement_stack, [])
+        self.assertEqual(b.get_position(), [0, 0])
+        self.assertEqual(b.previous_move, -1)
+
+    def test_deep_body(self):
+        body = CoreModule()
+        body.id = 'core'
+        module = body
+        for i in range(5000):
+            child = BrickModule()
+            child.id = f'brick{i}'
+            child.orientation = 0
+            module.children[Orientation.NORTH.value] = child
+            module = child
+        robot = RevolveBot()
+        robot._body = body
+
+        image_path = os.path.join(self.folder.name, 'deep.png')
+        robot.render_body(image_path)
+        self.assertTrue(os.path.exists(image_path))
+
+    def test_threads(self):
+        robots = self._robots()
+        threads = [threading.Thread(target=robot.render_body,
+                                    args=(os.path.join(self.folder.name, f'{i}.png'),))
+                   for i, robot in enumerate(robots * 4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(os.listdir(self.folder.name)), len(threads))
+
+    def test_contact_sheet(self):
+        robots = self._robots()
+        image_path = os.path.join(self.folder.name, 'generation.png')
+        Render().render_contact_sheet([robot._body for robot in robots], image_path, columns=2)
+        self.assertTrue(os.path.exists(image_path))
@@ -1,6 +1,7 @@
 import unittest
 
 from pyrevolve.revolve_bot import RevolveBot
+from pyrevolve.revolve_bot.brain import BrainNN
 
 
 class TestRevolveBot(unittest.TestCase):
@@ -45,3 +46,48 @@ class TestRevolveBot(unittest.TestCase):
         self._proto_test('experiments/examples/yaml/spider.yaml')
         self._proto_test('experiments/examples/yaml/gecko.yaml')
         self._proto_test('experiments/examples/yaml/snake.yaml')
+
+    def test_structural_hash(self):
+        """
+        The structural hash does not depend on ids and on the rotation of the body
+        """
+        spider = RevolveBot()
+        spider.load_file('experiments/examples/yaml/spider.yaml')
+        gecko = RevolveBot()
+        gecko.load_file('experiments/examples/yaml/gecko.yaml')
+        body_hash = spider.structural_hash(include_brain=False)
+        self.assertNotEqual(body_hash, gecko.structural_hash(include_brain=False))
+        self.assertNotEqual(spider.structural_hash(), gecko.structural_hash())
+
+        for module in spider._iter_all_elements():
+            module.id = 'renamed_' + module.id
+        self.assertEqual(body_hash, spider.structural_hash(include_brain=False))
+
+        south, north, east, west = spider.body.children
+        spider.body.children = [west, east, south, north]
+        self.assertEqual(body_hash, spider.structural_hash(include_brain=False))
+
+    def test_brain_canonical_hash(self):
+        """
+        The canonical hash of a network does not depend on the ids of its nodes
+        """
+        def network(names, weight):
+            return BrainNN.from_yaml({
+                'neurons': {
+                    names[0]: {'id': names[0], 'layer': 'input', 'part_id': 'part0', 'type': 'Input'},
+                    names[1]: {'id': names[1], 'layer': 'output', 'part_id': 'part1', 'type': 'Oscillator'},
+                    names[2]: {'id': names[2], 'layer': 'output', 'part_id': 'part2', 'type': 'Oscillator'},
+                },
+                'connections': [
+                    {'src': names[0], 'dst': names[1], 'weight': weight},
+                    {'src': names[1], 'dst': names[2], 'weight': 0.5},
+                ],
+                'params': {
+                    names[1]: {'period': 1.0, 'phase_offset': 0.2, 'amplitude': 0.5},
+                    names[2]: {'period': 1.0, 'phase_offset': 0.2, 'amplitude': 0.5},
+                },
+            })
+
+        brain_hash = network(['node0', 'node1', 'node2'], 0.1).canonical_hash()
+        self.assertEqual(brain_hash, network(['n2', 'n0', 'n1'], 0.1).canonical_hash())
+        self.assertNotEqual(brain_hash, network(['node0', 'node1', 'node2'], 0.2).canonical_hash())
@@ -1,8 +1,15 @@
 import unittest
 import os
+import random
 
 import pyrevolve.revolve_bot
+import pyrevolve.SDF
 import pyrevolve.genotype.plasticoding.plasticoding
+from pyrevolve.genotype.plasticoding.mutation.mutation import MutationConfig
+from pyrevolve.genotype.plasticoding.mutation.standard_mutation import standard_mutation
+from pyrevolve.genotype.plasticoding.crossover.crossover import CrossoverConfig
+from pyrevolve.genotype.plasticoding.crossover.standard_crossover import standard_crossover
+from pyrevolve.evolution.individual import Individual
 
 LOCAL_FOLDER = os.path.dirname(__file__)
 
@@ -19,6 +26,46 @@ class TestPlastiCoding(unittest.TestCase):
         robot = self.genotype.develop()
         robot.update_substrate(raise_for_intersections=True)
 
+    def test_substrate_from_development(self):
+        robot = self.genotype.develop()
+        substrate = robot.substrate
+        robot.update_substrate(raise_for_intersections=True)
+        self.assertDictEqual(substrate.cells, robot.substrate.cells)
+        self.assertDictEqual(substrate.sensors, robot.substrate.sensors)
+        self.assertEqual(substrate.bounds(include_sensors=True), robot.substrate.bounds(include_sensors=True))
+
+    def test_sdf(self):
+        pose = pyrevolve.SDF.math.Vector3(0, 0, 0.25)
+        for seed in range(20):
+            random.seed(seed)
+            robot = pyrevolve.genotype.plasticoding.plasticoding.initialization.random_initialization(self.conf, seed).develop()
+            robot.update_substrate()
+            reference = pyrevolve.SDF.revolve_bot_to_sdf(robot, pose, None)
+            self.assertTrue(pyrevolve.SDF.sdf_equivalent(reference, robot.to_sdf(pose)))
+
+    def test_sdf_cache(self):
+        robot = self.genotype.develop()
+        for pose in (pyrevolve.SDF.math.Vector3(0, 0, 0.25), pyrevolve.SDF.math.Vector3(1, -1, 0)):
+            self.assertEqual(pyrevolve.SDF.revolve_bot_to_sdf_fast(robot, pose, None), robot.to_sdf(pose))
+            self.assertEqual(pyrevolve.SDF.revolve_bot_to_sdf_fast(robot, pose, '\t'), robot.to_sdf(pose, True))
+
+        genotype = pyrevolve.genotype.plasticoding.plasticoding.Plasticoding(self.conf, 176)
+        genotype.load_genotype(os.path.join(LOCAL_FOLDER, 'genotype_176.txt'))
+        robot = genotype.develop()
+        pose = pyrevolve.SDF.math.Vector3(0, 0, 0.25)
+        robot.to_sdf(pose)
+        template = robot._sdf_template
+        robot.to_sdf(pose)
+        self.assertIs(robot._sdf_template, template)
+
+        # generated again when the body or the brain is modified or replaced
+        robot.body.rgb = (0.0, 0.0, 0.0)
+        next(iter(robot.brain.params.values())).period += 1
+        self.assertEqual(robot.to_sdf(pose), pyrevolve.SDF.revolve_bot_to_sdf_fast(robot, pose, None))
+        robot.brain = pyrevolve.revolve_bot.brain.BrainNN()
+        self.assertIsNone(robot._sdf_template)
+        self.assertEqual(robot.to_sdf(pose), pyrevolve.SDF.revolve_bot_to_sdf_fast(robot, pose, None))
+
     def test_measure_body(self):
         robot = self.genotype.develop()
         robot.measure_body()
@@ -52,6 +99,53 @@ class TestPlastiCoding(unittest.TestCase):
         robot = genotype_180.develop()
         robot.update_substrate(raise_for_intersections=True)
 
+    def test_collision_exception(self):
+        substrate = pyrevolve.revolve_bot.occupancy_grid.OccupancyGrid()
+        substrate.add((0, 0), '1')
+        substrate.add((0, 0), '2')
+        exception = pyrevolve.revolve_bot.RevolveBot.ItersectionCollisionException(substrate)
+        self.assertIs(exception.substrate, substrate)
+        self.assertIs(exception.substrate_coordinates_map, substrate)
+        self.assertIn('(0, 0)', str(exception))
+
+
+    def test_incremental_development(self):
+        genotype_176 = pyrevolve.genotype.plasticoding.plasticoding.Plasticoding(self.conf, 176)
+        genotype_176.load_genotype(os.path.join(LOCAL_FOLDER, 'genotype_176.txt'))
+        genotype_176.develop()
+
+        mutation_conf = MutationConfig(mutation_prob=1, genotype_conf=self.conf)
+        for seed in range(20):
+            random.seed(seed)
+            child = standard_mutation(genotype_176, mutation_conf)
+            robot = child.develop()
+
+            genotype = pyrevolve.genotype.plasticoding.plasticoding.Plasticoding(self.conf, child.id)
+            genotype.grammar = child.grammar
+            self.assertEqual(genotype.develop().to_yaml(), robot.to_yaml())
+
+    def test_incremental_development_after_crossover(self):
+        parents = []
+        for genotype_id in (176, 180):
+            genotype = pyrevolve.genotype.plasticoding.plasticoding.Plasticoding(self.conf, genotype_id)
+            genotype.load_genotype(os.path.join(LOCAL_FOLDER, f'genotype_{genotype_id}.txt'))
+            genotype.develop()
+            parents.append(Individual(genotype))
+
+        mutation_conf = MutationConfig(mutation_prob=1, genotype_conf=self.conf)
+        crossover_conf = CrossoverConfig(crossover_prob=1)
+        for seed in range(20):
+            random.seed(seed)
+            child = standard_mutation(standard_crossover(parents, self.conf, crossover_conf), mutation_conf)
+            # developed from the phenotype of the first parent
+            self.assertIs(child.parent_phenotype, parents[0].genotype.phenotype)
+            self.assertIsNotNone(child.mutated_rules)
+            robot = child.develop()
+
+            genotype = pyrevolve.genotype.plasticoding.plasticoding.Plasticoding(self.conf, child.id)
+            genotype.grammar = child.grammar
+            self.assertEqual(genotype.develop().to_yaml(), robot.to_yaml())
+
 
 class Test176(unittest.TestCase):
     def setUp(self):
@@ -0,0 +1,353 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from types import SimpleNamespace
+
+from pyrevolve.evolution import fitness
+from pyrevolve.util.supervisor.distributed import DistributedSimulatorQueue, DistributedWorker, function_path, \
+    is_loopback, read_message, send_message
+from pyrevolve.util.supervisor.simulator_backend import MockBackend
+from pyrevolve.util.supervisor.simulator_queue import SimulatorQueue
+from test_py.util.test_simulator_backend import FailingBackend, load_individual, mock_conf, mock_settings
+
+ROOT_FOLDER = os.path.join(os.path.dirname(__file__), '..', '..')
+
+
+class TestDistributedEvaluation(unittest.TestCase):
+    """
+    Tests the evaluation of robots by worker agents connected to a coordinator
+    """
+
+    def setUp(self):
+        self.settings = mock_settings(n_cores=2, port_start=11345)
+        self.conf = mock_conf()
+        self.individuals = [load_individual(genotype_id) for genotype_id in (176, 180)]
+
+    def worker(self, coordinator, name, real_time_factor=None):
+        queue = SimulatorQueue(self.settings.n_cores, self.settings,
+                               backend=MockBackend(real_time_factor=real_time_factor))
+        return DistributedWorker(self.settings, f'127.0.0.1:{coordinator.port}', name=name, queue=queue)
+
+    def local_results(self):
+        async def run():
+            queue = SimulatorQueue(2, self.settings, backend=MockBackend())
+            await queue.start()
+            return await asyncio.gather(*(queue.test_robot(individual, self.conf) for individual in self.individuals))
+        return asyncio.run(run())
+
+    def test_same_results_as_local(self):
+        async def run():
+            coordinator = DistributedSimulatorQueue(self.settings, port=0, address='127.0.0.1')
+            await coordinator.start()
+            workers = [self.worker(coordinator, f'worker_{i}') for i in range(2)]
+            tasks = [asyncio.ensure_future(worker.run()) for worker in workers]
+            results = await asyncio.gather(*(coordinator.test_robot(individual, self.conf)
+                                             for individual in self.individuals * 2))
+            for worker in workers:
+                worker.stop()
+            await asyncio.gather(*tasks)
+            await coordinator.stop()
+            return results
+
+        results = asyncio.run(run())
+        expected = self.local_results() * 2
+        self.assertEqual([fitness_value for fitness_value, _ in results],
+                         [fitness_value for fitness_value, _ in expected])
+        for (_, measurements), (_, expected_measurements) in zip(results, expected):
+            self.assertEqual(dict(measurements.items()), dict(expected_measurements.items()))
+
+    def test_lost_worker(self):
+        async def run():
+            coordinator = DistributedSimulatorQueue(self.settings, port=0, address='127.0.0.1')
+            await coordinator.start()
+            # evaluates in 0.2s
+            lost_worker = self.worker(coordinator, 'lost', real_time_factor=10)
+            lost_task = asyncio.ensure_future(lost_worker.run())
+            future = coordinator.test_robot(self.individuals[0], self.conf)
+            while len(lost_worker._running) == 0:
+                await asyncio.sleep(0.01)
+            # the machine disappears, without sending its result
+            lost_task.cancel()
+            lost_worker._writer.close()
+
+            worker = self.worker(coordinator, 'worker')
+            task = asyncio.ensure_future(worker.run())
+            result = await asyncio.wait_for(future, 10)
+            worker.stop()
+            await task
+            await coordinator.stop()
+            return result
+
+        fitness_value, measurements = asyncio.run(run())
+        self.assertEqual(fitness_value, self.local_results()[0][0])
+
+    def test_reconnection(self):
+        async def run():
+            coordinator = DistributedSimulatorQueue(self.settings, port=0, address='127.0.0.1')
+            await coordinator.start()
+            worker = self.worker(coordinator, 'worker', real_time_factor=10)
+            worker.RECONNECT_DELAY = 0.05
+            task = asyncio.ensure_future(worker.run())
+            future = coordinator.test_robot(self.individuals[0], self.conf)
+            while len(worker._running) == 0:
+                await asyncio.sleep(0.01)
+            # the connection drops while the robot is evaluated, the worker reconnects and sends the result
+            worker._writer.close()
+            result = await asyncio.wait_for(future, 10)
+            worker.stop()
+            await task
+            await coordinator.stop()
+            return result, worker._outbox
+
+        (fitness_value, _measurements), outbox = asyncio.run(run())
+        self.assertEqual(fitness_value, self.local_results()[0][0])
+        self.assertEqual(outbox, {})
+
+    def test_reconnection_before_timeout(self):
+        async def run():
+            coordinator = DistributedSimulatorQueue(self.settings, port=0, address='127.0.0.1')
+            await coordinator.start()
+            hello = {'type': 'hello', 'name': 'worker', 'slots': 1, 'token': '', 'running': []}
+            _reader, old_writer = await asyncio.open_connection('127.0.0.1', coordinator.port)
+            send_message(old_writer, hello)
+            while 'worker' not in coordinator._workers:
+                await asyncio.sleep(0.01)
+            future = coordinator.test_robot(self.individuals[0], self.conf)
+            job_id = next(iter(coordinator._jobs))
+
+            idle_worker = self.worker(coordinator, 'idle')
+            idle_task = asyncio.ensure_future(idle_worker.run())
+            while 'idle' not in coordinator._workers:
+                await asyncio.sleep(0.01)
+            # the worker comes back with the robot, before the coordinator noticed its old connection dropped
+            reader, writer = await asyncio.open_connection('127.0.0.1', coordinator.port)
+            send_message(writer, dict(hello, running=[job_id]))
+            await asyncio.sleep(0.2)
+            job = coordinator._jobs.get(job_id)
+            workers = None if job is None else list(job.workers)
+            idle_running = coordinator._workers['idle'].running
+
+            # the robot is evaluated once, by the worker that kept it
+            send_message(writer, {'type': 'result', 'id': job_id, 'fitness': 1.0, 'measurements': None,
+                                  'abandoned': False})
+            result = await asyncio.wait_for(future, 5)
+            ack = await asyncio.wait_for(read_message(reader), 5)
+            idle_worker.stop()
+            await idle_task
+            old_writer.close()
+            writer.close()
+            await coordinator.stop()
+            return workers, idle_running, result, ack
+
+        workers, idle_running, result, ack = asyncio.run(run())
+        self.assertEqual(workers, ['worker'])
+        self.assertEqual(idle_running, set())
+        self.assertEqual(result, (1.0, None))
+        self.assertEqual(ack['type'], 'ack')
+
+    def test_silent_coordinator(self):
+        connections = []
+
+        async def run():
+            # accepts the workers and never answers
+            server = await asyncio.start_server(lambda reader, writer: connections.append(writer), '127.0.0.1', 0)
+            queue = SimulatorQueue(1, self.settings, backend=MockBackend())
+            worker = DistributedWorker(self.settings, f'127.0.0.1:{server.sockets[0].getsockname()[1]}',
+                                       name='worker', queue=queue)
+            worker.COORDINATOR_TIMEOUT = 0.2
+            task = asyncio.ensure_future(worker.run())
+            await asyncio.sleep(0.5)
+            worker.stop()
+            await task
+            for writer in connections:
+                writer.close()
+            server.close()
+            await server.wait_closed()
+
+        asyncio.run(run())
+        # the worker reconnected
+        self.assertGreaterEqual(len(connections), 2)
+
+    def test_coordinator_heartbeat(self):
+        async def run():
+            coordinator = DistributedSimulatorQueue(self.settings, port=0, address='127.0.0.1')
+            coordinator.HEARTBEAT_INTERVAL = 0
+            await coordinator.start()
+            worker = self.worker(coordinator, 'worker')
+            worker.COORDINATOR_TIMEOUT = 1.5
+            task = asyncio.ensure_future(worker.run())
+            while 'worker' not in coordinator._workers:
+                await asyncio.sleep(0.01)
+            connection = coordinator._workers['worker']
+            # idle for longer than the timeout of the worker
+            await asyncio.sleep(2.5)
+            reconnected = coordinator._workers.get('worker') is not connection
+            worker.stop()
+            await task
+            await coordinator.stop()
+            return reconnected
+
+        self.assertFalse(asyncio.run(run()))
+
+    def test_work_stealing(self):
+        async def run():
+            coordinator = DistributedSimulatorQueue(self.settings, port=0, address='127.0.0.1', steal_after=0.1)
+            await coordinator.start()
+            # evaluates in 10s
+            slow_worker = self.worker(coordinator, 'slow', real_time_factor=0.2)
+            slow_task = asyncio.ensure_future(slow_worker.run())
+            future = coordinator.test_robot(self.individuals[0], self.conf)
+            while len(slow_worker._running) == 0:
+                await asyncio.sleep(0.01)
+
+            start = time.perf_counter()
+            worker = self.worker(coordinator, 'fast')
+            task = asyncio.ensure_future(worker.run())
+            result = await asyncio.wait_for(future, 5)
+            elapsed = time.perf_counter() - start
+            for w in (worker, slow_worker):
+                w.stop()
+            await asyncio.gather(task, slow_task)
+            await coordinator.stop()
+            return result, elapsed
+
+        (fitness_value, _measurements), elapsed = asyncio.run(run())
+        self.assertLess(elapsed, 5)
+        self.assertEqual(fitness_value, self.local_results()[0][0])
+
+    def test_abandoned_robot(self):
+        failed = []
+        self.conf.experiment_management = SimpleNamespace(export_failed_eval_robot=failed.append)
+
+        async def run():
+            coordinator = DistributedSimulatorQueue(self.settings, port=0, address='127.0.0.1')
+            await coordinator.start()
+            queue = SimulatorQueue(self.settings.n_cores, self.settings, backend=FailingBackend())
+            worker = DistributedWorker(self.settings, f'127.0.0.1:{coordinator.port}', name='worker', queue=queue)
+            task = asyncio.ensure_future(worker.run())
+            result = await asyncio.wait_for(coordinator.test_robot(self.individuals[0], self.conf), 10)
+            worker.stop()
+            await task
+            await coordinator.stop()
+            return result
+
+        self.assertEqual(asyncio.run(run()), (None, None))
+        # saved by the coordinator
+        self.assertEqual(failed, [self.individuals[0]])
+
+    def test_wrong_token(self):
+        async def run():
+            coordinator = DistributedSimulatorQueue(self.settings, port=0, address='127.0.0.1', token='secret')
+            await coordinator.start()
+            worker = self.worker(coordinator, 'worker')
+            task = asyncio.ensure_future(worker.run())
+            await asyncio.sleep(0.2)
+            workers = len(coordinator._workers)
+            worker.stop()
+            await task
+            await coordinator.stop()
+            return workers
+
+        self.assertEqual(asyncio.run(run()), 0)
+
+    def test_public_address_without_token(self):
+        self.assertTrue(is_loopback('127.0.0.1'))
+        self.assertTrue(is_loopback('::1'))
+        self.assertTrue(is_loopback('localhost'))
+        self.assertFalse(is_loopback('0.0.0.0'))
+        self.assertFalse(is_loopback('example.org'))
+
+        async def run(address, token):
+            coordinator = DistributedSimulatorQueue(self.settings, port=0, address=address, token=token)
+            try:
+                await coordinator.start()
+            finally:
+                await coordinator.stop()
+
+        with self.assertRaises(ValueError):
+            asyncio.run(run('0.0.0.0', ''))
+        asyncio.run(run('0.0.0.0', 'secret'))
+        asyncio.run(run('localhost', ''))
+
+    def test_malformed_messages(self):
+        unhandled = []
+
+        async def send(coordinator, *messages):
+            reader, writer = await asyncio.open_connection('127.0.0.1', coordinator.port)
+            for message in messages:
+                writer.write((message if isinstance(message, str) else json.dumps(message)).encode('utf-8') + b'\n')
+            # closed by the coordinator
+            while await reader.read(1024):
+                pass
+            writer.close()
+
+        async def run():
+            asyncio.get_running_loop().set_exception_handler(lambda loop, context: unhandled.append(context))
+            coordinator = DistributedSimulatorQueue(self.settings, port=0, address='127.0.0.1', token='secret')
+            await coordinator.start()
+            future = coordinator.test_robot(self.individuals[0], self.conf)
+            hello = {'type': 'hello', 'name': 'worker', 'slots': 1, 'token': 'secret', 'running': []}
+            await send(coordinator, {'type': 'hello', 'token': 'secret'})
+            await send(coordinator, '[1, 2]')
+            await send(coordinator, dict(hello, token='sécret'))
+            await send(coordinator, {'type': 'result'})
+            # the robot handed out to a worker sending malformed messages is handed out again
+            await send(coordinator, hello, {'type': 'result', 'id': next(iter(coordinator._jobs))})
+            await send(coordinator, hello, {'fitness': 1.0})
+            refused = len(coordinator._workers)
+
+            worker = DistributedWorker(self.settings, f'127.0.0.1:{coordinator.port}', name='worker', token='secret',
+                                       queue=SimulatorQueue(1, self.settings, backend=MockBackend()))
+            task = asyncio.ensure_future(worker.run())
+            result = await asyncio.wait_for(future, 10)
+            worker.stop()
+            await task
+            await coordinator.stop()
+            return refused, result
+
+        refused, (fitness_value, _measurements) = asyncio.run(run())
+        self.assertEqual(refused, 0)
+        self.assertEqual(fitness_value, self.local_results()[0][0])
+        self.assertEqual(unhandled, [])
+
+    def test_fitness_function_path(self):
+        self.assertEqual(function_path(fitness.displacement_velocity),
+                         'pyrevolve.evolution.fitness:displacement_velocity')
+        with self.assertRaises(ValueError):
+            function_path(lambda robot_manager, robot: 0)
+
+    def test_worker_processes(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join([os.path.abspath(ROOT_FOLDER)] + sys.path))
+
+        async def run():
+            coordinator = DistributedSimulatorQueue(self.settings, port=0, address='127.0.0.1')
+            await coordinator.start()
+            processes = [
+                subprocess.Popen([sys.executable, '-m', 'pyrevolve.util.supervisor.distributed',
+                                  '--coordinator', f'127.0.0.1:{coordinator.port}', '--simulator-backend', 'mock',
+                                  '--n-cores', '1'],
+                                 cwd=folder.name, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                for _ in range(2)
+            ]
+            try:
+                results = await asyncio.wait_for(asyncio.gather(
+                    *(coordinator.test_robot(individual, self.conf) for individual in self.individuals * 2)), 60)
+                workers = len(coordinator._workers)
+            finally:
+                for process in processes:
+                    process.terminate()
+                    process.wait()
+                await coordinator.stop()
+            return results, workers
+
+        results, workers = asyncio.run(run())
+        self.assertEqual(workers, 2)
+        self.assertEqual([fitness_value for fitness_value, _ in results],
+                         [fitness_value for fitness_value, _ in self.local_results() * 2])
@@ -0,0 +1,24 @@
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT_FOLDER = os.path.join(os.path.dirname(__file__), '..', '..')
+
+
+class TestLazyImports(unittest.TestCase):
+    """
+    Tests that the evolution does not import rendering, YAML, Gazebo transport and process libraries until they are used
+    """
+
+    def test_evolution_imports(self):
+        code = ('import sys\n'
+                'import pyrevolve.evolution.population\n'
+                'import pyrevolve.experiment_management\n'
+                'import pyrevolve.genotype.plasticoding.plasticoding\n'
+                'import pyrevolve.util.supervisor.simulator_queue\n'
+                'heavy = ["cairo", "graphviz", "yaml", "pygazebo", "psutil", "matplotlib"]\n'
+                'print(",".join(name for name in heavy if name in sys.modules))\n')
+        process = subprocess.run([sys.executable, '-c', code], cwd=ROOT_FOLDER, stdout=subprocess.PIPE, text=True)
+        self.assertEqual(process.returncode, 0)
+        self.assertEqual(process.stdout.strip(), '')
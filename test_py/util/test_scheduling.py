@@ -0,0 +1,74 @@
+import asyncio
+import unittest
+
+from pyrevolve.util.supervisor.scheduling import EvaluationCostModel, expected_makespan
+from pyrevolve.util.supervisor.simulator_backend import MockBackend
+from pyrevolve.util.supervisor.simulator_queue import SimulatorQueue
+from test_py.util.test_simulator_backend import load_individual, mock_conf, mock_settings
+
+
+class TestScheduling(unittest.TestCase):
+    """
+    Tests the order in which the simulators evaluate the robots
+    """
+
+    def setUp(self):
+        # absolute size 11 and 15
+        self.small = load_individual(176)
+        self.large = load_individual(180)
+
+    def test_cost_model(self):
+        model = EvaluationCostModel()
+        # real time until fitted
+        self.assertAlmostEqual(model.expected(self.small, 30), 30)
+        # a simulated second takes 0.1s per module
+        for _ in range(10):
+            for individual in (self.small, self.large):
+                size = individual.phenotype._morphological_measurements.absolute_size
+                model.add(individual, 30, 30 * 0.1 * size)
+        self.assertAlmostEqual(model.expected(self.small, 60), 60 * 1.1, delta=1)
+        self.assertAlmostEqual(model.expected(self.large, 60), 60 * 1.5, delta=1)
+
+    def test_expected_makespan(self):
+        self.assertEqual(expected_makespan([2, 3, 2, 3, 2], [], 2), 7)
+        self.assertEqual(expected_makespan([1, 1], [5], 2), 5)
+        self.assertEqual(expected_makespan([], [], 2), 0)
+
+    def test_queue_order(self):
+        settings = mock_settings()
+        conf = mock_conf()
+        retried = load_individual(176)
+        retried.failed_eval_attempt_count = 1
+
+        async def run():
+            queue = SimulatorQueue(1, settings, backend=MockBackend())
+            for _ in range(5):
+                queue._cost_model.add(self.small, 2, 1)
+                queue._cost_model.add(self.large, 2, 2)
+            for individual in (self.small, self.large, retried):
+                queue.test_robot(individual, conf)
+            makespan = queue.expected_makespan()
+            order = []
+            while not queue._robot_queue.empty():
+                _priority, robot, _future, _conf = queue._robot_queue.get_nowait()
+                order.append(robot)
+            return order, makespan
+
+        order, makespan = asyncio.run(run())
+        self.assertEqual(order, [retried, self.large, self.small])
+        self.assertAlmostEqual(makespan, 4, delta=0.1)
+
+    def test_evaluations_fit_the_model(self):
+        settings = mock_settings()
+        conf = mock_conf()
+
+        async def run():
+            queue = SimulatorQueue(2, settings, backend=MockBackend())
+            await queue.start()
+            await asyncio.gather(queue.test_robot(self.small, conf), queue.test_robot(self.large, conf))
+            return queue
+
+        queue = asyncio.run(run())
+        self.assertEqual(queue._cost_model.samples, 2)
+        self.assertEqual(queue._expected, {})
+        self.assertEqual(queue._running, {})
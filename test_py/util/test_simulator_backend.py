@@ -0,0 +1,128 @@
+import asyncio
+import os
+import unittest
+from types import SimpleNamespace
+
+from pyrevolve.SDF.math import Vector3
+from pyrevolve.custom_logging.metrics import metrics
+from pyrevolve.evolution import fitness
+from pyrevolve.evolution.individual import Individual
+from pyrevolve.genotype.plasticoding.plasticoding import Plasticoding, PlasticodingConfig
+from pyrevolve.util.supervisor.simulator_backend import MockBackend
+from pyrevolve.util.supervisor.simulator_queue import SimulatorQueue
+
+LOCAL_FOLDER = os.path.join(os.path.dirname(__file__), '..', 'plasticonding')
+
+
+def mock_settings(evaluation_time=2, **settings):
+    """
+    :param evaluation_time: simulated seconds of an evaluation
+    :param settings: other settings of the experiment
+    :return: settings of an experiment evaluating its robots with the mock backend
+    """
+    return SimpleNamespace(simulator_cmd='gzserver', simulator_backend='mock', z_start=0.03,
+                           evaluation_time=evaluation_time, pose_update_frequency=5, **settings)
+
+
+def mock_conf(evaluation_time=2, experiment_management=None):
+    """
+    :return: configuration of the experiment passed to `test_robot`
+    """
+    return SimpleNamespace(evaluation_time=evaluation_time, fitness_function=fitness.displacement_velocity,
+                           experiment_management=experiment_management)
+
+
+def load_individual(genotype_id):
+    """
+    :param genotype_id: 176 or 180, with an absolute size of 11 and 15
+    :return: individual of a genotype of the plasticoding tests, developed and measured
+    """
+    genotype = Plasticoding(PlasticodingConfig(), genotype_id)
+    genotype.load_genotype(os.path.join(LOCAL_FOLDER, f'genotype_{genotype_id}.txt'))
+    individual = Individual(genotype)
+    individual.develop()
+    individual.phenotype.measure_phenotype()
+    return individual
+
+
+class FailingBackend(MockBackend):
+    """
+    Simulators failing every evaluation
+    """
+
+    async def connect(self, settings, address, port):
+        world = await super().connect(settings, address, port)
+
+        async def insert_robot(*args, **kwargs):
+            raise RuntimeError('simulator crashed')
+        world.insert_robot = insert_robot
+        return world
+
+
+def straight_line(revolve_bot, pose):
+    return lambda t: (Vector3(pose.x + t, pose.y, pose.z), (1, 0, 0, 0), 2)
+
+
+class TestMockBackend(unittest.TestCase):
+    """
+    Tests the evaluation of robots with the in-process simulator backend
+    """
+
+    def setUp(self):
+        self.settings = mock_settings(evaluation_time=10)
+        self.conf = mock_conf(evaluation_time=10)
+        self.individuals = [load_individual(genotype_id) for genotype_id in (176, 180)]
+
+    def evaluate(self, backend):
+        async def run():
+            queue = SimulatorQueue(2, self.settings, backend=backend)
+            await queue.start()
+            return await asyncio.gather(*(queue.test_robot(individual, self.conf) for individual in self.individuals))
+        return asyncio.run(run())
+
+    def test_kinematic_model(self):
+        results = self.evaluate(MockBackend())
+        # the trajectory only depends on the robot
+        self.assertEqual([fitness_value for fitness_value, _measurements in results],
+                         [fitness_value for fitness_value, _measurements in self.evaluate(MockBackend())])
+        for fitness_value, behavioural_measurements in results:
+            self.assertGreaterEqual(fitness_value, 0)
+            self.assertIsNotNone(behavioural_measurements)
+
+    def test_scripted_trajectory(self):
+        for fitness_value, _measurements in self.evaluate(MockBackend(trajectory=straight_line)):
+            self.assertAlmostEqual(fitness_value, 1.0)
+
+    def test_pause(self):
+        async def run():
+            world = await MockBackend(trajectory=straight_line).connect(self.settings, '127.0.0.1', 11345)
+            robot_manager = await world.insert_robot(self.individuals[0].phenotype, Vector3(0, 0, 0), life_timeout=1)
+            await world.pause(True)
+            await asyncio.sleep(0.01)
+            self.assertEqual(float(world.age()), 0)
+            await world.pause(False)
+            while not robot_manager.dead:
+                await asyncio.sleep(0.01)
+            self.assertAlmostEqual(float(world.age()), 0.8)
+            self.assertAlmostEqual(robot_manager.last_position.x, 1.0)
+
+            world.unregister_robot(robot_manager)
+            await world.reset(rall=True, time_only=True, model_only=False)
+            self.assertEqual(float(world.age()), 0)
+        asyncio.run(run())
+
+    def test_failed_evaluations(self):
+        failed = []
+        self.conf.experiment_management = SimpleNamespace(export_failed_eval_robot=failed.append)
+
+        async def run():
+            queue = SimulatorQueue(1, self.settings, backend=FailingBackend())
+            queue.TRACE_NAME = 'failing_simulator'
+            await queue.start()
+            return await queue.test_robot(self.individuals[0], self.conf)
+
+        self.assertEqual(asyncio.run(run()), (None, None))
+        self.assertEqual(failed, [self.individuals[0]])
+        self.assertEqual(self.individuals[0].failed_eval_attempt_count, 0)
+        abandoned = {tuple(labels.items()): value for labels, value in metrics.collect()['abandoned_robots_total']}
+        self.assertEqual(abandoned[(('queue', 'failing_simulator'),)], 1)